@@ -1,6 +1,11 @@
+from ipaddress import ip_network
 from itertools import chain
+from typing import Any, Union
 
+from bfd import configureBFD
+from endpoints import EndpointHost
 from frrouter import FRRouter
+from profiles import PROFILES, applyProfile
 
 from mininet.net import Mininet
 from mininet.node import Node
@@ -37,7 +42,38 @@ class TopoWithRealisticLink(Topo):
 
 
 class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
-    """Topo class with helper methods to work with :class:`FRRouter`."""
+    """Topo class with helper methods to work with :class:`FRRouter`.
+
+    :param router_opts: options applied to every router unless the router sets
+        them itself, e.g. `{"netlink_batch": (262144, 196608)}`, defaults to
+        None
+    :type router_opts: dict[str, Any], optional
+    :param bfd: enable BFD on every OSPF interface and BGP neighbor of every
+        router with these intervals, e.g. `{"receive_interval": 50,
+        "transmit_interval": 50, "detect_multiplier": 3}`, FRRouting defaults
+        for missing keys, disabled if None, defaults to None
+    :type bfd: dict[str, int], optional
+    :param profile: name of convergence profile applied to every router, see
+        :data:`profiles.PROFILES`, defaults to "default"
+    :type profile: str, optional
+    """
+
+    def __init__(
+        self,
+        *args,
+        router_opts: Union[dict[str, Any], None] = None,
+        bfd: Union[dict[str, int], None] = None,
+        profile: str = "default",
+        **params,
+    ):
+        if profile not in PROFILES:
+            raise ValueError(f"unknown convergence profile {profile}")
+
+        # Set before super().__init__() because it calls build()
+        self.router_opts = router_opts if router_opts is not None else {}
+        self.bfd = bfd
+        self.profile = profile
+        super().__init__(*args, **params)
 
     def addRouter(self, name: str, **options) -> str:
         """Add router to graph.
@@ -48,6 +84,11 @@ class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
         :rtype: str
         """
 
+        options = {**self.router_opts, **options}
+        daemons = tuple(options.get("daemons", ()))
+        if self.bfd is not None and {"ospfd", "bgpd"} & set(daemons):
+            options["daemons"] = (*daemons, "bfdd")
+
         return self.addNode(name, cls=FRRouter, **options)
 
     def routers(self) -> list[str]:
@@ -79,6 +120,7 @@ class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
         net_addr: str,
         daemons: tuple[str, ...],
         commands: tuple[str, ...],
+        **options,
     ) -> str:
         """Build a network consist one router that connects with a host.
 
@@ -94,6 +136,7 @@ class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
         :type daemons: tuple[str,...], optional
         :param commands: commands to be executed in vtysh, default to None
         :type commands: tuple[str], optional
+        :param options: other options of :class:`FRRouter`, e.g. `ip_commands`
         :return: name of router
         :rtype: str
         """
@@ -101,7 +144,11 @@ class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
         net_addr = ".".join(net_addr.split(".")[:3])
 
         r = self.addRouter(
-            router_name, ip=f"{net_addr}.1/24", daemons=daemons, commands=commands
+            router_name,
+            ip=f"{net_addr}.1/24",
+            daemons=daemons,
+            commands=commands,
+            **options,
         )
         h = self.addHost(
             host_name, ip=f"{net_addr}.2/24", defaultRoute=f"via {net_addr}.1"
@@ -111,6 +158,64 @@ class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
 
         return r
 
+    def buildRouterAndEndpoints(
+        self,
+        router_name: str,
+        lan_name: str,
+        network: str,
+        endpoints: int,
+        daemons: tuple[str, ...],
+        commands: tuple[str, ...],
+        endpoint_mode: str = "alias",
+        **options,
+    ) -> str:
+        """Build a network consist one router that connects with a LAN of many
+        endpoints, all emulated by one :class:`endpoints.EndpointHost`.
+
+        :param router_name: name of router
+        :type router_name: str
+        :param lan_name: name of the host of the endpoints
+        :type lan_name: str
+        :param network: network of router and endpoints, e.g. "10.10.0.0/16".
+            Router takes the first address, endpoints the next ones
+        :type network: str
+        :param endpoints: number of endpoints
+        :type endpoints: int
+        :param daemons: daemons to be enabled on router
+        :type daemons: tuple[str,...]
+        :param commands: commands to be executed in vtysh
+        :type commands: tuple[str]
+        :param endpoint_mode: see :class:`endpoints.EndpointHost`, defaults to
+            "alias"
+        :type endpoint_mode: str, optional
+        :param options: other options of :class:`FRRouter`, e.g. `ip_commands`
+        :return: name of router
+        :rtype: str
+        """
+
+        lan = ip_network(network)
+        router_ip, host_ip = (lan.network_address + 1, lan.network_address + 2)
+
+        r = self.addRouter(
+            router_name,
+            ip=f"{router_ip}/{lan.prefixlen}",
+            daemons=daemons,
+            commands=commands,
+            **options,
+        )
+        h = self.addHost(
+            lan_name,
+            cls=EndpointHost,
+            ip=f"{host_ip}/{lan.prefixlen}",
+            defaultRoute=f"via {router_ip}",
+            endpoints=endpoints,
+            endpoint_mode=endpoint_mode,
+        )
+
+        self.addLink(r, h)
+
+        return r
+
     # See https://stackoverflow.com/a/33533514 for how to use classname
     # (TopoWithRouter) here.
     #
@@ -125,7 +230,9 @@ class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
     # Port number starts at 0.
     @classmethod
     def postAction(cls, net: Mininet):
-        """Configure MPLS for all :class:`FRRouter` that enable ldpd daemon.
+        """Configure MPLS for all :class:`FRRouter` that enable ldpd daemon,
+        BFD for all of them that enable bfdd daemon if the topo enables BFD,
+        and apply the convergence profile of the topo to every router.
 
         :param net: a Mininet instance built from a :class:`TopoWithRouter` topo
         :type net: Mininet
@@ -140,13 +247,108 @@ class TopoWithRouter(TopoWithPostAction, TopoWithRealisticLink):
         print("*** Configuring MPLS for applicable routers")
         for router in mpls_routers:
             print(router.name, end=" ")
-            router.vtysh(
-                "configure terminal",
-                "mpls ldp",
-                "address-family ipv4",
-                f"discovery transport-address {router.defaultIntf().IP()}",
-                *chain.from_iterable(
-                    [[f"interface {name}", "exit"] for name in router.intfNames()]
-                ),
-            )
+            cls.configureLDP(router)
         print()
+
+        if net.topo.bfd is not None:
+            bfd_routers = [
+                r
+                for r in map(net.getNodeByName, net.topo.routers())
+                if isinstance(r, FRRouter) and "bfdd" in r.daemons
+            ]
+            print("*** Configuring BFD")
+            for router in bfd_routers:
+                print(router.name, end=" ")
+                configureBFD(router, net.topo.bfd)
+            print()
+
+        profile = PROFILES[net.topo.profile]
+        if profile != PROFILES["default"]:
+            print(f"*** Applying {net.topo.profile} convergence profile")
+            for router in map(net.getNodeByName, net.topo.routers()):
+                print(router.name, end=" ")
+                applyProfile(router, profile)
+            print()
+
+    @staticmethod
+    def configureLDP(router: FRRouter, intfs: Union[list[str], None] = None):
+        """Enable LDP on interfaces of a router that runs ldpd.
+
+        :param router: router to configure
+        :type router: FRRouter
+        :param intfs: interfaces to enable LDP on, e.g. interfaces of a new
+            link, all interfaces along with the transport address if None,
+            defaults to None
+        :type intfs: Union[list[str], None], optional
+        """
+
+        if not router.daemons.count("ldpd"):
+            return
+
+        transport = (
+            [f"discovery transport-address {router.defaultIntf().IP()}"]
+            if intfs is None
+            else []
+        )
+        router.vtysh(
+            "configure terminal",
+            "mpls ldp",
+            "address-family ipv4",
+            *transport,
+            *chain.from_iterable(
+                [
+                    [f"interface {name}", "exit"]
+                    for name in (router.intfNames() if intfs is None else intfs)
+                ]
+            ),
+        )
+
+    def configureRouter(self, router: FRRouter, intfs: Union[list[str], None] = None):
+        """Apply what :meth:`postAction` applies to every router to one router
+        of a running network, e.g. a router or a link added at runtime.
+
+        :param router: router to configure
+        :type router: FRRouter
+        :param intfs: only configure these interfaces, e.g. interfaces of a new
+            link, the whole router if None, defaults to None
+        :type intfs: Union[list[str], None], optional
+        """
+
+        self.configureLDP(router, intfs)
+        if self.bfd is not None and "bfdd" in router.daemons:
+            configureBFD(router, self.bfd, intfs=intfs)
+        applyProfile(router, PROFILES[self.profile], intfs)
+
+    def removeNode(self, name: str):
+        """Remove a node and its links from graph.
+
+        :param name: name of node
+        :type name: str
+        """
+
+        self.g.node.pop(name)
+        for peer in self.g.edge.pop(name, {}):
+            self.g.edge[peer].pop(name, None)
+
+        # Ports of peers stay allocated, ports are numbered from the count of
+        # allocated ports and a freed port would be given twice.
+        self.ports.pop(name, None)
+
+    def removeLink(self, node1: str, node2: str, port1: int, port2: int):
+        """Remove a link from graph. Its ports are not given to new links.
+
+        :param node1: name of first node
+        :type node1: str
+        :param node2: name of second node
+        :type node2: str
+        :param port1: port of first node
+        :type port1: int
+        :param port2: port of second node
+        :type port2: int
+        """
+
+        links = self.g.edge.get(node1, {}).get(node2, {})
+        for key, info in list(links.items()):
+            ends = {(info["node1"], info["port1"]), (info["node2"], info["port2"])}
+            if ends == {(node1, port1), (node2, port2)}:
+                del links[key]
@@ -0,0 +1,83 @@
+"""Latency and throughput measurements between two nodes, shared by the
+benchmarks of switches and ZeroTier."""
+
+import json
+import re
+import time
+from subprocess import PIPE
+
+from mininet.node import Node
+
+# rtt min/avg/max/mdev = 0.041/0.052/0.080/0.011 ms
+_RTT_PATTERN = re.compile(r"= ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+) ms")
+
+
+def measureLatency(src: Node, address: str, count: int = 200) -> dict[str, float]:
+    """Measure round-trip time with ICMP echo.
+
+    :param src: node sending echo requests
+    :type src: Node
+    :param address: destination address
+    :type address: str
+    :param count: number of echo requests, sent every 10ms, defaults to 200
+    :type count: int, optional
+    :return: `min_ms`, `avg_ms`, `max_ms` and `mdev_ms`, empty if no reply
+    :rtype: dict[str, float]
+    """
+
+    match = _RTT_PATTERN.search(
+        src.cmd(f"ping -q -n -c {count} -i 0.01 -W 1 {address}")
+    )
+    if match is None:
+        return {}
+    return dict(
+        zip(("min_ms", "avg_ms", "max_ms", "mdev_ms"), map(float, match.groups()))
+    )
+
+
+def measureThroughput(
+    src: Node, dst: Node, address: str, duration: float = 10
+) -> dict[str, float]:
+    """Measure TCP throughput with iperf3.
+
+    :param src: node running the iperf3 client
+    :type src: Node
+    :param dst: node running the iperf3 server
+    :type dst: Node
+    :param address: address of `dst` the client connects to
+    :type address: str
+    :param duration: seconds to send, defaults to 10
+    :type duration: float, optional
+    :raises RuntimeError: if iperf3 fails
+    :return: `bits_per_second` received and `retransmits`
+    :rtype: dict[str, float]
+    """
+
+    server = dst.popen(["iperf3", "--server", "--one-off"], stdout=PIPE, stderr=PIPE)
+    client = None
+    # Both ends are stopped even if the client times out, so the port of the
+    # server is free for the next measurement
+    try:
+        time.sleep(0.5)
+        client = src.popen(
+            ["iperf3", "--client", address, "--time", str(duration), "--json"],
+            stdout=PIPE,
+            stderr=PIPE,
+            text=True,
+        )
+        stdout, _ = client.communicate(timeout=duration + 30)
+    finally:
+        for process in (client, server):
+            if process is None:
+                continue
+            if process.poll() is None:
+                process.kill()
+            process.communicate()
+
+    result = json.loads(stdout or "{}")
+    if "error" in result or "end" not in result:
+        raise RuntimeError(f"iperf3 failed: {result.get('error', stdout)}")
+    return {
+        "bits_per_second": result["end"]["sum_received"]["bits_per_second"],
+        "retransmits": result["end"]["sum_sent"].get("retransmits", 0),
+    }
@@ -0,0 +1,153 @@
+import time
+from typing import Any, Union
+
+from frrouter import FRRouter
+
+# Name of the BFD profile shared by every session of a router
+BFD_PROFILE = "lab"
+
+# FRRouting defaults, intervals are in milliseconds
+BFD_DEFAULTS = {
+    "receive_interval": 300,
+    "transmit_interval": 300,
+    "detect_multiplier": 3,
+}
+
+
+def bgpNeighbors(router: FRRouter) -> dict[str, list[str]]:
+    """Find BGP neighbors of a router in its running configuration.
+
+    :param router: router running bgpd
+    :type router: FRRouter
+    :return: neighbor addresses per `router bgp` statement, e.g.
+        `{"router bgp 1 vrf customer": ["192.168.1.2"]}`
+    :rtype: dict[str, list[str]]
+    """
+
+    neighbors: dict[str, list[str]] = {}
+    instance = None
+    for line in router.show("show running-config").splitlines():
+        if line.startswith("router bgp "):
+            instance = line.strip()
+        elif line and not line[0].isspace():
+            instance = None
+        elif instance is not None:
+            words = line.split()
+            if len(words) >= 3 and words[0] == "neighbor" and words[2] == "remote-as":
+                neighbors.setdefault(instance, []).append(words[1])
+    return neighbors
+
+
+def bfdCommands(
+    router: FRRouter,
+    intervals: Union[dict[str, int], None] = None,
+    enable: bool = True,
+    intfs: Union[list[str], None] = None,
+) -> tuple[str, ...]:
+    """Generate vtysh commands to enable or disable BFD on every OSPF
+    interface and BGP neighbor of a router.
+
+    ldpd has no BFD client. Sessions of routers that use `mpls ldp-sync`
+    follow OSPF, which is protected by BFD.
+
+    :param router: router running bfdd
+    :type router: FRRouter
+    :param intervals: `receive_interval` and `transmit_interval` in
+        milliseconds and `detect_multiplier`, FRRouting defaults if missing,
+        defaults to None
+    :type intervals: Union[dict[str, int], None], optional
+    :param enable: enable BFD if `True`, disable it otherwise, defaults to True
+    :type enable: bool, optional
+    :param intfs: only configure OSPF on these interfaces, e.g. interfaces of
+        a new link, all interfaces and BGP neighbors if None, defaults to None
+    :type intfs: Union[list[str], None], optional
+    :return: vtysh commands
+    :rtype: tuple[str, ...]
+    """
+
+    no = "" if enable else "no "
+    commands = ["configure terminal"]
+    if enable and intfs is None:
+        profile = {**BFD_DEFAULTS, **(intervals or {})}
+        commands += [
+            "bfd",
+            f"profile {BFD_PROFILE}",
+            *(f"{k.replace('_', '-')} {v}" for k, v in profile.items()),
+            "exit",
+            "exit",
+        ]
+
+    if "ospfd" in router.daemons:
+        for intf in router.intfNames() if intfs is None else intfs:
+            if intf == "lo":
+                continue
+            commands += [f"interface {intf}", f"{no}ip ospf bfd"]
+            if enable:
+                commands.append(f"ip ospf bfd profile {BFD_PROFILE}")
+            commands.append("exit")
+
+    if "bgpd" in router.daemons and intfs is None:
+        for instance, peers in bgpNeighbors(router).items():
+            commands.append(instance)
+            for peer in peers:
+                commands.append(f"{no}neighbor {peer} bfd")
+                if enable:
+                    commands.append(f"neighbor {peer} bfd profile {BFD_PROFILE}")
+            commands.append("exit")
+
+    return tuple(commands)
+
+
+def configureBFD(
+    router: FRRouter,
+    intervals: Union[dict[str, int], None] = None,
+    enable: bool = True,
+    intfs: Union[list[str], None] = None,
+):
+    """Enable or disable BFD on every OSPF interface and BGP neighbor of a
+    router, see :func:`bfdCommands`.
+
+    :param router: router running bfdd
+    :type router: FRRouter
+    :param intervals: BFD intervals, defaults to None
+    :type intervals: Union[dict[str, int], None], optional
+    :param enable: enable BFD if `True`, disable it otherwise, defaults to True
+    :type enable: bool, optional
+    :param intfs: only configure OSPF on these interfaces, defaults to None
+    :type intfs: Union[list[str], None], optional
+    """
+
+    router.vtysh(*bfdCommands(router, intervals, enable, intfs))
+
+
+def bfdPeers(router: FRRouter) -> list[dict[str, Any]]:
+    """Get BFD sessions of a router.
+
+    :param router: router running bfdd
+    :type router: FRRouter
+    :return: sessions as reported by `show bfd peers json`
+    :rtype: list[dict[str, Any]]
+    """
+
+    peers = router.showJSON("show bfd peers")
+    return peers if isinstance(peers, list) else []
+
+
+def waitForBFD(routers: list[FRRouter], timeout: float = 60) -> bool:
+    """Wait until every BFD session of the routers is up.
+
+    :param routers: routers running bfdd
+    :type routers: list[FRRouter]
+    :param timeout: maximum time to wait in seconds, defaults to 60
+    :type timeout: float, optional
+    :return: `True` if every session is up, `False` on timeout
+    :rtype: bool
+    """
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        sessions = [p for r in routers for p in bfdPeers(r)]
+        if sessions and all(p.get("status") == "up" for p in sessions):
+            return True
+        time.sleep(0.5)
+    return False
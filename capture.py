@@ -0,0 +1,232 @@
+import os
+import re
+import signal
+import time
+from fnmatch import fnmatch
+from subprocess import PIPE, Popen
+from typing import Union
+
+from mininet.net import Mininet
+from mininet.node import Node
+
+
+class Capture:
+    """Capture packets from several interfaces of a node into rotating pcapng
+    files.
+
+    One `dumpcap` process captures every interface of the node. It reads
+    packets through libpcap's memory-mapped TPACKET_V3 ring buffers, filters
+    them in the kernel with the compiled BPF filter and writes pcapng without
+    dissecting packets, which is far cheaper than piping `tcpdump` into
+    Wireshark per interface.
+
+    Disk usage is bounded by `files` * `filesize_kb` (the oldest file is
+    overwritten) and memory by `buffer_mb` per interface.
+
+    :param node: node to capture on
+    :type node: Node
+    :param intfs: interface names, all interfaces of the node if empty
+    :type intfs: list[str]
+    :param capture_filter: BPF filter in pcap-filter syntax, defaults to ""
+    :type capture_filter: str, optional
+    :param directory: directory of output files, defaults to "captures"
+    :type directory: str, optional
+    :param filesize_kb: rotate output file after this many kB, defaults to
+        10240
+    :type filesize_kb: int, optional
+    :param files: number of files kept in the ring, defaults to 10
+    :type files: int, optional
+    :param buffer_mb: kernel ring buffer per interface in MiB, defaults to 16
+    :type buffer_mb: int, optional
+    :param snaplen: bytes captured per packet, defaults to 256
+    :type snaplen: int, optional
+    """
+
+    # Packets received/dropped on interface 'r1-eth0': 10/0 (pcap:0/dumpcap:0/...)
+    _STATS_PATTERN = re.compile(
+        r"Packets received/dropped on interface '(?P<intf>[^']+)':"
+        r" (?P<received>\d+)/(?P<dropped>\d+)"
+        r"(?: \(pcap:(?P<pcap>\d+)/dumpcap:(?P<dumpcap>\d+)/flushed:(?P<flushed>\d+))?"
+    )
+
+    def __init__(
+        self,
+        node: Node,
+        intfs: list[str],
+        capture_filter: str = "",
+        directory: str = "captures",
+        filesize_kb: int = 10240,
+        files: int = 10,
+        buffer_mb: int = 16,
+        snaplen: int = 256,
+    ):
+        self.node = node
+        self.intfs = intfs or [i for i in node.intfNames() if i != "lo"]
+        self.capture_filter = capture_filter
+        self.path = os.path.abspath(os.path.join(directory, f"{node.name}.pcapng"))
+        self.filesize_kb = filesize_kb
+        self.files = files
+        self.buffer_mb = buffer_mb
+        self.snaplen = snaplen
+        self.stats: dict[str, dict[str, int]] = {}
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._process: Union[Popen, None] = None
+
+    def start(self):
+        """Start capturing."""
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        command = ["dumpcap", "-q", "-n", "-s", str(self.snaplen)]
+        for intf in self.intfs:
+            command += ["-i", intf, "-B", str(self.buffer_mb)]
+            if self.capture_filter:
+                command += ["-f", self.capture_filter]
+        command += [
+            "-b",
+            f"filesize:{self.filesize_kb}",
+            "-b",
+            f"files:{self.files}",
+            "-w",
+            self.path,
+        ]
+        self._process = self.node.popen(command, stdout=PIPE, stderr=PIPE, text=True)
+        self.started_at = time.time()
+
+    def stop(self) -> dict[str, dict[str, int]]:
+        """Stop capturing and collect drop counters.
+
+        :return: per interface counters: `received`, `dropped` (by the kernel
+            ring), and `pcap`, `dumpcap`, `flushed` drops when reported
+        :rtype: dict[str, dict[str, int]]
+        """
+
+        if self._process is None:
+            return self.stats
+
+        # dumpcap prints its statistics on SIGINT
+        self._process.send_signal(signal.SIGINT)
+        _, stderr = self._process.communicate()
+        self._process = None
+        self.stopped_at = time.time()
+
+        self.stats = {
+            match["intf"]: {
+                k: int(v)
+                for k, v in match.groupdict().items()
+                if k != "intf" and v is not None
+            }
+            for match in Capture._STATS_PATTERN.finditer(stderr)
+        }
+        return self.stats
+
+    def running(self) -> bool:
+        """Check if dumpcap is still capturing.
+
+        :return: `True` if capturing, `False` otherwise
+        :rtype: bool
+        """
+
+        return self._process is not None and self._process.poll() is None
+
+
+class CaptureManager:
+    """Start and stop named captures spanning many nodes of a network.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param directory: base directory of output files, one subdirectory per
+        capture, defaults to "captures"
+    :type directory: str, optional
+    """
+
+    def __init__(self, net: Mininet, directory: str = "captures"):
+        self.net = net
+        self.directory = directory
+        self.captures: dict[str, list[Capture]] = {}
+
+    def start(
+        self, name: str, targets: list[str], capture_filter: str = "", **options
+    ) -> list[Capture]:
+        """Start a capture on many nodes.
+
+        :param name: name of capture
+        :type name: str
+        :param targets: `node` (all interfaces of node) or `node:intf`, node
+            alone can be a glob pattern of hosts and switches, e.g. "r*" or
+            "r1:r1-eth0"
+        :type targets: list[str]
+        :param capture_filter: BPF filter, defaults to ""
+        :type capture_filter: str, optional
+        :param options: other options of :class:`Capture`
+        :raises ValueError: if a target matches no node or interface
+        :raises OSError: if dumpcap cannot be started, no capture is then
+            running
+        :return: started captures, one per node
+        :rtype: list[Capture]
+        """
+
+        if name in self.captures:
+            raise ValueError(f"capture {name} is already running")
+
+        # Controllers run in the root namespace, they would capture the host
+        nodes = [*self.net.hosts, *self.net.switches]
+        # Interfaces of every node, None for all interfaces
+        intfs: dict[str, Union[list[str], None]] = {}
+        for target in targets:
+            pattern, _, intf = target.partition(":")
+            if intf and any(c in pattern for c in "*?["):
+                raise ValueError(f"{target}: interfaces need a node name")
+            matched = [n for n in nodes if fnmatch(n.name, pattern)]
+            if not matched:
+                raise ValueError(f"no node matches {pattern}")
+            for node in matched:
+                if not intf:
+                    intfs[node.name] = None
+                elif intf not in node.intfNames():
+                    raise ValueError(f"{node.name} has no interface {intf}")
+                elif intfs.get(node.name, []) is not None:
+                    node_intfs = intfs.setdefault(node.name, [])
+                    if intf not in node_intfs:
+                        node_intfs.append(intf)
+
+        captures = [
+            Capture(
+                self.net.get(node_name),
+                node_intfs or [],
+                capture_filter,
+                os.path.join(self.directory, name),
+                **options,
+            )
+            for node_name, node_intfs in intfs.items()
+        ]
+        try:
+            for capture in captures:
+                capture.start()
+        except OSError:
+            for capture in captures:
+                capture.stop()
+            raise
+        self.captures[name] = captures
+        return captures
+
+    def stop(self, name: str) -> dict[str, dict[str, dict[str, int]]]:
+        """Stop a capture.
+
+        :param name: name of capture
+        :type name: str
+        :return: drop counters per node and per interface
+        :rtype: dict[str, dict[str, dict[str, int]]]
+        """
+
+        captures = self.captures.pop(name)
+        return {capture.node.name: capture.stop() for capture in captures}
+
+    def stopAll(self) -> dict[str, dict[str, dict[str, dict[str, int]]]]:
+        """Stop every capture.
+
+        :return: drop counters per capture, per node and per interface
+        :rtype: dict[str, dict[str, dict[str, dict[str, int]]]]
+        """
+
+        return {name: self.stop(name) for name in list(self.captures)}
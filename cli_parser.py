@@ -1,17 +1,24 @@
+import json
 from argparse import ArgumentParser, MetavarTypeHelpFormatter
+from typing import Any
 
-from topo import topos
+from experiments import experiments
+from lab_client import SOCKET_PATH
+from profiles import PROFILES
+from switches import SWITCHES
+from topo_registry import topoPaths
 
 description = "create a network from topo name."
 parser = ArgumentParser(
     description=description, formatter_class=MetavarTypeHelpFormatter
 )
 
+topo_names = [*topoPaths().keys()]
 parser.add_argument(
     "topo_name",
     type=str,
-    choices=topos.keys(),
-    help=f"topology to create: {[*topos.keys()]}",
+    choices=topo_names,
+    help=f"topology to create: {topo_names}",
     metavar="topo_name",
 )
 parser.add_argument(
@@ -23,3 +30,101 @@ parser.add_argument(
     type=int,
     help="listening port of remote controller",
 )
+parser.add_argument(
+    "--switch",
+    type=str,
+    choices=SWITCHES.keys(),
+    default="lxbr",
+    help="switch implementation, `ovs` learns addresses without controller and"
+    " `ovs-flows` only forwards by preinstalled flows:"
+    f" {[*SWITCHES.keys()]}",
+    metavar="NAME",
+)
+parser.add_argument(
+    "--no-check",
+    action="store_true",
+    help="do not check vtysh commands of routers before starting",
+)
+parser.add_argument(
+    "--netlink-batch",
+    type=int,
+    nargs=2,
+    help="zebra netlink batch buffer size and flush threshold in bytes",
+)
+parser.add_argument(
+    "--platform-labels",
+    type=int,
+    help="size of the MPLS label table of routers that run ldpd",
+)
+parser.add_argument(
+    "--bfd",
+    type=int,
+    nargs=2,
+    help="enable BFD on every router with this interval in milliseconds and"
+    " detect multiplier",
+)
+parser.add_argument(
+    "--profile",
+    type=str,
+    choices=PROFILES.keys(),
+    help=f"convergence timers applied to every router: {[*PROFILES.keys()]}",
+    metavar="NAME",
+)
+parser.add_argument(
+    "--metrics-port",
+    type=int,
+    help="serve Prometheus metrics of the lab on this local port",
+)
+parser.add_argument(
+    "-o",
+    "--topo-opt",
+    type=str,
+    action="append",
+    default=[],
+    help="KEY=VALUE option passed to the topo, VALUE is parsed as JSON if"
+    " possible, e.g. `-o routers=100 -o areas=4` for ospf-scale",
+)
+parser.add_argument(
+    "--experiment",
+    type=str,
+    choices=experiments.keys(),
+    help=f"run an experiment instead of the CLI: {[*experiments.keys()]}",
+    metavar="NAME",
+)
+parser.add_argument(
+    "-x",
+    "--experiment-opt",
+    type=str,
+    action="append",
+    default=[],
+    help="KEY=VALUE option passed to the experiment, VALUE is parsed as JSON"
+    " if possible, e.g. `-x link=r1,r2 -x trials=5` for failover",
+)
+parser.add_argument(
+    "--serve",
+    type=str,
+    nargs="?",
+    const=SOCKET_PATH,
+    help="keep the lab running and serve RPC requests on this unix socket"
+    f" instead of the CLI, see lab_client.py (default: {SOCKET_PATH})",
+    metavar="PATH",
+)
+
+
+def parseOptions(options: list[str]) -> dict[str, Any]:
+    """Parse KEY=VALUE options, VALUE is parsed as JSON if possible.
+
+    :param options: list of KEY=VALUE
+    :type options: list[str]
+    :return: options, dashes in keys are replaced by underscores
+    :rtype: dict[str, Any]
+    """
+
+    parsed = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        try:
+            parsed[key.replace("-", "_")] = json.loads(value)
+        except json.JSONDecodeError:
+            parsed[key.replace("-", "_")] = value
+    return parsed
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import PIPE, run
+from tempfile import NamedTemporaryFile
+
+from base_topo import TopoWithRouter
+
+CACHE_PATH = ".config-check-cache.json"
+
+# Commands that change the vtysh mode or save the config, they are implied
+# when a config file is read
+_MODE_COMMANDS = ("configure", "configure terminal", "end", "write", "write integrated")
+
+
+def configFile(commands: tuple[str, ...]) -> str:
+    """Turn a vtysh command sequence of a router into a config file.
+
+    :param commands: commands as passed to :class:`FRRouter`
+    :type commands: tuple[str, ...]
+    :return: content of the config file
+    :rtype: str
+    """
+
+    lines = [c.strip() for c in commands if c.strip() not in _MODE_COMMANDS]
+    return "\n".join(lines) + "\n"
+
+
+def checkCommands(commands: tuple[str, ...]) -> list[str]:
+    """Check a vtysh command sequence with the dry-run mode of vtysh.
+
+    Nothing is applied and no daemon needs to run.
+
+    :param commands: commands as passed to :class:`FRRouter`
+    :type commands: tuple[str, ...]
+    :return: error messages of vtysh, empty if the commands are valid
+    :rtype: list[str]
+    """
+
+    with NamedTemporaryFile("w", suffix=".conf") as file:
+        file.write(configFile(commands))
+        file.flush()
+        process = run(
+            ["vtysh", "--dryrun", "-f", file.name], stdout=PIPE, stderr=PIPE, text=True
+        )
+    if process.returncode == 0:
+        return []
+    output = (process.stdout + process.stderr).strip().splitlines()
+    return [line for line in output if line.strip()] or [
+        f"vtysh exited with {process.returncode}"
+    ]
+
+
+def _vtyshVersion() -> str:
+    process = run(["vtysh", "--version"], stdout=PIPE, text=True)
+    return process.stdout.splitlines()[0] if process.stdout else ""
+
+
+def validateTopo(
+    topo: TopoWithRouter, cache_path: str = CACHE_PATH
+) -> dict[str, list[str]]:
+    """Check the vtysh commands of every router of a topo before it starts.
+
+    Routers sharing a command sequence are checked once, sequences are checked
+    in parallel, and valid sequences are cached by their hash and the version
+    of vtysh, so unchanged configs are not checked again. Errors are not
+    cached, they may come from the environment, e.g. vtysh run without
+    privileges.
+
+    :param topo: topo to check
+    :type topo: TopoWithRouter
+    :param cache_path: path of the cache file, defaults to CACHE_PATH
+    :type cache_path: str, optional
+    :raises FileNotFoundError: if vtysh is not installed
+    :return: error messages of every router with invalid commands
+    :rtype: dict[str, list[str]]
+    """
+
+    try:
+        with open(cache_path) as file:
+            cache: dict[str, list[str]] = json.load(file)
+    except (OSError, ValueError):
+        cache = {}
+    # Caches written before errors were left out
+    cache = {key: errors for key, errors in cache.items() if not errors}
+
+    version = _vtyshVersion()
+    sequences: dict[str, tuple[str, ...]] = {}
+    routers: dict[str, str] = {}
+    for name in topo.routers():
+        commands = tuple(topo.nodeInfo(name).get("commands") or ())
+        key = hashlib.sha256(json.dumps([version, commands]).encode()).hexdigest()
+        sequences[key] = commands
+        routers[name] = key
+
+    unchecked = [key for key in sequences if key not in cache]
+    results: dict[str, list[str]] = {}
+    if unchecked:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            checked = executor.map(checkCommands, (sequences[k] for k in unchecked))
+            results.update(zip(unchecked, checked))
+        cache.update((key, errors) for key, errors in results.items() if not errors)
+        # Concurrent checks must never read a partially written cache
+        with NamedTemporaryFile(
+            "w", dir=os.path.dirname(os.path.abspath(cache_path)), delete=False
+        ) as file:
+            json.dump(cache, file)
+        os.replace(file.name, cache_path)
+
+    return {name: results[key] for name, key in routers.items() if results.get(key)}
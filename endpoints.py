@@ -0,0 +1,207 @@
+"""Many lightweight endpoints per router LAN, in one network namespace.
+
+A :class:`EndpointHost` stands for all the endpoints of a LAN with a single
+namespace and a single shell, so thousands of endpoints load the ARP table,
+the FIB and the data plane of their router without one Mininet host each.
+Probes send and receive on behalf of every endpoint, see
+:func:`endpointReachability`.
+
+Past about 1000 endpoints per LAN, raise the neighbor table limits of the
+host, which are shared by every namespace, e.g.::
+
+    sudo sysctl -w net.ipv4.neigh.default.gc_thresh3=65536
+"""
+
+from ipaddress import ip_interface
+from tempfile import NamedTemporaryFile
+from typing import Any, Union
+
+from probe import probeResult, startProbe
+from results import summarize
+
+from mininet.net import Mininet
+from mininet.node import Host
+
+ENDPOINT_MODES = ("alias", "macvlan")
+
+
+class EndpointHost(Host):
+    """Host that emulates `endpoints` endpoints of its LAN.
+
+    The first endpoint is the IP of the host, the others take the next
+    addresses of its network. In `alias` mode, they are extra addresses of the
+    default interface and share its MAC address. In `macvlan` mode, every
+    endpoint has a macvlan interface on top of the default interface, with its
+    own MAC address, so routers of the LAN learn one neighbor per endpoint.
+    Either way, all endpoints are created with a single `ip -batch`.
+
+    Every broadcast of the LAN is copied to every macvlan interface, so in
+    `macvlan` mode routers take a few seconds to resolve thousands of
+    endpoints for the first time.
+
+    :param endpoints: number of endpoints, including the host itself,
+        defaults to 1
+    :type endpoints: int, optional
+    :param endpoint_mode: one of ENDPOINT_MODES, defaults to "alias"
+    :type endpoint_mode: str, optional
+    """
+
+    def __init__(
+        self, name: str, endpoints: int = 1, endpoint_mode: str = "alias", **params
+    ):
+        if endpoint_mode not in ENDPOINT_MODES:
+            raise ValueError(f"unknown endpoint mode {endpoint_mode}")
+        if endpoints < 1:
+            raise ValueError("need at least 1 endpoint")
+
+        self.endpoints = endpoints
+        self.endpoint_mode = endpoint_mode
+        self.endpoint_ips: list[str] = []
+        super().__init__(name, **params)
+
+    def config(self, **params):
+        r = super().config(**params)
+
+        intf = self.defaultIntf()
+        first = ip_interface(f"{self.IP()}/{intf.prefixLen}")
+        last = int(first.network.broadcast_address) - 1
+        if int(first.ip) + self.endpoints - 1 > last:
+            raise ValueError(
+                f"{first.network} is too small for {self.endpoints} endpoints"
+            )
+        self.endpoint_ips = [str(first.ip + i) for i in range(self.endpoints)]
+
+        ip_commands = []
+        for i, ip in enumerate(self.endpoint_ips[1:], 1):
+            address = f"{ip}/{first.network.prefixlen}"
+            if self.endpoint_mode == "alias":
+                ip_commands.append(f"addr add {address} dev {intf}")
+            else:
+                ip_commands += [
+                    f"link add ep{i} link {intf} type macvlan mode bridge",
+                    f"addr add {address} dev ep{i}",
+                    f"link set ep{i} up",
+                ]
+
+        if self.endpoint_mode == "macvlan":
+            # Every interface is on the same LAN: only answer ARP requests
+            # for addresses of the receiving interface, and accept packets on
+            # interfaces that are not the one of the route back to the source
+            self.cmd(
+                "sysctl --write net.ipv4.conf.all.arp_ignore=1"
+                " net.ipv4.conf.all.arp_announce=2"
+                " net.ipv4.conf.all.rp_filter=0"
+                " net.ipv4.conf.default.rp_filter=0"
+                f" net.ipv4.conf.{intf}.rp_filter=0"
+            )
+        if ip_commands:
+            with NamedTemporaryFile("w", suffix=".batch") as batch:
+                batch.write("\n".join(ip_commands) + "\n")
+                batch.flush()
+                self.cmd(f"ip -force -batch {batch.name}")
+
+        return r
+
+    def endpointIPs(self) -> list[str]:
+        """Return addresses of all endpoints.
+
+        :return: addresses of endpoints, the IP of the host first
+        :rtype: list[str]
+        """
+
+        return self.endpoint_ips
+
+
+def endpointReachability(
+    net: Mininet,
+    nodes: Union[list[Host], None] = None,
+    count: int = 3,
+    interval: float = 0.2,
+    timeout: float = 1,
+    until_reachable: bool = False,
+) -> dict[str, dict[str, dict[str, Any]]]:
+    """Ping the IP of every other node from every endpoint, all sources at
+    once.
+
+    Every node runs a single probe that sends from all its endpoints, see
+    :func:`probe.reach`, a node that is not a :class:`EndpointHost` is a
+    single endpoint.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param nodes: nodes to probe, all hosts if None, defaults to None
+    :type nodes: Union[list[Host], None], optional
+    :param count: echo requests sent by every endpoint to every destination,
+        defaults to 3
+    :type count: int, optional
+    :param interval: seconds between echo requests, defaults to 0.2
+    :type interval: float, optional
+    :param timeout: seconds to wait for replies after the last request,
+        defaults to 1
+    :type timeout: float, optional
+    :param until_reachable: every source stops as soon as all destinations
+        answered the last request of all its endpoints, defaults to False
+    :type until_reachable: bool, optional
+    :return: number of `endpoints` and of `reachable` endpoints, `sent`,
+        `received`, `loss` ratio and round-trip time summary in milliseconds of
+        every source and destination
+    :rtype: dict[str, dict[str, dict[str, Any]]]
+    """
+
+    nodes = [n for n in (nodes or net.hosts) if n.IP() is not None]
+    options = ["--count", str(count), "--interval", str(interval)]
+    options += ["--timeout", str(timeout)]
+    if until_reachable:
+        options.append("--until-reachable")
+
+    sources = {
+        src.name: (src.endpointIPs() if isinstance(src, EndpointHost) else [src.IP()])
+        for src in nodes
+    }
+    probes = {
+        src.name: startProbe(
+            src,
+            "reach",
+            *(dst.IP() for dst in nodes if dst is not src),
+            "--sources",
+            *sources[src.name],
+            *options,
+        )
+        for src in nodes
+    }
+
+    results: dict[str, dict[str, dict[str, Any]]] = {}
+    for src in nodes:
+        result = probeResult(probes[src.name], timeout=count * interval + timeout + 30)
+        results[src.name] = {}
+        for dst in nodes:
+            if dst is src:
+                continue
+            pings = [result[ip][dst.IP()] for ip in sources[src.name]]
+            sent = sum(p["sent"] for p in pings)
+            received = sum(p["received"] for p in pings)
+            results[src.name][dst.name] = {
+                "endpoints": len(pings),
+                "reachable": sum(1 for p in pings if p["received"]),
+                "sent": sent,
+                "received": received,
+                "loss": 1 - received / sent if sent else 1,
+                "rtt_ms": summarize([rtt for p in pings for rtt in p["rtt_ms"]]),
+            }
+    return results
+
+
+def printEndpointReachability(results: dict[str, dict[str, dict[str, Any]]]):
+    """Print reachable endpoints of every source and destination.
+
+    :param results: result of :func:`endpointReachability`
+    :type results: dict[str, dict[str, dict[str, Any]]]
+    """
+
+    print(f"{'pair':<16}{'endpoints':>10}{'reachable':>10}{'loss':>8}{'p99 ms':>9}")
+    for src, row in results.items():
+        for dst, r in row.items():
+            print(
+                f"{f'{src}->{dst}':<16}{r['endpoints']:>10}{r['reachable']:>10}"
+                f"{r['loss']:>8.1%}{r['rtt_ms']['p99']:>9.3f}"
+            )
@@ -0,0 +1,242 @@
+import json
+from typing import Any, Union
+
+from bfd import configureBFD, waitForBFD
+from endpoints import endpointReachability, printEndpointReachability
+from failure import FailureEvent, runFailureTrials
+from frrouter import FRRouter
+from latency import measureLatencyDistribution, printLatency
+from results import recordResult
+
+from mininet.net import Mininet
+
+
+def failover(
+    net: Mininet,
+    src: str = "h1",
+    dst: str = "h2",
+    link: str = "r1,r2",
+    events: Union[list[str], None] = None,
+    down: float = 5,
+    up: float = 20,
+    duration: float = 35,
+    rate: float = 1000,
+    trials: int = 1,
+    recovery: float = 10,
+    silent: bool = False,
+    kind: str = "failover",
+) -> dict[str, Any]:
+    """Measure the data-plane outage when a link or a node fails and recovers.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param src: name of sending host, defaults to "h1"
+    :type src: str, optional
+    :param dst: name of receiving host, defaults to "h2"
+    :type dst: str, optional
+    :param link: `node1,node2` link or `node` to fail, defaults to "r1,r2"
+    :type link: str, optional
+    :param events: `AT:ACTION:NODE[,NODE]` events, replace `link`, `down` and
+        `up` if given, defaults to None
+    :type events: Union[list[str], None], optional
+    :param down: second the link goes down, defaults to 5
+    :type down: float, optional
+    :param up: second the link comes back up, defaults to 20
+    :type up: float, optional
+    :param duration: seconds to send probes, defaults to 35
+    :type duration: float, optional
+    :param rate: probes per second, defaults to 1000
+    :type rate: float, optional
+    :param trials: number of trials, defaults to 1
+    :type trials: int, optional
+    :param recovery: seconds to wait between trials, defaults to 10
+    :type recovery: float, optional
+    :param silent: drop packets instead of taking interfaces down, so the
+        failure is not signaled to routers, defaults to False
+    :type silent: bool, optional
+    :param kind: kind of the record in the results file, defaults to
+        "failover"
+    :type kind: str, optional
+    :return: every trial and the summary across trials
+    :rtype: dict[str, Any]
+    """
+
+    fail, restore = ("cut", "mend") if silent else ("down", "up")
+    specs = events or [f"{down}:{fail}:{link}", f"{up}:{restore}:{link}"]
+    result = runFailureTrials(
+        net,
+        [FailureEvent.parse(spec) for spec in specs],
+        trials=trials,
+        recovery=recovery,
+        src=src,
+        dst=dst,
+        duration=duration,
+        rate=rate,
+    )
+    recordResult(net, kind, {"silent": silent, **result})
+
+    print("*** Failover summary (ms)")
+    for event in result["aggregate"]:
+        print(
+            f"{event['event']:>16}: outage {json.dumps(event['outage_ms'])}"
+            f"\n{'':>16}  FIB converged {json.dumps(event['fib_last_ms'])}"
+        )
+    return result
+
+
+def bfdFailover(
+    net: Mininet, silent: bool = True, **options
+) -> dict[str, dict[str, Any]]:
+    """Compare failover with and without BFD on a topo started with BFD.
+
+    BFD is disabled on every router for the first run and enabled again for
+    the second one. Failures are silent by default because routers detect
+    interfaces going down without BFD.
+
+    :param net: a Mininet instance built with BFD enabled
+    :type net: Mininet
+    :param silent: see :func:`failover`, defaults to True
+    :type silent: bool, optional
+    :param options: other options of :func:`failover`
+    :raises RuntimeError: if the topo does not enable BFD
+    :return: result of :func:`failover` without and with BFD
+    :rtype: dict[str, dict[str, Any]]
+    """
+
+    intervals = getattr(net.topo, "bfd", None)
+    routers = [n for n in net.hosts if isinstance(n, FRRouter) and "bfdd" in n.daemons]
+    if intervals is None or not routers:
+        raise RuntimeError("BFD is not enabled, start the topo with --bfd")
+
+    results = {}
+    for enable in (False, True):
+        print(f"*** {'Enabling' if enable else 'Disabling'} BFD")
+        for router in routers:
+            configureBFD(router, intervals, enable)
+        if enable and not waitForBFD(routers):
+            print("*** Some BFD sessions are not up")
+        key = "bfd" if enable else "no_bfd"
+        results[key] = failover(net, silent=silent, kind=f"failover_{key}", **options)
+    return results
+
+
+def latencyDistribution(
+    net: Mininet,
+    pairs: Union[list[str], None] = None,
+    rate: float = 1000,
+    duration: float = 10,
+    size: int = 64,
+    load_rate: float = 0,
+    load_size: int = 1400,
+) -> dict[str, Any]:
+    """Measure tail latency between hosts, optionally under background load.
+
+    Records are comparable across topos with the same host names, e.g.
+    `ospf`, `mpls` and `mpls-vpn` all connect `h1` and `h2`.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param pairs: `SRC,DST` node names, defaults to ["h1,h2"]
+    :type pairs: Union[list[str], None], optional
+    :param rate: probes per second of every pair, defaults to 1000
+    :type rate: float, optional
+    :param duration: seconds to send probes, defaults to 10
+    :type duration: float, optional
+    :param size: UDP payload size of probes in bytes, defaults to 64
+    :type size: int, optional
+    :param load_rate: packets per second of the background flow of every
+        pair, defaults to 0
+    :type load_rate: float, optional
+    :param load_size: UDP payload size of background packets, defaults to
+        1400
+    :type load_size: int, optional
+    :return: see :func:`latency.measureLatencyDistribution`
+    :rtype: dict[str, Any]
+    """
+
+    result = measureLatencyDistribution(
+        net,
+        [tuple(pair.split(",", 1)) for pair in pairs or ["h1,h2"]],
+        rate=rate,
+        duration=duration,
+        size=size,
+        load_rate=load_rate,
+        load_size=load_size,
+    )
+    recordResult(net, "latency", result)
+    printLatency(result)
+    return result
+
+
+def endpointReach(
+    net: Mininet,
+    count: int = 3,
+    interval: float = 0.2,
+    timeout: float = 1,
+    warmup: bool = True,
+) -> dict[str, Any]:
+    """Ping every other host from every endpoint of every host, see
+    :func:`endpoints.endpointReachability`.
+
+    :param net: a Mininet instance, e.g. built from `ospf-scale` with
+        `-o endpoints=5000`
+    :type net: Mininet
+    :param count: echo requests sent by every endpoint to every host,
+        defaults to 3
+    :type count: int, optional
+    :param interval: seconds between echo requests, defaults to 0.2
+    :type interval: float, optional
+    :param timeout: seconds to wait for replies after the last request,
+        defaults to 1
+    :type timeout: float, optional
+    :param warmup: sweep once before measuring, so that routers already
+        resolved every endpoint, defaults to True
+    :type warmup: bool, optional
+    :return: reachable endpoints and round-trip times of every pair of hosts
+    :rtype: dict[str, Any]
+    """
+
+    if warmup:
+        endpointReachability(net, count=5, interval=1, until_reachable=True)
+    result = endpointReachability(net, count=count, interval=interval, timeout=timeout)
+    recordResult(net, "endpoints", result)
+    printEndpointReachability(result)
+    return result
+
+
+def zeroTierBenchmark(net: Mininet, **options) -> dict[str, Any]:
+    """Measure throughput, latency and CPU of the ZeroTier overlay with and
+    without trusted paths against the underlay, see
+    :func:`zerotier_bench.benchmarkZeroTier`.
+
+    :param net: a Mininet instance built from a ZeroTier topo
+    :type net: Mininet
+    :param options: options of :func:`zerotier_bench.benchmarkZeroTier`
+    :return: measurements of every path
+    :rtype: dict[str, Any]
+    """
+
+    # Imported here, the ZeroTier client pulls in an HTTP library that other
+    # experiments do not need
+    from zerotier_bench import benchmarkZeroTier
+
+    results = benchmarkZeroTier(net, **options)
+    recordResult(net, "zerotier_bench", results)
+
+    print(f"{'path':<16}{'Mbit/s':>10}{'rtt ms':>9}  zerotier-one CPU %")
+    for name, result in results.items():
+        cpu = " ".join(f"{n}={p:.0f}" for n, p in result["cpu_percent"].items())
+        print(
+            f"{name:<16}{result['throughput']['bits_per_second'] / 1e6:>10.1f}"
+            f"{result['latency'].get('avg_ms', float('nan')):>9.3f}  {cpu}"
+        )
+    return results
+
+
+experiments = {
+    "failover": failover,
+    "bfd-failover": bfdFailover,
+    "latency": latencyDistribution,
+    "endpoints": endpointReach,
+    "zerotier-bench": zeroTierBenchmark,
+}
@@ -0,0 +1,291 @@
+import signal
+import threading
+import time
+from typing import Any, NamedTuple, Union
+
+from fib_monitor import FIBMonitor
+from frrouter import FRRouter
+from probe import closeFlow, probeResult, startProbe
+from results import summarize
+
+from mininet.net import Mininet
+
+# Action that undoes each action
+_RESTORE = {"down": "up", "up": "up", "cut": "mend", "mend": "mend"}
+
+
+class FailureEvent(NamedTuple):
+    """Take a link or a node down or up `at` seconds after the start.
+
+    "down" and "up" change the state of interfaces, so neighbors detect the
+    failure at once. "cut" and "mend" silently drop and restore every packet
+    received on the interfaces while they stay up, like a failed fiber behind
+    a media converter, so only protocol timers or BFD detect the failure.
+    """
+
+    at: float
+    action: str  # "down", "up", "cut" or "mend"
+    target: tuple[str, ...]  # (node,) or (node1, node2) for a link
+
+    @classmethod
+    def parse(cls, spec: str) -> "FailureEvent":
+        """Parse `AT:ACTION:NODE[,NODE]`, e.g. "5:down:r1,r2" for a link or
+        "5:down:r2" for a node.
+
+        :param spec: event specification
+        :type spec: str
+        :raises ValueError: if the specification is invalid
+        :return: the event
+        :rtype: FailureEvent
+        """
+
+        at, action, target = spec.split(":")
+        if action not in _RESTORE:
+            raise ValueError(f"invalid action {action} in {spec}")
+        names = tuple(target.split(","))
+        if not 1 <= len(names) <= 2:
+            raise ValueError(f"invalid target {target} in {spec}")
+        return cls(float(at), action, names)
+
+    def __str__(self) -> str:
+        return f"{self.at:g}:{self.action}:{','.join(self.target)}"
+
+
+class FailureScheduler:
+    """Execute failure events at given times.
+
+    A link event changes the state of every link between the two nodes, like
+    the `link` CLI command. A node event changes the state of every link of
+    the node, so neighbors see the node disappear.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param events: events to execute
+    :type events: list[FailureEvent]
+    """
+
+    def __init__(self, net: Mininet, events: list[FailureEvent]):
+        self.net = net
+        self.events = sorted(events)
+        self.executed: list[tuple[FailureEvent, float]] = []
+
+    def apply(self, event: FailureEvent):
+        """Execute an event now.
+
+        :param event: event to execute
+        :type event: FailureEvent
+        """
+
+        if len(event.target) == 2:
+            if event.action in ("down", "up"):
+                self.net.configLinkStatus(*event.target, event.action)
+                return
+            links = self.net.linksBetween(*self.net.get(*event.target))
+        else:
+            node = self.net.get(event.target[0])
+            links = [i.link for i in node.intfList() if i.link is not None]
+
+        for link in links:
+            for intf in (link.intf1, link.intf2):
+                if event.action in ("down", "up"):
+                    intf.ifconfig(event.action)
+                elif event.action == "cut":
+                    # The ingress hook leaves the root qdisc of TCLink alone
+                    intf.node.cmd(
+                        f"tc qdisc replace dev {intf} clsact"
+                        f" && tc filter add dev {intf} ingress matchall action drop"
+                    )
+                else:
+                    intf.node.cmd(f"tc qdisc del dev {intf} clsact")
+
+    def run(self, started_at: Union[float, None] = None):
+        """Execute every event at its time, blocking until the last one.
+
+        :param started_at: time events are relative to, now if None, defaults
+            to None
+        :type started_at: Union[float, None], optional
+        """
+
+        started_at = time.time() if started_at is None else started_at
+        for event in self.events:
+            delay = started_at + event.at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            executed_at = time.time()
+            self.apply(event)
+            self.executed.append((event, executed_at))
+
+    def restore(self):
+        """Bring every link and node touched by the events back up."""
+
+        for event in self.events:
+            self.apply(event._replace(action=_RESTORE[event.action]))
+
+
+def runFailureTrial(
+    net: Mininet,
+    events: list[FailureEvent],
+    src: str = "h1",
+    dst: str = "h2",
+    duration: float = 30,
+    rate: float = 1000,
+    port: int = 5001,
+) -> dict[str, Any]:
+    """Measure the data-plane outage caused by each failure event.
+
+    A sequence-numbered UDP flow is sent from `src` to `dst` while the events
+    are executed, and route changes of every router are recorded to correlate
+    outages with the control plane.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param events: events to execute
+    :type events: list[FailureEvent]
+    :param src: name of sending host, defaults to "h1"
+    :type src: str, optional
+    :param dst: name of receiving host, defaults to "h2"
+    :type dst: str, optional
+    :param duration: seconds to send probes, defaults to 30
+    :type duration: float, optional
+    :param rate: probes per second, defaults to 1000
+    :type rate: float, optional
+    :param port: UDP port of probes, defaults to 5001
+    :type port: int, optional
+    :return: per event outage and FIB changes, and counters of the flow
+    :rtype: dict[str, Any]
+    """
+
+    src_node, dst_node = net.get(src, dst)
+    routers = [n for n in net.hosts if isinstance(n, FRRouter)]
+    monitor = FIBMonitor(routers)
+    scheduler = FailureScheduler(net, events)
+
+    monitor.start()
+    receiver = startProbe(
+        dst_node, "flow-recv", "--port", str(port), "--rate", str(rate)
+    )
+    time.sleep(0.5)
+    sender = startProbe(
+        src_node,
+        "flow-send",
+        dst_node.IP(),
+        "--port",
+        str(port),
+        "--rate",
+        str(rate),
+        "--duration",
+        str(duration),
+    )
+    started_at = time.time()
+    runner = threading.Thread(target=scheduler.run, args=(started_at,))
+    runner.start()
+
+    sent = probeResult(sender, timeout=duration + 10)
+    runner.join()
+    # Let in-flight probes arrive
+    time.sleep(0.5)
+    receiver.send_signal(signal.SIGTERM)
+    flow = closeFlow(probeResult(receiver, timeout=10), sent)
+    monitor.stop()
+
+    fib_events = [e for events in monitor.events.values() for e in events]
+    executed = scheduler.executed
+    results = []
+    for i, (event, executed_at) in enumerate(executed):
+        until = executed[i + 1][1] if i + 1 < len(executed) else float("inf")
+        outage = next(
+            (
+                o
+                for o in flow["outages"]
+                if o["end"] > executed_at and o["start"] < until
+            ),
+            None,
+        )
+        changes = [e.time for e in fib_events if executed_at <= e.time < until]
+        result: dict[str, Any] = {
+            "event": str(event),
+            "executed_at": executed_at,
+            "outage_ms": 0,
+            "lost": 0,
+            "outage_start_ms": None,
+            "fib_changes": len(changes),
+            "fib_first_ms": None,
+            "fib_last_ms": None,
+            "fib_routers": sorted(
+                {e.router for e in fib_events if executed_at <= e.time < until}
+            ),
+        }
+        if outage is not None:
+            result["outage_ms"] = outage["duration_ms"]
+            result["lost"] = outage["lost"]
+            result["outage_start_ms"] = (outage["start"] - executed_at) * 1000
+        if changes:
+            result["fib_first_ms"] = (min(changes) - executed_at) * 1000
+            result["fib_last_ms"] = (max(changes) - executed_at) * 1000
+        results.append(result)
+
+    return {
+        "src": src,
+        "dst": dst,
+        "rate": rate,
+        "sent": sent["sent"],
+        "received": flow["received"],
+        "lost": flow["lost"],
+        "duplicates": flow["duplicates"],
+        "reordered": flow["reordered"],
+        "events": results,
+    }
+
+
+def runFailureTrials(
+    net: Mininet,
+    events: list[FailureEvent],
+    trials: int = 1,
+    recovery: float = 10,
+    **options,
+) -> dict[str, Any]:
+    """Repeat a failure trial and aggregate outages across trials.
+
+    Every link and node touched by the events is brought back up between
+    trials, then the network is given `recovery` seconds to reconverge.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param events: events to execute in every trial
+    :type events: list[FailureEvent]
+    :param trials: number of trials, defaults to 1
+    :type trials: int, optional
+    :param recovery: seconds to wait between trials, defaults to 10
+    :type recovery: float, optional
+    :param options: other options of :func:`runFailureTrial`
+    :return: every trial and, per event, the summary of outages and FIB
+        convergence across trials
+    :rtype: dict[str, Any]
+    """
+
+    results = []
+    for trial in range(trials):
+        if trial:
+            time.sleep(recovery)
+        print(f"*** Failure trial {trial + 1}/{trials}")
+        results.append(runFailureTrial(net, events, **options))
+        FailureScheduler(net, events).restore()
+
+    aggregate = []
+    for i, event in enumerate(sorted(events)):
+        per_trial = [r["events"][i] for r in results if i < len(r["events"])]
+        aggregate.append(
+            {
+                "event": str(event),
+                "outage_ms": summarize([e["outage_ms"] for e in per_trial]),
+                "lost": summarize([e["lost"] for e in per_trial]),
+                "fib_last_ms": summarize(
+                    [
+                        e["fib_last_ms"]
+                        for e in per_trial
+                        if e["fib_last_ms"] is not None
+                    ]
+                ),
+            }
+        )
+    return {"trials": results, "aggregate": aggregate}
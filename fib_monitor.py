@@ -0,0 +1,209 @@
+import errno
+import selectors
+import threading
+import time
+from typing import Any, NamedTuple, Union
+
+import netlink
+from frrouter import FRRouter
+from netns_traverse import netns
+from results import summarize
+
+
+class FIBEvent(NamedTuple):
+    """A route or MPLS label installed into or withdrawn from a kernel FIB."""
+
+    time: float
+    router: str
+    action: str  # "install", "replace" or "withdraw"
+    family: str  # "ipv4", "ipv6" or "mpls"
+    prefix: str
+    protocol: int
+
+
+class FIBMonitor:
+    """Timestamp every route and MPLS label zebra programs into the kernel.
+
+    One rtnetlink socket is subscribed to route notifications inside the
+    network namespace of each router, and a single thread reads all of them.
+    Routes owned by the kernel itself (connected, local, static) are ignored.
+
+    :param routers: routers to monitor
+    :type routers: list[FRRouter]
+    :param rcvbuf: receive buffer of each netlink socket, large enough to not
+        overrun when zebra installs a full table at once, defaults to 32 MiB
+    :type rcvbuf: int, optional
+    """
+
+    # RTPROT_UNSPEC, RTPROT_REDIRECT, RTPROT_KERNEL, RTPROT_BOOT, RTPROT_STATIC
+    _KERNEL_PROTOCOLS = (0, 1, 2, 3, 4)
+
+    _GROUPS = (
+        netlink.RTNLGRP_IPV4_ROUTE,
+        netlink.RTNLGRP_IPV6_ROUTE,
+        netlink.RTNLGRP_MPLS_ROUTE,
+    )
+
+    def __init__(self, routers: list[FRRouter], rcvbuf: int = 32 << 20):
+        self.routers = routers
+        self.rcvbuf = rcvbuf
+        self.events: dict[str, list[FIBEvent]] = {r.name: [] for r in routers}
+        self.overruns: dict[str, int] = {r.name: 0 for r in routers}
+        self.started_at = 0.0
+        self.marked_at: Union[float, None] = None
+        self._selector = selectors.DefaultSelector()
+        self._stopped = threading.Event()
+        self._thread: Union[threading.Thread, None] = None
+
+    def start(self):
+        """Subscribe to route notifications and start recording."""
+
+        for router in self.routers:
+            with netns(router.pid):
+                sock = netlink.openRouteSocket(FIBMonitor._GROUPS, self.rcvbuf)
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ, router.name)
+
+        self.started_at = time.time()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop recording and close netlink sockets."""
+
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fileobj)
+            key.fileobj.close()  # type: ignore
+
+    def mark(self):
+        """Mark the moment a route change is triggered.
+
+        Latencies in :meth:`report` are measured from the last mark, e.g. the
+        moment a link is taken down or a batch of routes is injected.
+        """
+
+        self.marked_at = time.time()
+
+    def reset(self):
+        """Forget recorded events."""
+
+        for name in self.events:
+            self.events[name] = []
+            self.overruns[name] = 0
+        self.started_at = time.time()
+        self.marked_at = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                self._read(key.fileobj, key.data)  # type: ignore
+
+    def _read(self, sock, router_name: str):
+        events = self.events[router_name]
+        while True:
+            try:
+                data = sock.recv(1 << 20)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # The kernel dropped notifications because the socket buffer
+                # was full.
+                if e.errno == errno.ENOBUFS:
+                    self.overruns[router_name] += 1
+                    continue
+                raise
+
+            now = time.time()
+            for msg_type, flags, payload in netlink.parseMessages(data):
+                if msg_type not in (netlink.RTM_NEWROUTE, netlink.RTM_DELROUTE):
+                    continue
+                route = netlink.parseRoute(payload)
+                if (
+                    route["protocol"] in FIBMonitor._KERNEL_PROTOCOLS
+                    or route["table"] == netlink.RT_TABLE_LOCAL
+                ):
+                    continue
+                action = (
+                    "withdraw"
+                    if msg_type == netlink.RTM_DELROUTE
+                    else "replace" if flags & netlink.NLM_F_REPLACE else "install"
+                )
+                events.append(
+                    FIBEvent(
+                        now,
+                        router_name,
+                        action,
+                        route["family"],
+                        route["prefix"],
+                        route["protocol"],
+                    )
+                )
+
+    def installRate(
+        self, router_name: str, interval: float = 0.1
+    ) -> list[tuple[float, float, float]]:
+        """Compute the install and withdrawal rate curve of a router.
+
+        :param router_name: name of router
+        :type router_name: str
+        :param interval: width of each bucket in seconds, defaults to 0.1
+        :type interval: float, optional
+        :return: list of (seconds since start or mark, installs per second,
+            withdrawals per second)
+        :rtype: list[tuple[float, float, float]]
+        """
+
+        events = self.events[router_name]
+        if not events:
+            return []
+
+        origin = self.marked_at if self.marked_at is not None else self.started_at
+        buckets: dict[int, list[int]] = {}
+        for event in events:
+            if event.time < origin:
+                continue
+            bucket = buckets.setdefault(int((event.time - origin) / interval), [0, 0])
+            bucket[event.action == "withdraw"] += 1
+
+        last = max(buckets, default=-1)
+        return [
+            (
+                round(i * interval, 6),
+                buckets.get(i, [0, 0])[0] / interval,
+                buckets.get(i, [0, 0])[1] / interval,
+            )
+            for i in range(last + 1)
+        ]
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        """Summarize programming activity of every router.
+
+        Latency of an event is the time between the last :meth:`mark` (or the
+        start of recording) and the moment the kernel notified the change.
+
+        :return: per router counts, peak rates and latency percentiles in
+            milliseconds
+        :rtype: dict[str, dict[str, Any]]
+        """
+
+        origin = self.marked_at if self.marked_at is not None else self.started_at
+        report = {}
+        for name, events in self.events.items():
+            events = [e for e in events if e.time >= origin]
+            curve = self.installRate(name)
+            report[name] = {
+                "installs": sum(e.action != "withdraw" for e in events),
+                "withdrawals": sum(e.action == "withdraw" for e in events),
+                "mpls": sum(e.family == "mpls" for e in events),
+                "overruns": self.overruns[name],
+                "peak_install_rate": max((c[1] for c in curve), default=0),
+                "peak_withdraw_rate": max((c[2] for c in curve), default=0),
+                "latency_ms": summarize([(e.time - origin) * 1000 for e in events]),
+            }
+        return report
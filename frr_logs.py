@@ -0,0 +1,319 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, NamedTuple, Union
+
+from frrouter import FRRouter
+from profiles import routerInstances
+
+EVENTS_PATH = "frr-events.jsonl"
+
+# 2023/05/10 10:11:12.345678 OSPF: [AB12C-DE34F][EC 100663299] message
+_LINE_PATTERN = re.compile(
+    r"^(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?) (\S+?): "
+    r"(?:\[[\w-]+\](?:\[EC \d+\])? ?)?(.*)$"
+)
+
+# Tags of daemons in log lines, other tags are kept in lower case, e.g. "zebra"
+_DAEMON_TAGS = {
+    "BFD": "bfdd",
+    "BGP": "bgpd",
+    "ISIS": "isisd",
+    "LDP": "ldpd",
+    "OSPF": "ospfd",
+    "OSPF6": "ospf6d",
+    "STATIC": "staticd",
+}
+
+# Kind of event, daemon logging it, and pattern whose groups are its fields
+_EVENT_PATTERNS = (
+    (
+        "ospf_adjacency",
+        "ospfd",
+        re.compile(
+            r"AdjChg: Nbr (?P<neighbor>[^\s(]+)(?:\(\S*\))? on (?P<intf>\S+?):?"
+            r" (?P<old>\S+) -> (?P<new>\S+)(?: \((?P<reason>.*)\))?"
+        ),
+    ),
+    (
+        "ospf_spf_scheduled",
+        "ospfd",
+        re.compile(r"SPF: Scheduled in (?P<delay_ms>\d+) msec"),
+    ),
+    (
+        "ospf_spf",
+        "ospfd",
+        re.compile(r"SPF runtime: (?P<sec>\d+) sec (?P<usec>\d+) usec"),
+    ),
+    (
+        "bgp_state",
+        "bgpd",
+        re.compile(
+            r"%ADJCHANGE: neighbor (?P<neighbor>[^\s(]+)(?:\(\S*\))?"
+            r"(?: in vrf (?P<vrf>\S+))? (?P<state>Up|Down)(?: (?P<reason>.*))?"
+        ),
+    ),
+    (
+        "bgp_fsm",
+        "bgpd",
+        re.compile(
+            r"(?P<neighbor>\S+) (?:fd -?\d+ )?went from (?P<old>\w+)"
+            r" to (?P<new>\w+)"
+        ),
+    ),
+    (
+        "ldp_neighbor",
+        "ldpd",
+        re.compile(
+            r"lsr-id (?P<neighbor>[\d.]+),? event (?P<event>\S+?),?"
+            r" state (?P<old>\S+) -> (?P<new>\S+)"
+        ),
+    ),
+)
+
+# Statement of routing instances and commands that log neighbor changes, which
+# are off by default: no ospf_adjacency or bgp_state event without them
+LOG_COMMANDS = {
+    "ospfd": ("router ospf", ("log-adjacency-changes detail",)),
+    "bgpd": ("router bgp", ("bgp log-neighbor-changes",)),
+}
+
+# Enable log messages of SPF runs and FSM transitions, logged at debug level
+DEBUG_COMMANDS = {
+    "ospfd": ("debug ospf event",),
+    "bgpd": ("debug bgp neighbor-events",),
+    "ldpd": ("debug mpls ldp event",),
+}
+
+
+class LogEvent(NamedTuple):
+    """A line logged by a FRRouting daemon."""
+
+    time: float
+    router: str
+    daemon: str
+    kind: str  # "log" if the line matches no known event
+    message: str
+    fields: dict[str, str]
+
+
+def parseLine(router: str, line: str) -> Union[LogEvent, None]:
+    """Parse a line of a FRRouting log file.
+
+    :param router: name of router that logged the line
+    :type router: str
+    :param line: line without the trailing newline
+    :type line: str
+    :return: the event, None if the line has no timestamp, e.g. a continued
+        backtrace
+    :rtype: Union[LogEvent, None]
+    """
+
+    match = _LINE_PATTERN.match(line)
+    if match is None:
+        return None
+    timestamp, tag, message = match.groups()
+    timestamp_format = "%Y/%m/%d %H:%M:%S" + (".%f" if "." in timestamp else "")
+    logged_at = datetime.strptime(timestamp, timestamp_format).timestamp()
+    daemon = _DAEMON_TAGS.get(tag, tag.lower())
+
+    for kind, kind_daemon, pattern in _EVENT_PATTERNS:
+        if kind_daemon != daemon:
+            continue
+        event_match = pattern.search(message)
+        if event_match is not None:
+            fields = {k: v for k, v in event_match.groupdict().items() if v}
+            return LogEvent(logged_at, router, daemon, kind, message, fields)
+    return LogEvent(logged_at, router, daemon, "log", message, {})
+
+
+class FRRLogPipeline:
+    """Stream the logs of FRRouting daemons of many routers as typed events.
+
+    Every router logs to one file per pathspace (see :class:`FRRouter`), and a
+    single thread follows all of them. Lines are parsed into
+    :class:`LogEvent`, appended to a JSON Lines file, and kept in a bounded
+    buffer for queries. Daemons write to disk whatever the pace of the thread,
+    so no event is lost under load, the thread only lags behind. Only the
+    buffer forgets the oldest events when it is full, the file keeps them all.
+
+    :param routers: routers to follow
+    :type routers: list[FRRouter]
+    :param path: path of the JSON Lines file, None to only buffer events,
+        defaults to EVENTS_PATH
+    :type path: Union[str, None], optional
+    :param maxlen: size of the buffer, defaults to 100000
+    :type maxlen: int, optional
+    :param debug: enable debug messages of SPF runs and FSM transitions, see
+        DEBUG_COMMANDS, defaults to False
+    :type debug: bool, optional
+    :param log_changes: log neighbor changes of every OSPF and BGP instance,
+        see LOG_COMMANDS, defaults to True
+    :type log_changes: bool, optional
+    """
+
+    def __init__(
+        self,
+        routers: list[FRRouter],
+        path: Union[str, None] = EVENTS_PATH,
+        maxlen: int = 100000,
+        debug: bool = False,
+        log_changes: bool = True,
+    ):
+        self.routers = routers
+        self.path = path
+        self.debug = debug
+        self.log_changes = log_changes
+        self.buffer: deque[LogEvent] = deque(maxlen=maxlen)
+        self.counts: dict[str, int] = {}
+        self.evicted = 0
+        self._files: dict[str, Any] = {}
+        self._partial: dict[str, str] = {}
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread: Union[threading.Thread, None] = None
+
+    def start(self):
+        """Enable logging of neighbor changes and debug messages, then follow
+        log files from their current end and start streaming."""
+
+        for router in self.routers:
+            commands: list[str] = []
+            if self.log_changes:
+                for daemon, (statement, log_commands) in LOG_COMMANDS.items():
+                    if daemon in router.daemons:
+                        for instance in routerInstances(router, statement):
+                            commands += [instance, *log_commands, "exit"]
+            if self.debug:
+                commands += [
+                    c
+                    for daemon, debug_commands in DEBUG_COMMANDS.items()
+                    if daemon in router.daemons
+                    for c in debug_commands
+                ]
+            if commands:
+                router.vtysh("configure terminal", *commands)
+            file = open(router.log_file, errors="replace")
+            file.seek(0, os.SEEK_END)
+            self._files[router.name] = file
+            self._partial[router.name] = ""
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Read what is left in log files and stop streaming."""
+
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+
+    def _run(self):
+        output = open(self.path, "a") if self.path is not None else None
+        try:
+            while True:
+                # Read once more after stop() so that nothing logged before
+                # is left behind
+                stopping = self._stopped.is_set()
+                events = [e for name in self._files for e in self._read(name)]
+                if events:
+                    self._publish(events, output)
+                elif stopping:
+                    return
+                else:
+                    time.sleep(0.05)
+        finally:
+            if output is not None:
+                output.close()
+
+    def _read(self, router_name: str) -> list[LogEvent]:
+        data = self._files[router_name].read(1 << 20)
+        if not data:
+            return []
+        lines = (self._partial[router_name] + data).split("\n")
+        self._partial[router_name] = lines.pop()
+        events = (parseLine(router_name, line) for line in lines)
+        return [e for e in events if e is not None]
+
+    def _publish(self, events: list[LogEvent], output):
+        if output is not None:
+            output.writelines(json.dumps(e._asdict()) + "\n" for e in events)
+            output.flush()
+        with self._condition:
+            maxlen = self.buffer.maxlen or 0
+            self.evicted += max(len(self.buffer) + len(events) - maxlen, 0)
+            self.buffer.extend(events)
+            for event in events:
+                self.counts[event.kind] = self.counts.get(event.kind, 0) + 1
+            self._condition.notify_all()
+
+    def events(
+        self,
+        kinds: Union[tuple[str, ...], None] = None,
+        routers: Union[tuple[str, ...], None] = None,
+        since: float = 0,
+    ) -> list[LogEvent]:
+        """Get buffered events.
+
+        :param kinds: only events of these kinds, all if None, defaults to None
+        :type kinds: Union[tuple[str, ...], None], optional
+        :param routers: only events of these routers, all if None, defaults to
+            None
+        :type routers: Union[tuple[str, ...], None], optional
+        :param since: only events logged at or after this time, defaults to 0
+        :type since: float, optional
+        :return: events in order of arrival
+        :rtype: list[LogEvent]
+        """
+
+        with self._condition:
+            return [
+                e
+                for e in self.buffer
+                if e.time >= since
+                and (kinds is None or e.kind in kinds)
+                and (routers is None or e.router in routers)
+            ]
+
+    def waitFor(
+        self,
+        predicate: Callable[[LogEvent], bool],
+        timeout: float = 60,
+        since: float = 0,
+    ) -> Union[LogEvent, None]:
+        """Wait for an event, e.g. the last adjacency of a convergence::
+
+            pipeline.waitFor(
+                lambda e: e.kind == "ospf_adjacency" and e.fields["new"] == "Full",
+                since=failed_at,
+            )
+
+        :param predicate: condition the event must satisfy
+        :type predicate: Callable[[LogEvent], bool]
+        :param timeout: maximum time to wait in seconds, defaults to 60
+        :type timeout: float, optional
+        :param since: only events logged at or after this time, defaults to 0
+        :type since: float, optional
+        :return: the first matching event, None on timeout
+        :rtype: Union[LogEvent, None]
+        """
+
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                for event in self.buffer:
+                    if event.time >= since and predicate(event):
+                        return event
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
@@ -0,0 +1,375 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Union
+
+import netlink
+from frrouter import FRRouter
+from netns_traverse import netns
+
+_RUN_DIR = "/var/run/frr"
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def daemonPID(router: FRRouter, daemon: str) -> Union[int, None]:
+    """Get PID of a FRRouting daemon from its pid file.
+
+    Daemons started with a pathspace write their pid file to
+    `/var/run/frr/<pathspace>/<daemon>.pid`.
+
+    :param router: router running the daemon
+    :type router: FRRouter
+    :param daemon: name of daemon, e.g. "ospfd"
+    :type daemon: str
+    :return: PID of daemon, `None` if it is not running
+    :rtype: Union[int, None]
+    """
+
+    try:
+        with open(f"{_RUN_DIR}/{router.netns}/{daemon}.pid") as file:
+            return int(file.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def processUsage(pid: int) -> dict[str, float]:
+    """Get CPU time and resident memory of a process.
+
+    Reads `/proc/<pid>/stat` directly, so it is cheap enough to be called for
+    hundreds of processes on a short interval.
+
+    :param pid: PID of process
+    :type pid: int
+    :return: `cpu_seconds` (user + system) and `rss_bytes`, empty if the
+        process does not exist
+    :rtype: dict[str, float]
+    """
+
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            stat = file.read()
+    except OSError:
+        return {}
+
+    # The second field (comm) may contain spaces, fields after it are fixed.
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS,
+        "rss_bytes": int(fields[21]) * _PAGE_SIZE,
+    }
+
+
+def daemonUsage(router: FRRouter, daemon: str) -> dict[str, float]:
+    """Get CPU time and resident memory of a FRRouting daemon, see
+    :func:`processUsage`.
+
+    :param router: router running the daemon
+    :type router: FRRouter
+    :param daemon: name of daemon, e.g. "ospfd"
+    :type daemon: str
+    :return: `cpu_seconds` and `rss_bytes`, empty if the daemon is not running
+    :rtype: dict[str, float]
+    """
+
+    pid = daemonPID(router, daemon)
+    return {} if pid is None else processUsage(pid)
+
+
+def ospfStats(router: FRRouter) -> dict[str, Any]:
+    """Collect SPF and LSDB statistics of ospfd.
+
+    :param router: router running ospfd
+    :type router: FRRouter
+    :return: SPF run count, last SPF duration, LSDB size per area and in total,
+        and ospfd CPU/memory usage
+    :rtype: dict[str, Any]
+    """
+
+    ospf = router.showJSON("show ip ospf")
+    areas = ospf.get("areas", {})
+    lsdb = {area: info.get("lsaNumber", 0) for area, info in areas.items()}
+    externals = ospf.get("lsaExternalCounter", 0)
+    return {
+        "spf_runs": sum(info.get("spfExecutedCounter", 0) for info in areas.values()),
+        "spf_last_duration_ms": ospf.get("spfLastDurationMsecs"),
+        "abr": len(areas) > 1,
+        "lsdb": lsdb,
+        "lsdb_total": sum(lsdb.values()) + externals,
+        "external_lsas": externals,
+        **daemonUsage(router, "ospfd"),
+    }
+
+
+def mplsTableSize(router: FRRouter) -> int:
+    """Count entries of the kernel MPLS label table of a router.
+
+    :param router: router to inspect
+    :type router: FRRouter
+    :return: number of MPLS routes
+    :rtype: int
+    """
+
+    with netns(router.pid):
+        sock = netlink.openRouteSocket()
+    with sock:
+        return len(netlink.dumpRoutes(sock, netlink.AF_MPLS))
+
+
+def ldpStats(router: FRRouter) -> dict[str, Any]:
+    """Collect label binding statistics of ldpd.
+
+    :param router: router running ldpd
+    :type router: FRRouter
+    :return: number of FECs with a local binding, number of remote bindings,
+        number of operational neighbors, kernel MPLS table size and ldpd
+        CPU/memory usage
+    :rtype: dict[str, Any]
+    """
+
+    bindings = router.showJSON("show mpls ldp binding")
+    bindings = bindings.get("bindings", bindings)
+    if isinstance(bindings, dict):
+        bindings = list(bindings.values())
+    neighbors = router.showJSON("show mpls ldp neighbor")
+    neighbors = neighbors.get("neighbors", neighbors)
+    if isinstance(neighbors, dict):
+        neighbors = list(neighbors.values())
+
+    return {
+        "fecs": len({b.get("prefix") for b in bindings}),
+        "remote_bindings": sum(
+            b.get("remoteLabel") not in (None, "-") for b in bindings
+        ),
+        "neighbors": sum(n.get("state") == "OPERATIONAL" for n in neighbors),
+        "mpls_routes": mplsTableSize(router),
+        **daemonUsage(router, "ldpd"),
+    }
+
+
+def bgpStats(router: FRRouter) -> dict[str, Any]:
+    """Collect session and update statistics of bgpd in the default VRF.
+
+    :param router: router running bgpd
+    :type router: FRRouter
+    :return: number of configured sessions, established sessions and route
+        reflector clients, accepted IPv4 and VPN-IPv4 prefixes, updates sent
+        and received over all sessions, and bgpd CPU/memory usage
+    :rtype: dict[str, Any]
+    """
+
+    families = {"ipv4Unicast": "ipv4_prefixes", "ipv4Vpn": "vpnv4_prefixes"}
+    stats = {
+        "sessions": 0,
+        "established": 0,
+        "clients": 0,
+        **{key: 0 for key in families.values()},
+        "updates_sent": 0,
+        "updates_received": 0,
+    }
+    for neighbor in router.showJSON("show bgp neighbors").values():
+        if not isinstance(neighbor, dict):
+            continue
+        stats["sessions"] += 1
+        stats["established"] += neighbor.get("bgpState") == "Established"
+        messages = neighbor.get("messageStats", {})
+        stats["updates_sent"] += messages.get("updatesSent", 0)
+        stats["updates_received"] += messages.get("updatesRecv", 0)
+        address_families = neighbor.get("addressFamilyInfo", {})
+        stats["clients"] += any(
+            af.get("routeReflectorClient") for af in address_families.values()
+        )
+        for family, key in families.items():
+            af = address_families.get(family, {})
+            stats[key] += af.get("acceptedPrefixCounter", 0)
+
+    return {**stats, **daemonUsage(router, "bgpd")}
+
+
+class ChangeRecorder:
+    """Poll statistics of routers in the background and remember when they
+    last changed, e.g. while another protocol is settling. The first poll is
+    the reference, it is not a change.
+
+    Pass the stopped recorder to :func:`waitUntilSettled` to go on waiting
+    from its last poll.
+
+    :param routers: routers to poll
+    :type routers: list[FRRouter]
+    :param collect: function that collects statistics of a router
+    :type collect: Callable[[FRRouter], dict[str, Any]]
+    :param keys: statistics whose changes are recorded
+    :type keys: tuple[str, ...]
+    :param interval: seconds between polls, defaults to 1
+    :type interval: float, optional
+    """
+
+    def __init__(
+        self,
+        routers: list[FRRouter],
+        collect: Callable[[FRRouter], dict[str, Any]],
+        keys: tuple[str, ...],
+        interval: float = 1,
+    ):
+        self.routers = routers
+        self.collect = collect
+        self.keys = keys
+        self.interval = interval
+        self.previous: Union[dict[str, list[Any]], None] = None
+        self.changed_at = time.time()
+        self._stopped = threading.Event()
+        self._thread: Union[threading.Thread, None] = None
+
+    def start(self):
+        """Start polling, changes are measured from now."""
+
+        self.previous, self.changed_at = None, time.time()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling."""
+
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            current = _keyValues(self.routers, self.collect, self.keys)[1]
+            if self.previous is not None and current != self.previous:
+                self.changed_at = time.time()
+            self.previous = current
+
+
+def _keyValues(
+    routers: list[FRRouter],
+    collect: Callable[[FRRouter], dict[str, Any]],
+    keys: tuple[str, ...],
+) -> tuple[dict[str, dict[str, Any]], dict[str, list[Any]]]:
+    """Collect statistics of routers, and the values of `keys` of each."""
+
+    stats = {router.name: collect(router) for router in routers}
+    return stats, {name: [s.get(k) for k in keys] for name, s in stats.items()}
+
+
+def waitUntilSettled(
+    routers: list[FRRouter],
+    collect: Callable[[FRRouter], dict[str, Any]],
+    keys: tuple[str, ...],
+    timeout: float = 300,
+    settle: int = 3,
+    interval: float = 1,
+    recorder: Union[ChangeRecorder, None] = None,
+) -> tuple[dict[str, dict[str, Any]], float]:
+    """Poll statistics of routers until some of them stop changing.
+
+    :param routers: routers to poll
+    :type routers: list[FRRouter]
+    :param collect: function that collects statistics of a router
+    :type collect: Callable[[FRRouter], dict[str, Any]]
+    :param keys: statistics that must not change
+    :type keys: tuple[str, ...]
+    :param timeout: maximum time to wait in seconds, defaults to 300
+    :type timeout: float, optional
+    :param settle: number of consecutive polls without change, defaults to 3
+    :type settle: int, optional
+    :param interval: seconds between polls, defaults to 1
+    :type interval: float, optional
+    :param recorder: stopped recorder of the same statistics, waiting goes on
+        from its last poll and time of the last change, defaults to None
+    :type recorder: Union[ChangeRecorder, None], optional
+    :return: last statistics of every router and the time of the last change
+    :rtype: tuple[dict[str, dict[str, Any]], float]
+    """
+
+    deadline = time.time() + timeout
+    stats: dict[str, dict[str, Any]] = {}
+    previous, unchanged, changed_at = None, 0, time.time()
+    if recorder is not None and recorder.previous is not None:
+        previous, changed_at = recorder.previous, recorder.changed_at
+    while unchanged < settle and time.time() < deadline:
+        time.sleep(interval)
+        stats, current = _keyValues(routers, collect, keys)
+        if current == previous:
+            unchanged += 1
+        else:
+            unchanged, changed_at = 0, time.time()
+        previous = current
+    return stats, changed_at
+
+
+def waitForOSPF(
+    routers: list[FRRouter], timeout: float = 300
+) -> dict[str, dict[str, Any]]:
+    """Wait until the LSDB of every router stops changing.
+
+    :param routers: routers running ospfd
+    :type routers: list[FRRouter]
+    :param timeout: maximum time to wait in seconds, defaults to 300
+    :type timeout: float, optional
+    :return: statistics of every router, see :func:`ospfStats`
+    :rtype: dict[str, dict[str, Any]]
+    """
+
+    return waitUntilSettled(routers, ospfStats, ("lsdb_total",), timeout)[0]
+
+
+def printOSPFStats(stats: dict[str, dict[str, Any]]):
+    """Print OSPF statistics of routers as a table.
+
+    :param stats: statistics of every router, see :func:`ospfStats`
+    :type stats: dict[str, dict[str, Any]]
+    """
+
+    print(
+        f"{'router':<10}{'areas':>6}{'lsdb':>8}{'external':>10}"
+        f"{'spf runs':>10}{'spf ms':>8}{'rss MiB':>9}"
+    )
+    for name, s in stats.items():
+        print(
+            f"{name:<10}{len(s['lsdb']):>6}{s['lsdb_total']:>8}"
+            f"{s['external_lsas']:>10}{s['spf_runs']:>10}"
+            f"{s['spf_last_duration_ms'] or 0:>8}"
+            f"{s.get('rss_bytes', 0) / 2**20:>9.1f}"
+        )
+
+
+def printLDPStats(stats: dict[str, dict[str, Any]]):
+    """Print LDP statistics of routers as a table.
+
+    :param stats: statistics of every router, see :func:`ldpStats`
+    :type stats: dict[str, dict[str, Any]]
+    """
+
+    print(
+        f"{'router':<10}{'neighbors':>10}{'fecs':>8}{'remote':>8}"
+        f"{'mpls routes':>12}{'rss MiB':>9}"
+    )
+    for name, s in stats.items():
+        print(
+            f"{name:<10}{s['neighbors']:>10}{s['fecs']:>8}{s['remote_bindings']:>8}"
+            f"{s['mpls_routes']:>12}{s.get('rss_bytes', 0) / 2**20:>9.1f}"
+        )
+
+
+def printBGPStats(stats: dict[str, dict[str, Any]]):
+    """Print BGP statistics of routers as a table.
+
+    :param stats: statistics of every router, see :func:`bgpStats`
+    :type stats: dict[str, dict[str, Any]]
+    """
+
+    print(
+        f"{'router':<10}{'sessions':>9}{'up':>6}{'clients':>8}{'ipv4':>8}"
+        f"{'vpnv4':>8}{'upd sent':>10}{'upd recv':>10}{'rss MiB':>9}"
+    )
+    for name, s in stats.items():
+        print(
+            f"{name:<10}{s['sessions']:>9}{s['established']:>6}{s['clients']:>8}"
+            f"{s['ipv4_prefixes']:>8}{s['vpnv4_prefixes']:>8}"
+            f"{s['updates_sent']:>10}{s['updates_received']:>10}"
+            f"{s.get('rss_bytes', 0) / 2**20:>9.1f}"
+        )
@@ -1,6 +1,9 @@
+import json
+import os
 from random import randint
-from subprocess import call
-from typing import cast
+from subprocess import call, check_output, run
+from tempfile import NamedTemporaryFile
+from typing import Any, Union, cast
 
 from mininet.node import Node
 
@@ -20,15 +23,43 @@ class FRRouter(Node):
     :type commands: tuple[str,...], optional
     :param vrfs: vrf and list of enslaved interfaces, default to None
     :type vrfs: dict[str, list[str]], optional
+    :param netlink_batch: size of zebra netlink batch buffer and the threshold
+        at which it is flushed to the kernel, in bytes, default to None (FRR
+        default)
+    :type netlink_batch: tuple[int, int], optional
+    :param ip_commands: `ip` commands (without the leading `ip`) executed in one
+        `ip -batch` call before FRRouting starts, e.g. to add thousands of
+        loopback addresses or dummy interfaces, default to None
+    :type ip_commands: tuple[str,...], optional
+    :param platform_labels: size of the kernel MPLS label table, only used if
+        ldpd is enabled, default to 100000
+    :type platform_labels: int, optional
+    :param srv6: enable IPv6 forwarding and SRv6 processing, default to False
+    :type srv6: bool, optional
     """
 
     _BASE_PATHSPACE = "/etc/frr"
+    _LOG_FOLDER = "/var/log/frr"
+    _FRR_RELOAD = "/usr/lib/frr/frr-reload.py"
 
     def __init__(self, name: str, inNamespace=True, **params):
         super().__init__(name, inNamespace, **params)
         self.daemons = cast(tuple[str, ...], params.get("daemons", ()))
-        self.netns = f"{name}-{randint(0, 1000):03}"
+        # Labs run by runner.py share the process table of the host, so their
+        # pathspaces are named after the instance
+        instance = os.environ.get("LAB_INSTANCE")
+        self.netns = (
+            f"{name}-{instance}" if instance else f"{name}-{randint(0, 1000):03}"
+        )
         self.vrfs = cast(dict[str, list[str]], params.get("vrfs", {}))
+        self.netlink_batch = cast(
+            Union[tuple[int, int], None], params.get("netlink_batch")
+        )
+        self.ip_commands = cast(tuple[str, ...], params.get("ip_commands", ()))
+        self.platform_labels = cast(int, params.get("platform_labels", 100000))
+        self.srv6 = cast(bool, params.get("srv6", False))
+        # Every daemon of the pathspace logs to this file, see frr_logs.py
+        self.log_file = f"{FRRouter._LOG_FOLDER}/{self.netns}.log"
 
     def config(self, **params):
         # This method will be called while Mininet is being initiated.
@@ -56,15 +87,30 @@ class FRRouter(Node):
             for intf in self.vrfs[vrf]:
                 self.cmd(f"ip link set dev {intf} master {vrf}")
 
+        # Before `ip_commands`, which may add SRv6 routes
+        if self.srv6:
+            self.setSRv6("lo", *self.intfNames())
+
+        # Spawning one `ip` process per address does not scale to thousands
+        # of addresses, hand all of them to a single `ip -batch` instead.
+        if self.ip_commands:
+            with NamedTemporaryFile("w", suffix=".batch") as batch:
+                batch.write("\n".join(self.ip_commands) + "\n")
+                batch.flush()
+                self.cmd(f"ip -force -batch {batch.name}")
+
         # Enable MPLS Label processing on all interfaces
         if self.daemons.count("ldpd"):
-            self.cmd("sysctl net.mpls.platform_labels=100000")
-            self.cmd("sysctl net.mpls.conf.lo.input=1")
-            for intf in self.intfNames():
-                self.cmd(f"sysctl net.mpls.conf.{intf}.input=1")
+            self.setMPLS(self.platform_labels, "lo", *self.intfNames())
 
         # Start and config FRRouting
         self._startFRRouting()
+        if self.netlink_batch is not None:
+            self.vtysh(
+                "configure terminal",
+                "zebra kernel netlink batch-tx-buf"
+                f" {self.netlink_batch[0]} {self.netlink_batch[1]}",
+            )
         vtysh_commands = params.get("commands")
         if vtysh_commands is not None:
             self.vtysh(*vtysh_commands)
@@ -77,13 +123,53 @@ class FRRouter(Node):
         # TODO: Remove VRFs?
 
         if self.daemons.count("ldpd"):
-            self.cmd("sysctl net.mpls.platform_labels=0")
-            self.cmd("sysctl net.mpls.conf.lo.input=0")
-            for intf in self.intfList():
-                self.cmd(f"sysctl net.mpls.conf.{intf}.input=0")
+            self.setMPLS(0, "lo", *self.intfNames(), enable=False)
+
+        if self.srv6:
+            self.setSRv6("lo", *self.intfNames(), enable=False)
 
         super().terminate()
 
+    def setMPLS(self, platform_labels: int, *intfs: str, enable: bool = True):
+        """Size the MPLS label table and toggle label processing on interfaces.
+
+        All settings are written by a single `sysctl` call, so it stays cheap
+        for routers with many interfaces.
+
+        :param platform_labels: size of the kernel MPLS label table
+        :type platform_labels: int
+        :param intfs: interfaces to enable/disable label processing
+        :type intfs: tuple[str,...]
+        :param enable: enable label processing?, defaults to True
+        :type enable: bool, optional
+        """
+
+        settings = [f"net.mpls.platform_labels={platform_labels}"]
+        settings += [f"net.mpls.conf.{intf}.input={int(enable)}" for intf in intfs]
+        self.cmd("sysctl --write " + " ".join(settings))
+
+    def setSRv6(self, *intfs: str, enable: bool = True):
+        """Toggle IPv6 forwarding and SRv6 processing on interfaces.
+
+        VRF strict mode is also toggled, the kernel requires it to decapsulate
+        into a VRF (End.DT4/End.DT6/End.DT46 behaviors).
+
+        :param intfs: interfaces to enable/disable SRv6 processing
+        :type intfs: tuple[str,...]
+        :param enable: enable SRv6 processing?, defaults to True
+        :type enable: bool, optional
+        """
+
+        settings = [
+            f"net.ipv6.conf.all.forwarding={int(enable)}",
+            f"net.ipv6.conf.all.seg6_enabled={int(enable)}",
+            f"net.vrf.strict_mode={int(enable)}",
+        ]
+        settings += [
+            f"net.ipv6.conf.{intf}.seg6_enabled={int(enable)}" for intf in intfs
+        ]
+        self.cmd("sysctl --write " + " ".join(settings))
+
     def vtysh(self, *commands: str):
         """Call this method in Mininet CLI to enter vtysh or execute commands in
         vtysh.
@@ -109,6 +195,81 @@ class FRRouter(Node):
             options = " -c " + " -c ".join([f"'{command}'" for command in commands])
         call(vtysh_command + options, shell=True)
 
+    def show(self, command: str) -> str:
+        """Execute a show command in vtysh and return its output.
+
+        :param command: show command, e.g. "show ip route"
+        :type command: str
+        :return: output of the command
+        :rtype: str
+        """
+
+        return check_output(
+            ["vtysh", "--pathspace", self.netns, "-c", command], text=True
+        )
+
+    def showJSON(self, command: str) -> Any:
+        """Execute a show command that supports `json` in vtysh.
+
+        :param command: show command without the trailing `json`, e.g.
+            "show ip ospf"
+        :type command: str
+        :return: parsed output of the command, `{}` if the daemon did not
+            answer
+        :rtype: Any
+        """
+
+        output = self.show(f"{command} json")
+        return json.loads(output) if output.strip() else {}
+
+    def configure(self, *commands: str) -> str:
+        """Execute commands in the configure node of vtysh and return their
+        output.
+
+        Unlike :meth:`vtysh`, the configuration is not written, so the
+        startup configuration stays the one the router was built with.
+
+        :param commands: commands, e.g. "router ospf", "timers throttle spf 0
+            50 200"
+        :type commands: tuple[str,...]
+        :raises RuntimeError: if vtysh rejects a command
+        :return: output of the commands
+        :rtype: str
+        """
+
+        args = ["vtysh", "--pathspace", self.netns, "-c", "configure terminal"]
+        for command in commands:
+            args += ["-c", command]
+        result = run(args, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{self.name}: {result.stdout}{result.stderr}".strip())
+        return result.stdout
+
+    def reload(self, config: str) -> str:
+        """Replace the running configuration, only the difference is applied.
+
+        :param config: configuration, e.g. output of "show running-config"
+        :type config: str
+        :raises RuntimeError: if frr-reload.py fails
+        :return: output of frr-reload.py
+        :rtype: str
+        """
+
+        # Headers of "show running-config" are not commands
+        lines = [
+            line
+            for line in config.splitlines()
+            if not line.startswith(("Building configuration", "Current configuration"))
+        ]
+        args = [FRRouter._FRR_RELOAD, "--reload", "--pathspace", self.netns]
+        with NamedTemporaryFile("w", suffix=".conf") as file:
+            file.write("\n".join(lines) + "\n")
+            file.flush()
+            result = run([*args, file.name], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{self.name}: {result.stdout}{result.stderr}".strip())
+        return result.stdout
+
     def _startFRRouting(self):
         """Start FRRouting daemons.
 
@@ -159,6 +320,15 @@ class FRRouter(Node):
             f"    >> {FRRouter._BASE_PATHSPACE}/{self.netns}/vtysh.conf"
         )
 
+        # Daemons run as frr, so the log file must be theirs. Microsecond
+        # timestamps are needed to order events of a fast convergence.
+        self.cmd(f"mkdir --parents {FRRouter._LOG_FOLDER}")
+        self.cmd(f"install --owner frr --group frr /dev/null {self.log_file}")
+        self.cmd(
+            f"printf 'log file {self.log_file}\\nlog timestamp precision 6\\n'"
+            f"    >> {FRRouter._BASE_PATHSPACE}/{self.netns}/frr.conf"
+        )
+
     def _stopFRRouting(self):
         """Stop FRRouting daemons and cleanup."""
 
@@ -170,4 +340,5 @@ class FRRouter(Node):
             f"rm --recursive"
             f"    /var/run/netns/{self.netns}"
             f"    {FRRouter._BASE_PATHSPACE}/{self.netns}/"
+            f"    {self.log_file}"
         )
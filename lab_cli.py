@@ -0,0 +1,491 @@
+import json
+import shlex
+import time
+from datetime import datetime
+from fnmatch import fnmatchcase
+from typing import Union
+
+from capture import CaptureManager
+from cli_parser import parseOptions
+from experiments import experiments
+from fib_monitor import FIBMonitor
+from frr_logs import FRRLogPipeline
+from frr_stats import (
+    bgpStats,
+    ldpStats,
+    ospfStats,
+    printBGPStats,
+    printLDPStats,
+    printOSPFStats,
+)
+from frrouter import FRRouter
+from oracle import checkFIBs
+from reachability import printMatrix, reachabilityMatrix
+from results import recordResult
+from runtime import addLink, addRouter, removeLink, removeRouter
+from vty import VTYPool
+
+from mininet.cli import CLI
+from mininet.log import error, output
+
+
+class LabCLI(CLI):
+    """Mininet CLI with commands to instrument FRRouting labs."""
+
+    def __init__(self, mininet, *args, **kwargs):
+        # CLI.__init__() runs the command loop, so state must be set first.
+        self.fib_monitor: Union[FIBMonitor, None] = None
+        self.log_pipeline: Union[FRRLogPipeline, None] = None
+        self.captures = CaptureManager(mininet)
+        self.vty = VTYPool()
+        self.fleet_groups: dict[str, list[str]] = {}
+        super().__init__(mininet, *args, **kwargs)
+
+        # The command loop has ended
+        if self.captures.captures:
+            output("*** Stopping captures\n")
+            self.captures.stopAll()
+        if self.fib_monitor is not None:
+            self.fib_monitor.stop()
+        if self.log_pipeline is not None:
+            self.log_pipeline.stop()
+        self.vty.close()
+
+    def _routers(self, names: list[str]) -> list[FRRouter]:
+        """Resolve router names, all routers if no name is given."""
+
+        if not names:
+            return [n for n in self.mn.hosts if isinstance(n, FRRouter)]
+        routers = []
+        for name in names:
+            node = self.mn.get(name) if name in self.mn else None
+            if not isinstance(node, FRRouter):
+                raise ValueError(f"{name} is not a router")
+            routers.append(node)
+        return routers
+
+    def _matchRouters(self, targets: list[str]) -> list[FRRouter]:
+        """Resolve router names, globs and groups, all routers if no target is
+        given."""
+
+        routers = [n for n in self.mn.hosts if isinstance(n, FRRouter)]
+        if not targets:
+            return routers
+        matched: set[str] = set()
+        for target in targets:
+            if target[1:] in self.fleet_groups and target.startswith("@"):
+                names = {
+                    r.name for r in self._matchRouters(self.fleet_groups[target[1:]])
+                }
+            elif target.startswith("@"):
+                names = {r.name for r in routers if target[1:] in r.daemons}
+            else:
+                names = {r.name for r in routers if fnmatchcase(r.name, target)}
+            if not names:
+                raise ValueError(f"no router matches {target}")
+            matched |= names
+        return [r for r in routers if r.name in matched]
+
+    def do_fleet(self, line: str):
+        """Run a command on many routers at once, output is grouped by router.
+        Show commands are sent over persistent connections to the daemon that
+        answers them, other commands are run by vtysh.
+        Usage: fleet [-u] [-d DAEMON] [TARGET ...] [--] COMMAND
+          TARGET  router name, glob, e.g. `pe*`, `@DAEMON` for routers running
+                  it, e.g. `@bgpd`, or `@GROUP` (default: all routers)
+          -u      print identical outputs once, after the routers sharing them
+          -d      send the command to this daemon instead of the one guessed
+                  from the command
+          --      marks the start of a command that does not start with `show`
+        e.g. fleet -u r1* @bgpd show bgp summary"""
+
+        args = line.split()
+        unique, daemon, targets = False, None, []
+        while args and args[0] not in ("--", "show"):
+            arg = args.pop(0)
+            if arg == "-u":
+                unique = True
+            elif arg == "-d" and args:
+                daemon = args.pop(0)
+            else:
+                targets.append(arg)
+        if args and args[0] == "--":
+            args.pop(0)
+        if not args:
+            error("no command: fleet [-u] [-d DAEMON] [TARGET ...] [--] COMMAND\n")
+            return
+        try:
+            routers = self._matchRouters(targets)
+        except ValueError as e:
+            error(f"{e}\n")
+            return
+
+        started_at = time.time()
+        outputs = self.vty.executeAll(routers, " ".join(args), daemon)
+        elapsed = time.time() - started_at
+
+        groups: dict[str, list[str]] = {}
+        for name, out in outputs.items():
+            groups.setdefault(out if unique else name, []).append(name)
+        for key, names in groups.items():
+            out = key if unique else outputs[key]
+            output(f"*** {', '.join(names)}:\n{out.rstrip()}\n")
+        output(f"*** {len(outputs)} routers, {len(groups)} outputs in {elapsed:.2f}s\n")
+
+    def do_fleetgroup(self, line: str):
+        """Name a group of routers for the fleet command, or list groups.
+        Usage: fleetgroup [NAME [TARGET ...]]
+          TARGET  router name, glob or `@DAEMON`, without TARGET the group is
+                  removed
+        e.g. fleetgroup edges ce* pe*"""
+
+        args = line.split()
+        if not args:
+            for name, targets in self.fleet_groups.items():
+                output(f"@{name}: {' '.join(targets)}\n")
+        elif len(args) == 1:
+            self.fleet_groups.pop(args[0], None)
+        elif any(
+            t[1:] in (args[0], *self.fleet_groups) for t in args[1:] if t[0] == "@"
+        ):
+            error("groups cannot contain other groups\n")
+        else:
+            self.fleet_groups[args[0]] = args[1:]
+
+    def do_fibmon(self, line: str):
+        """Record routes and MPLS labels programmed into kernel FIBs.
+        Usage: fibmon start [router ...] | mark | report [interval] | stop
+          start   subscribe to route notifications of routers (default: all)
+          mark    set the moment latencies are measured from
+          report  print counts, latency percentiles and install rate curves,
+                  and append them to the results file
+          stop    stop recording"""
+
+        args = line.split()
+        action = args[0] if args else "report"
+
+        if action == "start":
+            if self.fib_monitor is not None:
+                self.fib_monitor.stop()
+            try:
+                self.fib_monitor = FIBMonitor(self._routers(args[1:]))
+            except ValueError as e:
+                error(f"{e}\n")
+                return
+            self.fib_monitor.start()
+            self.locals["fib_monitor"] = self.fib_monitor
+            output("*** FIB monitor started, use `py fib_monitor` for the API\n")
+            return
+
+        if self.fib_monitor is None:
+            error("FIB monitor is not started: fibmon start [router ...]\n")
+        elif action == "mark":
+            self.fib_monitor.mark()
+        elif action == "report":
+            try:
+                interval = float(args[1]) if len(args) > 1 else 0.1
+            except ValueError:
+                interval = 0
+            if not interval > 0:
+                error(f"invalid interval: {args[1]}\n")
+                return
+            report = self.fib_monitor.report()
+            curves = {
+                name: self.fib_monitor.installRate(name, interval) for name in report
+            }
+            output(json.dumps(report, indent=2) + "\n")
+            for name, curve in curves.items():
+                if curve:
+                    output(f"{name} (t, installs/s, withdrawals/s):\n")
+                    for point in curve:
+                        output(f"  {point[0]:8.3f} {point[1]:10.0f} {point[2]:10.0f}\n")
+            recordResult(self.mn, "fib", {"report": report, "curves": curves})
+        elif action == "stop":
+            self.fib_monitor.stop()
+            self.fib_monitor = None
+            self.locals.pop("fib_monitor", None)
+        else:
+            error(f"invalid action: {action}\n")
+
+    def do_frrlogs(self, line: str):
+        """Stream logs of FRRouting daemons as typed events to frr-events.jsonl.
+        Usage: frrlogs start [debug] [router ...] | tail [count] [kind ...] | stop
+          start  follow logs of routers (default: all), `debug` also logs SPF
+                 runs and FSM transitions
+          tail   print the last events (default: 20), e.g. `tail 50
+                 ospf_adjacency` or `tail ospf_adjacency`, and counts of
+                 events by kind
+          stop   stop streaming"""
+
+        args = line.split()
+        action = args[0] if args else "tail"
+
+        if action == "start":
+            if self.log_pipeline is not None:
+                self.log_pipeline.stop()
+            debug = len(args) > 1 and args[1] == "debug"
+            try:
+                routers = self._routers(args[2:] if debug else args[1:])
+            except ValueError as e:
+                error(f"{e}\n")
+                return
+            self.log_pipeline = FRRLogPipeline(routers, debug=debug)
+            self.log_pipeline.start()
+            self.locals["log_pipeline"] = self.log_pipeline
+            output("*** Log pipeline started, use `py log_pipeline` for the API\n")
+            return
+
+        if self.log_pipeline is None:
+            error("log pipeline is not started: frrlogs start [router ...]\n")
+        elif action == "tail":
+            # The count is optional, `tail ospf_adjacency` only gives a kind
+            count = int(args.pop(1)) if len(args) > 1 and args[1].isdigit() else 20
+            kinds = tuple(args[1:]) or None
+            for event in self.log_pipeline.events(kinds)[-count:]:
+                logged_at = datetime.fromtimestamp(event.time).strftime("%H:%M:%S.%f")
+                output(
+                    f"{logged_at} {event.router} {event.daemon} {event.kind}"
+                    f" {event.fields or event.message}\n"
+                )
+            output(f"*** Counts: {self.log_pipeline.counts}\n")
+        elif action == "stop":
+            self.log_pipeline.stop()
+            self.log_pipeline = None
+            self.locals.pop("log_pipeline", None)
+        else:
+            error(f"invalid action: {action}\n")
+
+    def do_ospfstats(self, line: str):
+        """Print SPF runs, SPF duration, LSDB size and memory of ospfd and
+        append them to the results file.
+        Usage: ospfstats [router ...]"""
+
+        try:
+            routers = self._routers(line.split())
+        except ValueError as e:
+            error(f"{e}\n")
+            return
+        stats = {r.name: ospfStats(r) for r in routers if "ospfd" in r.daemons}
+        printOSPFStats(stats)
+        recordResult(self.mn, "ospf", stats)
+
+    def do_ldpstats(self, line: str):
+        """Print LDP neighbors, label bindings, kernel MPLS table size and
+        memory of ldpd and append them to the results file.
+        Usage: ldpstats [router ...]"""
+
+        try:
+            routers = self._routers(line.split())
+        except ValueError as e:
+            error(f"{e}\n")
+            return
+        stats = {r.name: ldpStats(r) for r in routers if "ldpd" in r.daemons}
+        printLDPStats(stats)
+        recordResult(self.mn, "ldp", {"routers": stats})
+
+    def do_bgpstats(self, line: str):
+        """Print BGP sessions, route reflector clients, accepted prefixes,
+        updates and memory of bgpd and append them to the results file.
+        Usage: bgpstats [router ...]"""
+
+        try:
+            routers = self._routers(line.split())
+        except ValueError as e:
+            error(f"{e}\n")
+            return
+        stats = {r.name: bgpStats(r) for r in routers if "bgpd" in r.daemons}
+        printBGPStats(stats)
+        recordResult(self.mn, "bgp", {"routers": stats})
+
+    def do_capture(self, line: str):
+        """Capture packets on many interfaces into rotating pcapng files.
+        Usage: capture start NAME TARGET ... [-- BPF filter]
+               capture stop [NAME]
+               capture list
+          TARGET is `node` (all interfaces) or `node:intf`, node alone may be a
+          glob pattern, e.g. `capture start core r* -- mpls or icmp`. Files are
+          written to captures/NAME/, drop counters are printed on stop."""
+
+        args, _, capture_filter = line.partition("--")
+        args = args.split()
+        action = args[0] if args else "list"
+        self.locals["captures"] = self.captures
+
+        if action == "start" and len(args) >= 3:
+            try:
+                captures = self.captures.start(
+                    args[1], args[2:], capture_filter.strip()
+                )
+            except (ValueError, OSError) as e:
+                error(f"{e}\n")
+                return
+            for capture in captures:
+                output(
+                    f"{capture.node.name}: {' '.join(capture.intfs)} -> {capture.path}\n"
+                )
+        elif action == "stop":
+            names = args[1:] or list(self.captures.captures)
+            for name in names:
+                if name not in self.captures.captures:
+                    error(f"capture {name} is not running\n")
+                    continue
+                stats = self.captures.stop(name)
+                output(f"{name}:\n")
+                for node_name, intfs in stats.items():
+                    for intf, counters in intfs.items():
+                        output(
+                            f"  {node_name} {intf}: {counters['received']} received,"
+                            f" {counters['dropped']} dropped\n"
+                        )
+                recordResult(self.mn, "capture", {"name": name, "stats": stats})
+        elif action == "list":
+            for name, captures in self.captures.captures.items():
+                state = ", ".join(
+                    f"{c.node.name}{'' if c.running() else ' (exited)'}"
+                    for c in captures
+                )
+                output(f"{name}: {state}\n")
+        else:
+            error("invalid arguments, see `help capture`\n")
+
+    def do_oracle(self, line: str):
+        """Compare kernel FIBs of routers against routes expected from the topo
+        and append the report to the results file.
+        Usage: oracle"""
+
+        try:
+            report = checkFIBs(self.mn)
+        except ValueError as e:
+            error(f"{e}\n")
+            return
+        for router, mismatches in report["mismatches"].items():
+            for prefix, mismatch in mismatches.items():
+                expected, actual = mismatch["expected"], mismatch["actual"]
+                output(
+                    f"{router} {prefix} {mismatch['status']}:"
+                    f" expected {expected['protocol']} {' '.join(expected['gateways'])},"
+                    f" got {actual['protocol']} {' '.join(actual['gateways'])}\n"
+                )
+        output(
+            f"*** {report['mismatched']} of {report['checked']} expected routes"
+            f" of {report['routers']} routers mismatch\n"
+        )
+        recordResult(self.mn, "oracle", report)
+
+    def do_reach(self, line: str):
+        """Ping every pair of nodes in parallel, print the matrix and append it
+        to the results file.
+        Usage: reach [count] [node ...]
+          count  echo requests sent to every destination (default: 3)
+          node   nodes to probe (default: all hosts)"""
+
+        args = line.split()
+        count = int(args.pop(0)) if args and args[0].isdigit() else 3
+        missing = [name for name in args if name not in self.mn]
+        if missing:
+            error(f"unknown nodes: {' '.join(missing)}\n")
+            return
+        nodes = [self.mn.get(name) for name in args] or None
+        try:
+            matrix = reachabilityMatrix(self.mn, nodes, count)
+        except RuntimeError as e:
+            error(f"{e}\n")
+            return
+        printMatrix(matrix)
+        recordResult(self.mn, "reachability", {"matrix": matrix})
+
+    def do_experiment(self, line: str):
+        """Run an experiment and append its results to the results file.
+        Usage: experiment NAME [KEY=VALUE ...]
+          e.g. `experiment failover link=r1,r2 trials=5 rate=2000`"""
+
+        args = line.split()
+        if not args or args[0] not in experiments:
+            error(f"invalid experiment, choose from {[*experiments.keys()]}\n")
+            return
+        try:
+            experiments[args[0]](self.mn, **parseOptions(args[1:]))
+        except (TypeError, ValueError, RuntimeError) as e:
+            error(f"{e}\n")
+
+    @staticmethod
+    def _linkOptions(node2: str, ips: list[str]) -> dict:
+        """Build link options from the IPs of both ends, if given."""
+
+        options: dict = {"node2": node2}
+        for param, ip in zip(("params1", "params2"), ips):
+            options[param] = {"ip": ip}
+        return options
+
+    def do_addrouter(self, line: str):
+        """Add a router and its links to the running network.
+        Usage: addrouter NAME PEER[,IP[,PEER_IP]] ... [-- KEY=VALUE ...]
+          KEY=VALUE are router options, VALUE is parsed as JSON if possible,
+          e.g. `addrouter r9 r1,10.0.9.2/24,10.0.9.1/24 -- ip=10.0.9.2/24
+          daemons='["ospfd"]' commands='["configure terminal", "router ospf",
+          "network 10.0.0.0/16 area 1"]'`"""
+
+        args, _, options = line.partition("--")
+        args = args.split()
+        if not args:
+            error("invalid arguments, see `help addrouter`\n")
+            return
+        router_options = parseOptions(shlex.split(options))
+        for key in ("daemons", "commands"):
+            if key in router_options:
+                router_options[key] = tuple(router_options[key])
+
+        links = []
+        for peer in args[1:]:
+            name, *ips = peer.split(",")
+            links.append(self._linkOptions(name, ips))
+        try:
+            router = addRouter(self.mn, args[0], links, **router_options)
+        except ValueError as e:
+            error(f"{e}\n")
+            return
+        output(f"*** Added {router.name}: {' '.join(router.intfNames())}\n")
+
+    def do_delrouter(self, line: str):
+        """Stop a router and remove it and its links from the running network.
+        Usage: delrouter NAME ..."""
+
+        for name in line.split():
+            try:
+                removeRouter(self.mn, name)
+            except ValueError as e:
+                error(f"{e}\n")
+
+    def do_addlink(self, line: str):
+        """Add a link between two nodes of the running network.
+        Usage: addlink NODE1 NODE2 [IP1 [IP2]]"""
+
+        args = line.split()
+        if len(args) < 2 or args[0] not in self.mn or args[1] not in self.mn:
+            error("invalid arguments, see `help addlink`\n")
+            return
+        options = self._linkOptions(args[1], args[2:])
+        try:
+            link = addLink(self.mn, args[0], options.pop("node2"), **options)
+        except ValueError as e:
+            error(f"{e}\n")
+            return
+        output(f"*** Added {link}\n")
+
+    def do_dellink(self, line: str):
+        """Remove every link between two nodes of the running network.
+        Usage: dellink NODE1 NODE2"""
+
+        args = line.split()
+        if len(args) != 2 or args[0] not in self.mn or args[1] not in self.mn:
+            error("invalid arguments, see `help dellink`\n")
+            return
+        links = self.mn.linksBetween(*self.mn.get(*args))
+        if not links:
+            error(f"no link between {args[0]} and {args[1]}\n")
+            return
+        try:
+            for link in links:
+                removeLink(self.mn, link)
+        except ValueError as e:
+            error(f"{e}\n")
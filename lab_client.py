@@ -0,0 +1,108 @@
+"""Client of a lab served by :class:`lab_service.LabService`.
+
+Attach to a running lab from a test suite::
+
+    with LabClient() as lab:
+        lab.call("snapshot", name="before")
+        lab.call("configure", router="r1", commands=["router ospf", "..."])
+        print(lab.call("probe", node="h1", args=["reach", "192.168.1.2"]))
+        lab.call("reset", name="before")
+
+or from a shell::
+
+    sudo python3 lab_client.py cmd node=h1 "command=ip route"
+
+This module only needs the standard library, so test suites can import it
+without Mininet.
+"""
+
+import json
+import socket
+import sys
+import threading
+from argparse import ArgumentParser
+from typing import Any, Union
+
+SOCKET_PATH = "/var/run/mininet-lab.sock"
+
+
+class LabClient:
+    """Connection to the RPC socket of a lab service.
+
+    :param path: path of the socket, defaults to SOCKET_PATH
+    :type path: str, optional
+    :param timeout: seconds to wait for a response, forever if None, defaults
+        to None
+    :type timeout: Union[float, None], optional
+    """
+
+    def __init__(self, path: str = SOCKET_PATH, timeout: Union[float, None] = None):
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+        self._file = self._sock.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def call(self, method: str, **params) -> Any:
+        """Call a method of the service, see :class:`lab_service.LabService`.
+
+        :param method: name of method, e.g. "cmd"
+        :type method: str
+        :raises RuntimeError: if the method failed in the service
+        :return: result of the method
+        :rtype: Any
+        """
+
+        request = json.dumps({"method": method, "params": params}).encode()
+        with self._lock:
+            self._file.write(request + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise EOFError("connection closed by lab service")
+
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def close(self):
+        """Close the connection, the lab keeps running."""
+
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> "LabClient":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="call a method of a running lab.")
+    parser.add_argument("method", type=str, help="method, e.g. `info` or `cmd`")
+    parser.add_argument(
+        "params",
+        type=str,
+        nargs="*",
+        help="KEY=VALUE parameter, VALUE is parsed as JSON if possible",
+    )
+    parser.add_argument("--socket", type=str, default=SOCKET_PATH)
+    args = parser.parse_args()
+
+    params: dict[str, Any] = {}
+    for param in args.params:
+        key, _, value = param.partition("=")
+        try:
+            params[key] = json.loads(value)
+        except json.JSONDecodeError:
+            params[key] = value
+
+    with LabClient(args.socket) as lab:
+        try:
+            result = lab.call(args.method, **params)
+        except RuntimeError as e:
+            sys.exit(str(e))
+    print(result if isinstance(result, str) else json.dumps(result, indent=2))
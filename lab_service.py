@@ -0,0 +1,403 @@
+"""Keep a started lab alive and drive it over a local RPC socket.
+
+Start a lab as a service with::
+
+    sudo python3 main.py ospf-scale -o routers=50 --serve
+
+The lab is built, converges (post action of the topo) and is then served on a
+unix socket until a `shutdown` request, SIGTERM or Ctrl-C, so test suites can
+attach to it many times without paying start-up and teardown, see
+:class:`lab_client.LabClient`.
+
+Requests and responses are JSON documents, one per line::
+
+    {"method": "cmd", "params": {"node": "h1", "command": "ip route"}}
+    {"result": "default via 192.168.0.1 dev h1-eth0 ..."}
+    {"method": "cmd", "params": {"node": "h9", "command": "ip route"}}
+    {"error": "ValueError: no node h9"}
+
+The state of the lab, i.e. the running configuration of every router and the
+status of every link, is snapshotted as "start" once the lab is served.
+`reset` restores a snapshot, touching only the routers and links that
+changed since.
+"""
+
+import json
+import os
+import signal
+import socket
+import threading
+from fnmatch import fnmatchcase
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+from typing import Any, Callable, Union
+
+from experiments import experiments
+from frrouter import FRRouter
+from lab_client import SOCKET_PATH
+from probe import probeResult, startProbe
+from results import describeTopo
+from vty import VTYPool
+
+from mininet.net import Mininet
+from mininet.node import Node
+
+State = dict[str, dict[str, Any]]
+
+
+def checkSocket(path: str):
+    """Make sure no lab is served on a socket, before a lab is built.
+
+    A socket left behind by a lab that was killed is removed.
+
+    :param path: path of the socket
+    :type path: str
+    :raises RuntimeError: if a lab answers on the socket
+    """
+
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+        else:
+            raise RuntimeError(f"a lab is already served on {path}")
+
+
+class LabService:
+    """Serve RPC requests on a started lab.
+
+    Clients can call every method of :attr:`methods`, with its parameters as
+    JSON object. Requests of different clients are served concurrently, but
+    commands that use the shell of nodes (`cmd`, `link`, `experiment`,
+    snapshots) run one at a time.
+
+    :param net: a started Mininet instance
+    :type net: Mininet
+    :param path: path of the socket, defaults to SOCKET_PATH
+    :type path: str, optional
+    """
+
+    def __init__(self, net: Mininet, path: str = SOCKET_PATH):
+        self.net = net
+        self.path = path
+        self.snapshots: dict[str, State] = {}
+        self._vty = VTYPool()
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._server: Union[ThreadingUnixStreamServer, None] = None
+        self._thread: Union[threading.Thread, None] = None
+        self.methods: dict[str, Callable[..., Any]] = {
+            "info": self.info,
+            "cmd": self.cmd,
+            "show": self.show,
+            "configure": self.configure,
+            "probe": self.probe,
+            "experiment": self.experiment,
+            "link": self.link,
+            "snapshot": self.snapshot,
+            "diff": self.diff,
+            "reset": self.reset,
+            "shutdown": self.shutdown,
+        }
+
+    def start(self):
+        """Snapshot the lab as "start", then serve requests in the background.
+
+        :raises RuntimeError: if another lab is served on the socket
+        """
+
+        self.snapshot("start")
+
+        service = self
+
+        class Handler(StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    response = service.handle(line)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                    self.wfile.flush()
+
+        checkSocket(self.path)
+        # Only root can connect, from the moment the socket exists
+        umask = os.umask(0o077)
+        try:
+            self._server = ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(umask)
+        self._server.daemon_threads = True
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"*** Serving lab on {self.path}")
+
+    def stop(self):
+        """Stop serving, the lab keeps running."""
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            os.unlink(self.path)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._vty.close()
+
+    def handle(self, line: bytes) -> dict[str, Any]:
+        """Execute one request.
+
+        :param line: request, a JSON object with `method` and `params`
+        :type line: bytes
+        :return: response, a JSON object with `result` or `error`
+        :rtype: dict[str, Any]
+        """
+
+        try:
+            request = json.loads(line)
+            method = self.methods.get(request.get("method"))
+            if method is None:
+                raise ValueError(f"unknown method {request.get('method')}")
+            return {"result": method(**request.get("params", {}))}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def wait(self):
+        """Block until a `shutdown` request, SIGTERM or SIGINT."""
+
+        handlers = {
+            signum: signal.signal(signum, lambda *_: self._stopped.set())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            # Wake up regularly, so signal handlers run
+            while not self._stopped.wait(1):
+                pass
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def _node(self, name: str) -> Node:
+        if name not in self.net:
+            raise ValueError(f"no node {name}")
+        return self.net.get(name)
+
+    def _routers(self, targets: Union[list[str], None] = None) -> list[FRRouter]:
+        routers = [n for n in self.net.hosts if isinstance(n, FRRouter)]
+        if not targets:
+            return routers
+        return [r for r in routers if any(fnmatchcase(r.name, t) for t in targets)]
+
+    def info(self) -> dict[str, Any]:
+        """Describe the lab.
+
+        :return: see :func:`results.describeTopo`, plus class and IP of every
+            node, status of every link by interfaces and names of snapshots
+        :rtype: dict[str, Any]
+        """
+
+        nodes = [*self.net.hosts, *self.net.switches]
+        with self._lock:
+            links = self._links()
+        return {
+            **describeTopo(self.net),
+            "nodes": {n.name: {"class": type(n).__name__, "ip": n.IP()} for n in nodes},
+            "link_status": links,
+            "snapshots": [*self.snapshots],
+        }
+
+    def cmd(self, node: str, command: str) -> str:
+        """Run a shell command in a node.
+
+        :param node: name of node
+        :type node: str
+        :param command: command, e.g. "ip route"
+        :type command: str
+        :return: output of the command
+        :rtype: str
+        """
+
+        with self._lock:
+            return self._node(node).cmd(command)
+
+    def show(
+        self,
+        command: str,
+        routers: Union[list[str], None] = None,
+        daemon: Union[str, None] = None,
+    ) -> dict[str, str]:
+        """Run a vtysh command on many routers at once, see
+        :meth:`vty.VTYPool.executeAll`.
+
+        :param command: command, e.g. "show ip ospf neighbor"
+        :type command: str
+        :param routers: router names or globs, all routers if None, defaults to
+            None
+        :type routers: Union[list[str], None], optional
+        :param daemon: daemon to send the command to, defaults to None
+        :type daemon: Union[str, None], optional
+        :return: output of every router, error messages start with "% "
+        :rtype: dict[str, str]
+        """
+
+        return self._vty.executeAll(self._routers(routers), command, daemon)
+
+    def configure(self, router: str, commands: list[str]) -> str:
+        """Push configuration to a router, see :meth:`FRRouter.configure`.
+
+        :param router: name of router
+        :type router: str
+        :param commands: commands executed in the configure node
+        :type commands: list[str]
+        :return: output of the commands
+        :rtype: str
+        """
+
+        node = self._node(router)
+        if not isinstance(node, FRRouter):
+            raise ValueError(f"{router} is not a router")
+        return node.configure(*commands)
+
+    def probe(
+        self, node: str, args: list[str], timeout: Union[float, None] = None
+    ) -> dict:
+        """Run a probe in a node and wait for its result, see :mod:`probe`.
+
+        :param node: name of node
+        :type node: str
+        :param args: probe mode and its arguments, e.g. ["reach", "10.0.0.1"]
+        :type args: list[str]
+        :param timeout: seconds to wait, forever if None, defaults to None
+        :type timeout: Union[float, None], optional
+        :return: result of the probe
+        :rtype: dict
+        """
+
+        return probeResult(startProbe(self._node(node), *args), timeout=timeout)
+
+    def experiment(self, name: str, options: Union[dict[str, Any], None] = None) -> Any:
+        """Run an experiment, see :data:`experiments.experiments`.
+
+        :param name: name of experiment, e.g. "failover"
+        :type name: str
+        :param options: options passed to the experiment, defaults to None
+        :type options: Union[dict[str, Any], None], optional
+        :return: result of the experiment
+        :rtype: Any
+        """
+
+        if name not in experiments:
+            raise ValueError(f"unknown experiment {name}")
+        with self._lock:
+            return experiments[name](self.net, **(options or {}))
+
+    def link(self, node1: str, node2: str, status: str):
+        """Bring links between two nodes up or down.
+
+        :param node1: name of node
+        :type node1: str
+        :param node2: name of node
+        :type node2: str
+        :param status: "up" or "down"
+        :type status: str
+        """
+
+        if status not in ("up", "down"):
+            raise ValueError(f"unknown link status {status}")
+        with self._lock:
+            self.net.configLinkStatus(
+                self._node(node1).name, self._node(node2).name, status
+            )
+
+    def _links(self) -> dict[str, bool]:
+        """Return whether every link is up, by interface names."""
+
+        # One `ip link` per node instead of one per interface
+        up: set[str] = set()
+        for node in [*self.net.hosts, *self.net.switches]:
+            for line in node.cmd("ip -oneline link show up").splitlines():
+                fields = line.split(": ")
+                if len(fields) > 1:
+                    up.add(fields[1].split("@")[0])
+        return {
+            f"{link.intf1},{link.intf2}": {link.intf1.name, link.intf2.name} <= up
+            for link in self.net.links
+        }
+
+    def _state(self) -> State:
+        with self._lock:
+            links = self._links()
+        configs = self._vty.executeAll(self._routers(), "show running-config")
+        return {"routers": configs, "links": links}
+
+    def snapshot(self, name: str = "start") -> State:
+        """Save the running configuration of every router and the status of
+        every link.
+
+        :param name: name of snapshot, replaced if it exists, defaults to
+            "start"
+        :type name: str, optional
+        :return: the snapshot
+        :rtype: State
+        """
+
+        self.snapshots[name] = self._state()
+        return self.snapshots[name]
+
+    def diff(self, name: str = "start") -> dict[str, list[str]]:
+        """Find routers and links that changed since a snapshot.
+
+        :param name: name of snapshot, defaults to "start"
+        :type name: str, optional
+        :return: names of changed `routers` and `links`
+        :rtype: dict[str, list[str]]
+        """
+
+        if name not in self.snapshots:
+            raise ValueError(f"no snapshot {name}")
+        saved, current = self.snapshots[name], self._state()
+        return {
+            kind: [
+                key
+                for key, value in current[kind].items()
+                if key in saved[kind] and saved[kind][key] != value
+            ]
+            for kind in ("routers", "links")
+        }
+
+    def reset(self, name: str = "start") -> dict[str, list[str]]:
+        """Restore routers and links that changed since a snapshot.
+
+        Only the difference of configurations is applied, see
+        :meth:`FRRouter.reload`. Routers and links added or removed since the
+        snapshot are left as they are.
+
+        :param name: name of snapshot, defaults to "start"
+        :type name: str, optional
+        :return: names of restored `routers` and `links`
+        :rtype: dict[str, list[str]]
+        """
+
+        changed = self.diff(name)
+        saved = self.snapshots[name]
+        for router in changed["routers"]:
+            config = saved["routers"][router]
+            if config.startswith("% "):
+                raise RuntimeError(f"no configuration of {router} in {name}")
+            node = self._node(router)
+            assert isinstance(node, FRRouter)
+            node.reload(config)
+
+        links = {f"{link.intf1},{link.intf2}": link for link in self.net.links}
+        with self._lock:
+            for key in changed["links"]:
+                status = "up" if saved["links"][key] else "down"
+                links[key].intf1.ifconfig(status)
+                links[key].intf2.ifconfig(status)
+        return changed
+
+    def shutdown(self):
+        """Stop the service, the lab is then torn down."""
+
+        self._stopped.set()
@@ -0,0 +1,171 @@
+import signal
+import time
+from subprocess import Popen
+from typing import Any
+
+from probe import LatencyHistogram, closeFlow, probeResult, startProbe, stopProbes
+
+from mininet.net import Mininet
+
+
+def measureLatencyDistribution(
+    net: Mininet,
+    pairs: list[tuple[str, str]],
+    rate: float = 1000,
+    duration: float = 10,
+    size: int = 64,
+    port: int = 7001,
+    load_rate: float = 0,
+    load_size: int = 1400,
+) -> dict[str, Any]:
+    """Measure the round-trip time distribution between pairs of nodes, all
+    pairs at once.
+
+    Every destination runs one echo probe and every pair one latency probe,
+    which keeps its round-trip times in a :class:`probe.LatencyHistogram`.
+    With `load_rate`, every pair also carries a UDP flow of `load_size` bytes
+    packets from source to destination while latency is measured.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param pairs: (source, destination) node names
+    :type pairs: list[tuple[str, str]]
+    :param rate: probes per second of every pair, defaults to 1000
+    :type rate: float, optional
+    :param duration: seconds to send probes, defaults to 10
+    :type duration: float, optional
+    :param size: UDP payload size of probes in bytes, defaults to 64
+    :type size: int, optional
+    :param port: UDP port of echo probes, defaults to 7001
+    :type port: int, optional
+    :param load_rate: packets per second of the background flow of every
+        pair, no background flow if 0, defaults to 0
+    :type load_rate: float, optional
+    :param load_size: UDP payload size of background packets in bytes,
+        defaults to 1400
+    :type load_size: int, optional
+    :return: per pair and over all pairs: packets sent and received, summary
+        and buckets of the histogram, and counters of background flows
+    :rtype: dict[str, Any]
+    """
+
+    # Every probe is stopped if another one fails, so its port is free for
+    # the next run
+    started: list[Popen] = []
+    try:
+        echoes = {}
+        for dst in dict.fromkeys(dst for _, dst in pairs):
+            echoes[dst] = startProbe(net.get(dst), "echo", "--port", str(port))
+            started.append(echoes[dst])
+        load_receivers, load_senders = [], []
+        if load_rate:
+            for i, (src, dst) in enumerate(pairs):
+                load_receivers.append(
+                    startProbe(
+                        net.get(dst),
+                        "flow-recv",
+                        "--port",
+                        str(port + 1 + i),
+                        "--rate",
+                        str(load_rate),
+                    )
+                )
+                started.append(load_receivers[-1])
+        # Let receivers bind their ports
+        time.sleep(0.5)
+        if load_rate:
+            for i, (src, dst) in enumerate(pairs):
+                load_senders.append(
+                    startProbe(
+                        net.get(src),
+                        "flow-send",
+                        net.get(dst).IP(),
+                        "--port",
+                        str(port + 1 + i),
+                        "--rate",
+                        str(load_rate),
+                        "--size",
+                        str(load_size),
+                        "--duration",
+                        str(duration + 1),
+                    )
+                )
+                started.append(load_senders[-1])
+
+        probes = []
+        for src, dst in pairs:
+            probes.append(
+                startProbe(
+                    net.get(src),
+                    "latency",
+                    net.get(dst).IP(),
+                    "--port",
+                    str(port),
+                    "--rate",
+                    str(rate),
+                    "--duration",
+                    str(duration),
+                    "--size",
+                    str(size),
+                )
+            )
+            started.append(probes[-1])
+
+        results: dict[str, Any] = {}
+        histogram = LatencyHistogram()
+        for (src, dst), probe in zip(pairs, probes):
+            result = probeResult(probe, timeout=duration + 30)
+            histogram.merge(LatencyHistogram.fromDict(result["histogram"]))
+            results[f"{src}->{dst}"] = result
+
+        sent = [probeResult(sender, timeout=30) for sender in load_senders]
+        for process in [*echoes.values(), *load_receivers]:
+            process.send_signal(signal.SIGTERM)
+        for process in echoes.values():
+            probeResult(process, timeout=10)
+        loads = [
+            closeFlow(probeResult(process, timeout=10), counts)
+            for process, counts in zip(load_receivers, sent)
+        ]
+    finally:
+        stopProbes(started)
+
+    for (src, dst), load in zip(pairs, loads):
+        results[f"{src}->{dst}"]["load"] = {
+            k: load[k] for k in ("received", "lost", "reordered")
+        }
+
+    return {
+        "rate": rate,
+        "duration": duration,
+        "size": size,
+        "load_rate": load_rate,
+        "load_size": load_size,
+        "pairs": results,
+        "all": {
+            "sent": sum(r["sent"] for r in results.values()),
+            "received": sum(r["received"] for r in results.values()),
+            "summary": histogram.summary(),
+            "histogram": histogram.toDict(),
+        },
+    }
+
+
+def printLatency(result: dict[str, Any]):
+    """Print the round-trip time distribution of every pair as a table.
+
+    :param result: result of :func:`measureLatencyDistribution`
+    :type result: dict[str, Any]
+    """
+
+    print(
+        f"{'pair':<16}{'sent':>9}{'lost':>7}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'p99.9 ms':>10}{'max ms':>9}"
+    )
+    rows = {**result["pairs"], "all": result["all"]}
+    for name, r in rows.items():
+        s = r["summary"]
+        print(
+            f"{name:<16}{r['sent']:>9}{r['sent'] - r['received']:>7}"
+            f"{s['p50']:>9.3f}{s['p99']:>9.3f}{s['p99.9']:>10.3f}{s['max']:>9.3f}"
+        )
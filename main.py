@@ -1,53 +1,170 @@
-from typing import Any, Callable, Union, cast
+from typing import Any, Union
 
-from cli_parser import parser
-from topo import TopoWithPostAction, topos
+from base_topo import TopoWithPostAction, TopoWithRouter
+from cli_parser import parseOptions, parser
+from config_check import validateTopo
+from experiments import experiments
+from lab_cli import LabCLI
+from lab_service import LabService, checkSocket
+from metrics import MetricsExporter
+from switches import SWITCHES, installFlows
+from topo_registry import loadTopo
 
-from mininet.cli import CLI
 from mininet.link import TCLink
 from mininet.log import setLogLevel
 from mininet.net import Mininet
 from mininet.node import OVSController, RemoteController
-from mininet.nodelib import LinuxBridge
 
 
 def main(
     topo_name: str,
     controller_ip: Union[str, None] = None,
     controller_port: Union[str, None] = None,
+    topo_options: Union[dict[str, Any], None] = None,
+    metrics_port: Union[int, None] = None,
+    experiment: Union[str, None] = None,
+    experiment_options: Union[dict[str, Any], None] = None,
+    check_config: bool = True,
+    switch: str = "lxbr",
+    serve: Union[str, None] = None,
 ):
     """Create a network from topo.
 
-    :param topo_name: topo name
+    :param topo_name: topo name, see topo_registry.py
     :type topo_name: str
     :param controller_ip: SDN controller IP, defaults to None
     :type controller_ip: Union[str, None], optional
     :param controller_port: Listening port of SDN controller, defaults to None
     :type controller_port: Union[str, None], optional
+    :param topo_options: options passed to the topo constructor, defaults to
+        None
+    :type topo_options: Union[dict[str, Any], None], optional
+    :param metrics_port: serve Prometheus metrics on this port of localhost,
+        defaults to None
+    :type metrics_port: Union[int, None], optional
+    :param experiment: run this experiment instead of the CLI, defaults to
+        None
+    :type experiment: Union[str, None], optional
+    :param experiment_options: options passed to the experiment, defaults to
+        None
+    :type experiment_options: Union[dict[str, Any], None], optional
+    :param check_config: check vtysh commands of routers before starting,
+        defaults to True
+    :type check_config: bool, optional
+    :param switch: switch implementation of switches the topo does not set,
+        a key of SWITCHES, defaults to "lxbr"
+    :type switch: str, optional
+    :param serve: keep the lab running and serve RPC requests on this unix
+        socket instead of the CLI, see lab_service.py, defaults to None
+    :type serve: Union[str, None], optional
     """
 
-    topo = cast(dict[str, Any], topos.get(topo_name))
+    topo_constructor = loadTopo(topo_name)
 
     controller = (
         (lambda name: RemoteController(name, controller_ip, controller_port))
         if controller_ip is not None
         else OVSController
-        if topo.get("require_controller", False)
+        if getattr(topo_constructor, "require_controller", False)
         else None
     )
 
-    topo_constructor = cast(Callable, topo.get("constructor"))
-    net = Mininet(topo=topo_constructor(), switch=LinuxBridge, controller=controller, link=TCLink)  # type: ignore
-    net.start()
+    topo_instance = topo_constructor(**(topo_options or {}))
 
-    if isinstance(net.topo, TopoWithPostAction):
-        net.topo.postAction(net)
+    if check_config and isinstance(topo_instance, TopoWithRouter):
+        print("*** Checking vtysh commands of routers")
+        try:
+            errors = validateTopo(topo_instance)
+        except FileNotFoundError:
+            raise SystemExit("*** vtysh is not installed, use --no-check")
+        if errors:
+            for name, messages in errors.items():
+                print(f"{name}:", *messages, sep="\n  ")
+            raise SystemExit("*** Invalid vtysh commands, nothing was started")
 
-    CLI(net)
-    net.stop()
+    if serve is not None:
+        try:
+            checkSocket(serve)
+        except RuntimeError as e:
+            raise SystemExit(f"*** {e}, nothing was started")
+
+    net = Mininet(topo=topo_instance, switch=SWITCHES[switch], controller=controller, link=TCLink)  # type: ignore
+    exporter = None
+    # Routers run daemonized FRRouting processes, which outlive a failed
+    # experiment unless the network is stopped
+    try:
+        net.start()
+        installFlows(net)
+
+        if isinstance(net.topo, TopoWithPostAction):
+            net.topo.postAction(net)
+
+        if metrics_port is not None:
+            exporter = MetricsExporter(net, metrics_port)
+            exporter.start()
+
+        if experiment is not None:
+            experiments[experiment](net, **(experiment_options or {}))
+        elif serve is not None:
+            service = LabService(net, serve)
+            service.start()
+            try:
+                service.wait()
+            finally:
+                service.stop()
+        else:
+            LabCLI(net)
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        net.stop()
 
 
 if __name__ == "__main__":
     args = parser.parse_args()
     setLogLevel("debug" if args.verbose else "info")
-    main(args.topo_name, args.controller_ip, args.controller_port)
+
+    # Options of FRRouting routers, other topos do not take them
+    router_flags = {
+        "--netlink-batch": args.netlink_batch,
+        "--platform-labels": args.platform_labels,
+        "--profile": args.profile,
+        "--bfd": args.bfd,
+    }
+    given = [flag for flag, value in router_flags.items() if value is not None]
+    if given:
+        # The registry may also hold functions that build a topo
+        topo_class = loadTopo(args.topo_name)
+        if not (isinstance(topo_class, type) and issubclass(topo_class, TopoWithRouter)):
+            parser.error(f"{args.topo_name} has no FRRouting routers: {' '.join(given)}")
+
+    topo_options = parseOptions(args.topo_opt)
+    router_opts = {}
+    if args.netlink_batch is not None:
+        router_opts["netlink_batch"] = tuple(args.netlink_batch)
+    if args.platform_labels is not None:
+        router_opts["platform_labels"] = args.platform_labels
+    if router_opts:
+        topo_options["router_opts"] = router_opts
+    if args.profile is not None:
+        topo_options["profile"] = args.profile
+    if args.bfd is not None:
+        interval, multiplier = args.bfd
+        topo_options["bfd"] = {
+            "receive_interval": interval,
+            "transmit_interval": interval,
+            "detect_multiplier": multiplier,
+        }
+
+    main(
+        args.topo_name,
+        args.controller_ip,
+        args.controller_port,
+        topo_options,
+        args.metrics_port,
+        args.experiment,
+        parseOptions(args.experiment_opt),
+        not args.no_check,
+        args.switch,
+        args.serve,
+    )
@@ -0,0 +1,275 @@
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Union
+
+import netlink
+from frr_stats import daemonUsage
+from frrouter import FRRouter
+from netns_traverse import netns
+from vty import VTYPool
+
+from mininet.net import Mininet
+from mininet.node import Node
+
+Labels = dict[str, str]
+
+
+class MetricsExporter:
+    """Serve interface counters and FRRouting statistics of a lab in
+    Prometheus text format.
+
+    Metrics are collected in the background every `interval` seconds and
+    scrapes are answered from the last collection, so scraping is cheap
+    whatever the size of the lab. Collection does not spawn processes:
+
+    - interface counters are dumped with one rtnetlink request per network
+      namespace (nodes sharing a namespace, e.g. Linux bridges, share it),
+    - routes are counted from a rtnetlink dump of each router,
+    - neighbor states are read over persistent VTY connections to daemons,
+    - daemon CPU and memory are read from `/proc`.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param port: listening port, defaults to 9469
+    :type port: int, optional
+    :param address: listening address, defaults to "127.0.0.1"
+    :type address: str, optional
+    :param interval: seconds between collections, defaults to 5
+    :type interval: float, optional
+    """
+
+    _RATES = ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets")
+    _RATES += ("rx_dropped", "tx_dropped")
+
+    def __init__(
+        self,
+        net: Mininet,
+        port: int = 9469,
+        address: str = "127.0.0.1",
+        interval: float = 5,
+    ):
+        self.net = net
+        self.address = address
+        self.port = port
+        self.interval = interval
+        self.text = ""
+        self.errors = 0
+        self._vty = VTYPool()
+        self._sockets: dict[int, socket.socket] = {}
+        self._previous: dict[tuple[str, str], tuple[float, dict[str, int]]] = {}
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._server: Union[ThreadingHTTPServer, None] = None
+
+    def start(self):
+        """Collect once, then start collecting and serving in the background."""
+
+        self.collect()
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.text.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        self._stopped.clear()
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+            threading.Thread(target=self._run, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"*** Serving metrics on http://{self.address}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop collecting and serving."""
+
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for sock in self._sockets.values():
+            sock.close()
+        self._sockets.clear()
+        self._vty.close()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.collect()
+
+    def _socket(self, node: Node) -> tuple[int, socket.socket]:
+        """Get the rtnetlink socket of the namespace of a node."""
+
+        inode = os.stat(f"/proc/{node.pid}/ns/net").st_ino
+        if inode not in self._sockets:
+            with netns(node.pid):
+                self._sockets[inode] = netlink.openRouteSocket()
+        return inode, self._sockets[inode]
+
+    def collect(self) -> str:
+        """Collect every metric and render them.
+
+        :return: metrics in Prometheus text format
+        :rtype: str
+        """
+
+        metrics: dict[str, list[tuple[Labels, float]]] = {}
+
+        def add(name: str, labels: Labels, value: float):
+            metrics.setdefault(name, []).append((labels, value))
+
+        nodes = [*self.net.hosts, *self.net.switches]
+        by_namespace: dict[int, list[Node]] = {}
+        for node in nodes:
+            try:
+                inode, _ = self._socket(node)
+            except OSError:
+                self.errors += 1
+                continue
+            by_namespace.setdefault(inode, []).append(node)
+
+        for inode, ns_nodes in by_namespace.items():
+            try:
+                links = {
+                    link["name"]: link
+                    for link in netlink.dumpLinks(self._sockets[inode])
+                }
+            except OSError:
+                self.errors += 1
+                self._sockets.pop(inode).close()
+                continue
+            for node in ns_nodes:
+                for intf in node.intfNames():
+                    if intf in links and intf != "lo":
+                        self._addInterface(add, node.name, links[intf])
+
+        for node in self.net.hosts:
+            if isinstance(node, FRRouter):
+                self._addRouter(add, node)
+
+        add("lab_scrape_errors_total", {}, self.errors)
+        self.text = self._render(metrics)
+        return self.text
+
+    def _addInterface(self, add, node_name: str, link: dict[str, Any]):
+        labels = {"node": node_name, "interface": link["name"]}
+        now = time.time()
+        counters = {k: v for k, v in link.items() if k.startswith(("rx_", "tx_"))}
+
+        add("lab_interface_up", labels, int(link["up"]))
+        for key, value in counters.items():
+            add(f"lab_interface_{key}_total", labels, value)
+
+        previous = self._previous.get((node_name, link["name"]))
+        self._previous[(node_name, link["name"])] = (now, counters)
+        if previous is not None and now > previous[0]:
+            elapsed = now - previous[0]
+            for key in MetricsExporter._RATES:
+                # Counters are missing when the kernel sent no IFLA_STATS64
+                value, before = counters.get(key), previous[1].get(key)
+                if value is None or before is None:
+                    continue
+                rate = (value - before) / elapsed
+                add(f"lab_interface_{key}_per_second", labels, max(rate, 0))
+
+    def _addRouter(self, add, router: FRRouter):
+        name = router.name
+
+        try:
+            _, sock = self._socket(router)
+            routes = netlink.dumpRoutes(sock)
+        except OSError:
+            self.errors += 1
+            routes = []
+        per_protocol = Counter(
+            (r["family"], netlink.RTPROT_NAMES.get(r["protocol"], str(r["protocol"])))
+            for r in routes
+            if r["table"] != netlink.RT_TABLE_LOCAL
+        )
+        for (family, protocol), count in per_protocol.items():
+            add(
+                "lab_router_routes",
+                {"router": name, "family": family, "protocol": protocol},
+                count,
+            )
+
+        for protocol, states in self._neighborStates(router).items():
+            for state, count in Counter(states).items():
+                add(
+                    "lab_router_neighbors",
+                    {"router": name, "protocol": protocol, "state": state},
+                    count,
+                )
+
+        for daemon in ("zebra", *router.daemons):
+            usage = daemonUsage(router, daemon)
+            if not usage:
+                continue
+            labels = {"router": name, "daemon": daemon}
+            add("lab_daemon_cpu_seconds_total", labels, usage["cpu_seconds"])
+            add("lab_daemon_resident_memory_bytes", labels, usage["rss_bytes"])
+
+    def _neighborStates(self, router: FRRouter) -> dict[str, list[str]]:
+        """Read neighbor states of OSPF, BGP and LDP over VTY connections."""
+
+        states: dict[str, list[str]] = {}
+        try:
+            if "ospfd" in router.daemons:
+                ospf = self._vty.get(router, "ospfd").executeJSON(
+                    "show ip ospf neighbor"
+                )
+                states["ospf"] = [
+                    (n.get("nbrState") or n.get("state", "unknown")).split("/")[0]
+                    for neighbors in ospf.get("neighbors", {}).values()
+                    for n in neighbors
+                ]
+            if "bgpd" in router.daemons:
+                bgp = self._vty.get(router, "bgpd").executeJSON("show bgp summary")
+                peers = {
+                    peer: info.get("state", "unknown")
+                    for af in bgp.values()
+                    if isinstance(af, dict)
+                    for peer, info in af.get("peers", {}).items()
+                }
+                states["bgp"] = list(peers.values())
+            if "ldpd" in router.daemons:
+                ldp = self._vty.get(router, "ldpd").executeJSON(
+                    "show mpls ldp neighbor"
+                )
+                neighbors = ldp.get("neighbors", ldp)
+                if isinstance(neighbors, dict):
+                    neighbors = list(neighbors.values())
+                states["ldp"] = [n.get("state", "unknown") for n in neighbors]
+        except (OSError, EOFError, RuntimeError, ValueError):
+            self.errors += 1
+        return states
+
+    @staticmethod
+    def _render(metrics: dict[str, list[tuple[Labels, float]]]) -> str:
+        lines = []
+        for name, samples in metrics.items():
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(
+                    f"{name}{{{label_text}}} {value}" if labels else f"{name} {value}"
+                )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,296 @@
+import errno
+import socket
+import struct
+from typing import Any, Iterator, Union
+
+# See: https://man7.org/linux/man-pages/man7/rtnetlink.7.html
+NETLINK_ROUTE = 0
+SOL_NETLINK = 270
+NETLINK_ADD_MEMBERSHIP = 1
+SO_RCVBUFFORCE = 33
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLM_F_REQUEST = 0x001
+NLM_F_MULTI = 0x002
+NLM_F_REPLACE = 0x100
+NLM_F_DUMP = 0x300
+
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+RTM_GETROUTE = 26
+
+RTNLGRP_IPV4_ROUTE = 7
+RTNLGRP_IPV6_ROUTE = 11
+RTNLGRP_MPLS_ROUTE = 27
+
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_MULTIPATH = 9
+RTA_TABLE = 15
+RTA_VIA = 18
+
+IFLA_IFNAME = 3
+IFLA_STATS64 = 23
+
+RT_TABLE_MAIN = 254
+RT_TABLE_LOCAL = 255
+RTN_UNICAST = 1
+
+# See /etc/iproute2/rt_protos and FRR's lib/route_types.txt
+RTPROT_NAMES = {
+    2: "kernel",
+    3: "boot",
+    4: "static",
+    11: "zebra",
+    186: "bgp",
+    187: "isis",
+    188: "ospf",
+    189: "rip",
+    190: "ripng",
+    192: "eigrp",
+    193: "ldp",
+    196: "static",
+    197: "openfabric",
+}
+
+# Python does not export AF_MPLS on every platform.
+AF_MPLS = 28
+
+_FAMILIES = {socket.AF_INET: "ipv4", socket.AF_INET6: "ipv6", AF_MPLS: "mpls"}
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_NLMSGERR = struct.Struct("=i")
+_RTMSG = struct.Struct("=BBBBBBBBI")
+_RTATTR = struct.Struct("=HH")
+_IFINFOMSG = struct.Struct("=BxHiII")
+_RTNEXTHOP = struct.Struct("=HBBi")
+
+# First fields of struct rtnl_link_stats64
+_LINK_STATS = ("rx_packets", "tx_packets", "rx_bytes", "tx_bytes")
+_LINK_STATS += ("rx_errors", "tx_errors", "rx_dropped", "tx_dropped")
+_LINK_STATS64 = struct.Struct(f"={len(_LINK_STATS)}Q")
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def openRouteSocket(groups: tuple[int, ...] = (), rcvbuf: int = 0) -> socket.socket:
+    """Open a rtnetlink socket in the network namespace of the calling thread.
+
+    :param groups: multicast groups (RTNLGRP_*) to subscribe, defaults to ()
+    :type groups: tuple[int, ...], optional
+    :param rcvbuf: receive buffer size in bytes, keep kernel default if 0,
+        defaults to 0
+    :type rcvbuf: int, optional
+    :return: bound rtnetlink socket
+    :rtype: socket.socket
+    """
+
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    if rcvbuf:
+        # SO_RCVBUFFORCE ignores net.core.rmem_max but requires CAP_NET_ADMIN,
+        # which Mininet has anyway.
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, rcvbuf)
+        except PermissionError:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind((0, 0))
+    for group in groups:
+        sock.setsockopt(SOL_NETLINK, NETLINK_ADD_MEMBERSHIP, group)
+    return sock
+
+
+def parseMessages(data: bytes) -> Iterator[tuple[int, int, bytes]]:
+    """Split a netlink datagram into messages.
+
+    :param data: datagram received from a netlink socket
+    :type data: bytes
+    :return: iterator of (message type, flags, payload)
+    :rtype: Iterator[tuple[int, int, bytes]]
+    """
+
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, flags, _seq, _pid = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            break
+        yield msg_type, flags, data[offset + _NLMSGHDR.size : offset + length]
+        offset += _align(length)
+
+
+def parseAttributes(data: bytes, offset: int = 0) -> dict[int, bytes]:
+    """Parse a sequence of rtattr.
+
+    :param data: buffer that contains attributes
+    :type data: bytes
+    :param offset: offset of the first attribute, defaults to 0
+    :type offset: int, optional
+    :return: attribute type mapped to its raw value
+    :rtype: dict[int, bytes]
+    """
+
+    attributes = {}
+    while offset + _RTATTR.size <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        # Drop NLA_F_NESTED and NLA_F_NET_BYTEORDER
+        attributes[attr_type & 0x3FFF] = data[offset + _RTATTR.size : offset + length]
+        offset += _align(length)
+    return attributes
+
+
+def parseRoute(payload: bytes) -> dict[str, Any]:
+    """Parse the payload of a RTM_NEWROUTE/RTM_DELROUTE message.
+
+    :param payload: message payload (rtmsg followed by attributes)
+    :type payload: bytes
+    :return: route with keys `family`, `prefix`, `table`, `protocol`, `type`,
+        `oif`, `gateway`, and `gateways`, the gateways of every next hop of
+        multipath routes
+    :rtype: dict[str, Any]
+    """
+
+    family, dst_len, _, _, table, protocol, _, rt_type, _ = _RTMSG.unpack_from(payload)
+    attributes = parseAttributes(payload, _RTMSG.size)
+    table = (
+        int.from_bytes(attributes[RTA_TABLE], "little")
+        if RTA_TABLE in attributes
+        else table
+    )
+
+    dst = attributes.get(RTA_DST)
+    if family == AF_MPLS:
+        prefix = str(int.from_bytes(dst[:4], "big") >> 12) if dst else "0"
+    elif dst is not None:
+        prefix = f"{socket.inet_ntop(family, dst)}/{dst_len}"
+    else:
+        prefix = "0.0.0.0/0" if family == socket.AF_INET else "::/0"
+
+    gateway = _gateway(family, attributes)
+    gateways = [gateway] if gateway is not None else []
+    # struct rtnexthop followed by attributes of the next hop
+    multipath = attributes.get(RTA_MULTIPATH, b"")
+    offset = 0
+    while offset + _RTNEXTHOP.size <= len(multipath):
+        length = _RTNEXTHOP.unpack_from(multipath, offset)[0]
+        if length < _RTNEXTHOP.size:
+            break
+        nexthop = parseAttributes(multipath[offset : offset + length], _RTNEXTHOP.size)
+        gateway = _gateway(family, nexthop)
+        if gateway is not None:
+            gateways.append(gateway)
+        offset += _align(length)
+
+    oif = attributes.get(RTA_OIF)
+    return {
+        "family": _FAMILIES.get(family, str(family)),
+        "prefix": prefix,
+        "table": table,
+        "protocol": protocol,
+        "type": rt_type,
+        "oif": int.from_bytes(oif, "little") if oif else None,
+        "gateway": gateways[0] if gateways else None,
+        "gateways": gateways,
+    }
+
+
+def _gateway(family: int, attributes: dict[int, bytes]) -> Union[str, None]:
+    gateway = attributes.get(RTA_GATEWAY)
+    if gateway is not None:
+        return socket.inet_ntop(family, gateway)
+    if RTA_VIA in attributes:
+        via = attributes[RTA_VIA]
+        via_family = int.from_bytes(via[:2], "little")
+        if via_family in (socket.AF_INET, socket.AF_INET6):
+            return socket.inet_ntop(via_family, via[2:])
+    return None
+
+
+def dump(
+    sock: socket.socket, msg_type: int, header: bytes
+) -> Iterator[tuple[int, bytes]]:
+    """Send a dump request and yield every reply until NLMSG_DONE.
+
+    :param sock: rtnetlink socket not subscribed to any multicast group
+    :type sock: socket.socket
+    :param msg_type: request type, e.g. RTM_GETROUTE
+    :type msg_type: int
+    :param header: family header of the request, e.g. a packed rtmsg
+    :type header: bytes
+    :return: iterator of (message type, payload)
+    :rtype: Iterator[tuple[int, bytes]]
+    """
+
+    request = _NLMSGHDR.pack(
+        _NLMSGHDR.size + len(header), msg_type, NLM_F_REQUEST | NLM_F_DUMP, 1, 0
+    )
+    sock.send(request + header)
+    while True:
+        for reply_type, _flags, payload in parseMessages(sock.recv(1 << 20)):
+            if reply_type == NLMSG_DONE:
+                return
+            if reply_type == NLMSG_ERROR:
+                (error,) = _NLMSGERR.unpack_from(payload)
+                if error:
+                    raise OSError(-error, errno.errorcode.get(-error, "netlink error"))
+                return
+            yield reply_type, payload
+
+
+def dumpRoutes(
+    sock: socket.socket, family: int = socket.AF_UNSPEC
+) -> list[dict[str, Any]]:
+    """Dump the routing table of the namespace the socket lives in.
+
+    :param sock: rtnetlink socket not subscribed to any multicast group
+    :type sock: socket.socket
+    :param family: address family to dump (AF_INET, AF_INET6, AF_MPLS),
+        defaults to AF_UNSPEC
+    :type family: int, optional
+    :return: list of routes, see :func:`parseRoute`
+    :rtype: list[dict[str, Any]]
+    """
+
+    header = _RTMSG.pack(family, 0, 0, 0, 0, 0, 0, 0, 0)
+    return [
+        parseRoute(payload)
+        for msg_type, payload in dump(sock, RTM_GETROUTE, header)
+        if msg_type == RTM_NEWROUTE
+    ]
+
+
+def dumpLinks(sock: socket.socket) -> list[dict[str, Any]]:
+    """Dump interfaces and their counters in one request.
+
+    :param sock: rtnetlink socket not subscribed to any multicast group
+    :type sock: socket.socket
+    :return: list of interfaces with keys `index`, `name`, `up` and the
+        counters of struct rtnl_link_stats64 (`rx_bytes`, `tx_dropped`, ...)
+    :rtype: list[dict[str, Any]]
+    """
+
+    links = []
+    header = _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    for msg_type, payload in dump(sock, RTM_GETLINK, header):
+        if msg_type != RTM_NEWLINK:
+            continue
+        _, _, index, flags, _ = _IFINFOMSG.unpack_from(payload)
+        attributes = parseAttributes(payload, _IFINFOMSG.size)
+        link = {
+            "index": index,
+            "name": attributes.get(IFLA_IFNAME, b"").rstrip(b"\0").decode(),
+            # IFF_UP
+            "up": bool(flags & 0x1),
+        }
+        stats = attributes.get(IFLA_STATS64)
+        if stats is not None and len(stats) >= _LINK_STATS64.size:
+            link.update(zip(_LINK_STATS, _LINK_STATS64.unpack_from(stats)))
+        links.append(link)
+    return links
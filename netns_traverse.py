@@ -1,5 +1,7 @@
 import ctypes
 import os
+from contextlib import contextmanager
+from typing import Iterator
 
 CLONE_NEWNET = 0x40000000
 libc = ctypes.CDLL("libc.so.6", use_errno=True)
@@ -13,6 +15,36 @@ def ns(fd: int):
 
     :param fd: file descriptor of the network namespace
     :type fd: int
+    :raises OSError: if the process could not jump, it stays in its namespace
     """
 
-    libc.setns(fd, CLONE_NEWNET)
+    if libc.setns(fd, CLONE_NEWNET) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"setns: {os.strerror(errno)}")
+
+
+@contextmanager
+def netns(pid: int) -> Iterator[None]:
+    """Run the enclosed block inside the network namespace of a process.
+
+    `setns()` only moves the calling thread, so sockets opened inside the block
+    stay in the namespace after the thread jumps back to the root namespace.
+
+    :param pid: PID of a process inside the network namespace, e.g. the shell
+        of a Mininet node
+    :type pid: int
+    :raises OSError: if the namespace cannot be entered, the block is then not
+        run
+    """
+
+    netns_fd = os.open(f"/proc/{pid}/ns/net", os.O_RDONLY)
+    try:
+        ns(netns_fd)
+    except OSError:
+        os.close(netns_fd)
+        raise
+    try:
+        yield
+    finally:
+        ns(root_fd)
+        os.close(netns_fd)
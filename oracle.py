@@ -0,0 +1,587 @@
+import heapq
+import math
+import socket
+from ipaddress import IPv4Interface, IPv4Network, ip_interface, ip_network
+from typing import Any, NamedTuple, Union
+
+import netlink
+from base_topo import TopoWithRouter
+from frrouter import FRRouter
+from netns_traverse import netns
+
+from mininet.net import Mininet
+
+# Administrative distances of FRRouting
+_DISTANCES = {"ebgp": 20, "ospf": 110, "ibgp": 200, "client": 200}
+
+
+class Interface(NamedTuple):
+    """An IPv4 interface of a router as described by the topo."""
+
+    name: str
+    address: IPv4Interface
+    peer: Union[str, None]  # node at the other end of the link, if any
+    bw: Union[float, None]  # Mbit/s
+
+
+class ExpectedRoute(NamedTuple):
+    """Route a router should have in its kernel FIB."""
+
+    protocol: str  # "ospf" or "bgp"
+    gateways: frozenset[str]
+
+
+class _RouterConfig:
+    """What the oracle needs from the vtysh commands of a router."""
+
+    def __init__(self):
+        self.ospf = False
+        self.ospf_networks: list[tuple[IPv4Network, str]] = []
+        self.ospf_redistribute: set[str] = set()
+        self.reference_bandwidth = 100
+        self.costs: dict[str, int] = {}
+        self.intf_areas: dict[str, str] = {}
+        self.addresses: dict[str, list[IPv4Interface]] = {}
+        self.asn: Union[int, None] = None
+        # Neighbor address -> remote AS, "internal" or "external"
+        self.neighbors: dict[str, str] = {}
+        self.next_hop_self: set[str] = set()
+        self.reflector_clients: set[str] = set()
+        self.bgp_networks: list[IPv4Network] = []
+
+    @classmethod
+    def parse(cls, commands: tuple[str, ...]) -> "_RouterConfig":
+        """Parse the vtysh commands of a router, VRF instances are ignored."""
+
+        config = cls()
+        context: Union[str, None] = None
+        intf = ""
+        family: Union[str, None] = None
+        for command in commands:
+            words = command.split()
+            if not words:
+                continue
+            if words[:2] == ["router", "ospf"]:
+                context = "ospf" if len(words) == 2 else "other"
+                config.ospf |= len(words) == 2
+            elif words[:2] == ["router", "bgp"]:
+                context = "bgp" if "vrf" not in words else "other"
+                if context == "bgp":
+                    config.asn = int(words[2])
+                family = None
+            elif words[0] == "interface":
+                context, intf = "interface", words[1]
+            elif words[0] == "address-family" and context == "bgp":
+                family = " ".join(words[1:])
+            elif words[0] == "exit-address-family":
+                family = None
+            elif words[0] == "exit":
+                if family is not None:
+                    family = None
+                else:
+                    context = None
+            elif words[0] in ("end", "configure"):
+                context = None
+            elif context == "ospf":
+                config._parseOSPF(words)
+            elif context == "interface":
+                config._parseInterface(intf, words)
+            elif context == "bgp" and family in (None, "ipv4", "ipv4 unicast"):
+                config._parseBGP(words)
+            elif words[0] in ("mpls", "vrf", "bfd", "segment-routing", "line"):
+                context = "other"
+        return config
+
+    def _parseOSPF(self, words: list[str]):
+        if words[0] == "network" and len(words) >= 4:
+            self.ospf_networks.append((ip_network(words[1]), words[3]))
+        elif words[0] == "redistribute":
+            self.ospf_redistribute.add(words[1])
+        elif words[:2] == ["auto-cost", "reference-bandwidth"]:
+            self.reference_bandwidth = int(words[2])
+
+    def _parseInterface(self, intf: str, words: list[str]):
+        if words[:2] == ["ip", "address"]:
+            self.addresses.setdefault(intf, []).append(ip_interface(words[2]))
+        elif words[:3] == ["ip", "ospf", "cost"]:
+            self.costs[intf] = int(words[3])
+        elif words[:3] == ["ip", "ospf", "area"]:
+            self.intf_areas[intf] = words[3]
+
+    def _parseBGP(self, words: list[str]):
+        if words[0] == "neighbor" and len(words) >= 4 and words[2] == "remote-as":
+            self.neighbors[words[1]] = words[3]
+        elif words[0] == "neighbor" and words[2:3] == ["next-hop-self"]:
+            self.next_hop_self.add(words[1])
+        elif words[0] == "neighbor" and words[2:3] == ["route-reflector-client"]:
+            self.reflector_clients.add(words[1])
+        elif words[0] == "network":
+            self.bgp_networks.append(ip_network(words[1]))
+
+
+class PathOracle:
+    """Expected routes of every router, computed from the topo graph.
+
+    Interfaces and addresses come from links and `ip`/`params` of nodes,
+    `ip_commands` and `ip address` commands. OSPF adjacencies are formed on
+    links whose subnet is enabled in the same area on both routers, with
+    costs of `ip ospf cost` or derived from the bandwidth of links and the
+    reference bandwidth. BGP sessions come from `neighbor ... remote-as`,
+    AS boundaries from `router bgp`, and routes from `network` statements.
+
+    Next hops of OSPF routes are found with one Dijkstra per router that
+    carries the set of equal-cost first hops along, which is O(E log V) per
+    router and scales to thousands of routers. BGP routes are propagated with
+    AS-path loop prevention and without re-advertising iBGP routes to iBGP
+    peers, except by route reflectors, and are preferred by AS-path length,
+    eBGP over iBGP, then IGP cost to the next hop, which is resolved through
+    OSPF.
+
+    The model is the default VRF and IPv4: OSPF areas are flattened, VRFs,
+    route maps and summaries are not modeled.
+
+    :param topo: topo of the lab
+    :type topo: TopoWithRouter
+    """
+
+    def __init__(self, topo: TopoWithRouter):
+        self.topo = topo
+        routers = topo.routers()
+        self.configs = {
+            r: _RouterConfig.parse(tuple(topo.nodeInfo(r).get("commands") or ()))
+            for r in routers
+        }
+        self.interfaces = self._interfaces(routers)
+        self.owners = {
+            str(intf.address.ip): router
+            for router, intfs in self.interfaces.items()
+            for intf in intfs
+        }
+        self.kernel_routes = self._kernelRoutes(routers)
+
+        self.adjacency: dict[str, list[tuple[str, int, str]]] = {r: [] for r in routers}
+        self._buildAdjacency()
+        self.origins: dict[IPv4Network, set[str]] = {}
+        for router in routers:
+            for prefix in self._advertised(router):
+                self.origins.setdefault(prefix, set()).add(router)
+        self._paths: dict[str, tuple[dict[str, float], dict[str, frozenset[str]]]] = {}
+        self._resolved: dict[tuple[str, str], tuple[float, frozenset[str]]] = {}
+        self._bgp: Union[dict[str, dict[IPv4Network, tuple]], None] = None
+
+    def _interfaces(self, routers: list[str]) -> dict[str, list[Interface]]:
+        """Find IPv4 interfaces of routers, VRF interfaces excluded."""
+
+        interfaces: dict[str, list[Interface]] = {r: [] for r in routers}
+        default_ports: dict[str, int] = {}
+        for node in routers:
+            ports = self.topo.ports.get(node, {})
+            if ports:
+                default_ports[node] = min(ports)
+
+        for *_, info in self.topo.links(withKeys=True, withInfo=True):
+            # Ports and parameters are numbered after node1 and node2 of info
+            node1, node2 = info["node1"], info["node2"]
+            for i, (node, peer) in enumerate(((node1, node2), (node2, node1)), 1):
+                if node not in interfaces:
+                    continue
+                port = info[f"port{i}"]
+                name = info.get(f"intfName{i}") or f"{node}-eth{port}"
+                # Mininet sets `ip` of a node on its default interface, the one
+                # with the lowest port, after links are created
+                ip = info.get(f"params{i}", {}).get("ip")
+                if port == default_ports.get(node):
+                    ip = self.topo.nodeInfo(node).get("ip") or ip
+                if ip is not None:
+                    address = IPv4Interface(ip)
+                    interfaces[node].append(
+                        Interface(name, address, peer, info.get("bw"))
+                    )
+
+        for router in routers:
+            info = self.topo.nodeInfo(router)
+            config = self.configs[router]
+            vrf_intfs = {
+                i for intfs in (info.get("vrfs") or {}).values() for i in intfs
+            }
+            interfaces[router] = [
+                i for i in interfaces[router] if i.name not in vrf_intfs
+            ]
+            for command in info.get("ip_commands") or ():
+                words = command.split()
+                if words[:2] == ["addr", "add"] and "dev" in words:
+                    intf = words[words.index("dev") + 1]
+                    config.addresses.setdefault(intf, []).append(ip_interface(words[2]))
+            for intf, addresses in config.addresses.items():
+                interfaces[router] += [
+                    Interface(intf, a, None, None) for a in addresses
+                ]
+        return interfaces
+
+    def _kernelRoutes(self, routers: list[str]) -> dict[str, list[IPv4Network]]:
+        """Find blackhole routes added by `ip_commands`, e.g. external routes."""
+
+        routes: dict[str, list[IPv4Network]] = {}
+        for router in routers:
+            for command in self.topo.nodeInfo(router).get("ip_commands") or ():
+                words = command.split()
+                if words[:3] == ["route", "add", "blackhole"]:
+                    routes.setdefault(router, []).append(ip_network(words[3]))
+        return routes
+
+    def _ospfArea(self, router: str, intf: Interface) -> Union[str, None]:
+        """Area of an interface, None if OSPF is not enabled on it."""
+
+        config = self.configs[router]
+        if not config.ospf:
+            return None
+        if intf.name in config.intf_areas:
+            return config.intf_areas[intf.name]
+        for network, area in config.ospf_networks:
+            if intf.address.ip in network:
+                return area
+        return None
+
+    def _cost(self, router: str, intf: Interface) -> int:
+        config = self.configs[router]
+        if intf.name in config.costs:
+            return config.costs[intf.name]
+        if not intf.bw:
+            return 10  # FRRouting assumes 10 Mbit/s when bandwidth is unknown
+        return max(int(config.reference_bandwidth / intf.bw), 1)
+
+    def _buildAdjacency(self):
+        for router, intfs in self.interfaces.items():
+            for intf in intfs:
+                if intf.peer not in self.interfaces:
+                    continue
+                area = self._ospfArea(router, intf)
+                peer_intf = next(
+                    (
+                        i
+                        for i in self.interfaces[intf.peer]
+                        if i.peer == router
+                        and i.address.network == intf.address.network
+                    ),
+                    None,
+                )
+                if (
+                    area is None
+                    or peer_intf is None
+                    or self._ospfArea(intf.peer, peer_intf) != area
+                ):
+                    continue
+                self.adjacency[router].append(
+                    (intf.peer, self._cost(router, intf), str(peer_intf.address.ip))
+                )
+
+    def _advertised(self, router: str) -> set[IPv4Network]:
+        """Prefixes a router advertises into OSPF."""
+
+        config = self.configs[router]
+        if not config.ospf:
+            return set()
+        prefixes = {
+            intf.address.network
+            for intf in self.interfaces[router]
+            if "connected" in config.ospf_redistribute
+            or self._ospfArea(router, intf) is not None
+        }
+        if "kernel" in config.ospf_redistribute:
+            prefixes.update(self.kernel_routes.get(router, ()))
+        return prefixes
+
+    def shortestPaths(
+        self, source: str
+    ) -> tuple[dict[str, float], dict[str, frozenset[str]]]:
+        """Run Dijkstra from a router over OSPF adjacencies.
+
+        :param source: name of router
+        :type source: str
+        :return: cost to every reachable router, and gateway addresses of the
+            equal-cost first hops towards it
+        :rtype: tuple[dict[str, float], dict[str, frozenset[str]]]
+        """
+
+        if source in self._paths:
+            return self._paths[source]
+
+        costs: dict[str, float] = {source: 0}
+        first_hops: dict[str, frozenset[str]] = {source: frozenset()}
+        done: set[str] = set()
+        heap = [(0.0, source)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            for peer, link_cost, gateway in self.adjacency[node]:
+                via = frozenset((gateway,)) if node == source else first_hops[node]
+                new_cost = cost + link_cost
+                if new_cost < costs.get(peer, math.inf):
+                    costs[peer] = new_cost
+                    first_hops[peer] = via
+                    heapq.heappush(heap, (new_cost, peer))
+                elif new_cost == costs[peer] and peer not in done:
+                    first_hops[peer] = first_hops[peer] | via
+
+        self._paths[source] = (costs, first_hops)
+        return costs, first_hops
+
+    def _connected(self, router: str, address: str) -> bool:
+        return any(
+            ip_interface(address).ip in intf.address.network
+            for intf in self.interfaces[router]
+        )
+
+    def _resolve(self, router: str, address: str) -> tuple[float, frozenset[str]]:
+        """Resolve a next hop through connected routes, then through the
+        longest matching OSPF route.
+
+        :return: IGP cost and gateways, infinite cost if unreachable
+        """
+
+        if (router, address) in self._resolved:
+            return self._resolved[(router, address)]
+
+        resolved: tuple[float, frozenset[str]] = (math.inf, frozenset())
+        if self._connected(router, address):
+            resolved = (0, frozenset((address,)))
+        else:
+            ip = ip_interface(address).ip
+            covering = [p for p in self.origins if ip in p]
+            costs, first_hops = self.shortestPaths(router)
+            for prefix in sorted(covering, key=lambda p: -p.prefixlen):
+                reachable = [o for o in self.origins[prefix] if o in costs]
+                if reachable:
+                    cost = min(costs[o] for o in reachable)
+                    resolved = (
+                        cost,
+                        frozenset().union(
+                            *(first_hops[o] for o in reachable if costs[o] == cost)
+                        ),
+                    )
+                    break
+        self._resolved[(router, address)] = resolved
+        return resolved
+
+    def _bgpRoutes(self) -> dict[str, dict[IPv4Network, tuple]]:
+        """Propagate BGP routes until every speaker has its best routes.
+
+        :return: per speaker and prefix: AS path, how the route was learned
+            ("local", "ebgp", "ibgp" or "client" for iBGP from a route
+            reflector client) and next hop addresses
+        :rtype: dict[str, dict[IPv4Network, tuple]]
+        """
+
+        if self._bgp is not None:
+            return self._bgp
+
+        speakers = {r: c for r, c in self.configs.items() if c.asn is not None}
+        # Established sessions as (sender, receiver, address of sender seen
+        # by receiver)
+        sessions = []
+        for receiver, config in speakers.items():
+            for address in config.neighbors:
+                sender = self.owners.get(address)
+                if sender in speakers and any(
+                    self.owners.get(a) == receiver for a in speakers[sender].neighbors
+                ):
+                    sessions.append((sender, receiver, address))
+
+        best: dict[str, dict[IPv4Network, tuple]] = {r: {} for r in speakers}
+        for router, config in speakers.items():
+            for prefix in config.bgp_networks:
+                best[router][prefix] = ((), "local", frozenset())
+
+        for _ in range(len(speakers) + 1):
+            changed = False
+            for sender, receiver, address in sessions:
+                ebgp = speakers[sender].asn != speakers[receiver].asn
+                # Address of receiver configured on sender
+                peer = next(
+                    a
+                    for a in speakers[sender].neighbors
+                    if self.owners.get(a) == receiver
+                )
+                # Route reflectors pass routes of clients to every peer and
+                # other iBGP routes to clients only
+                reflects = peer in speakers[sender].reflector_clients
+                for prefix, (path, learned, next_hops) in list(best[sender].items()):
+                    if learned == "ibgp" and not ebgp and not reflects:
+                        continue
+                    new_path = (speakers[sender].asn, *path) if ebgp else path
+                    if speakers[receiver].asn in new_path:
+                        continue
+                    if (
+                        ebgp
+                        or learned == "local"
+                        or peer in speakers[sender].next_hop_self
+                    ):
+                        next_hops = frozenset((address,))
+                    if ebgp:
+                        kind = "ebgp"
+                    elif address in speakers[receiver].reflector_clients:
+                        kind = "client"
+                    else:
+                        kind = "ibgp"
+                    route = (new_path, kind, next_hops)
+                    current = best[receiver].get(prefix)
+                    if current is None or current[1] != "local":
+                        merged = self._bestBGP(receiver, current, route)
+                        if merged != current:
+                            best[receiver][prefix] = merged
+                            changed = True
+            if not changed:
+                break
+
+        self._bgp = best
+        return best
+
+    def _bestBGP(self, router: str, current: Union[tuple, None], route: tuple) -> tuple:
+        def key(candidate: tuple) -> tuple:
+            igp_cost = min(
+                (self._resolve(router, nh)[0] for nh in candidate[2]), default=0
+            )
+            return (len(candidate[0]), candidate[1] != "ebgp", igp_cost)
+
+        if current is None or key(route) < key(current):
+            return route
+        if (
+            key(route) == key(current)
+            and _DISTANCES[route[1]] == _DISTANCES[current[1]]
+        ):
+            return (current[0], current[1], current[2] | route[2])
+        return current
+
+    def expectedRoutes(self, router: str) -> dict[IPv4Network, ExpectedRoute]:
+        """Compute routes a router should have, connected prefixes excluded.
+
+        :param router: name of router
+        :type router: str
+        :return: expected route of every prefix the router can reach
+        :rtype: dict[IPv4Network, ExpectedRoute]
+        """
+
+        costs, first_hops = self.shortestPaths(router)
+        connected = {intf.address.network for intf in self.interfaces[router]}
+        routes: dict[IPv4Network, ExpectedRoute] = {}
+        distances: dict[IPv4Network, int] = {}
+
+        for prefix, origins in self.origins.items():
+            if prefix in connected or router in origins:
+                continue
+            reachable = [o for o in origins if o in costs]
+            if not reachable:
+                continue
+            cost = min(costs[o] for o in reachable)
+            gateways = frozenset().union(
+                *(first_hops[o] for o in reachable if costs[o] == cost)
+            )
+            routes[prefix] = ExpectedRoute("ospf", gateways)
+            distances[prefix] = _DISTANCES["ospf"]
+
+        for prefix, (_, learned, next_hops) in (
+            self._bgpRoutes().get(router, {}).items()
+        ):
+            if prefix in connected or learned == "local":
+                continue
+            if _DISTANCES[learned] >= distances.get(prefix, math.inf):
+                continue
+            gateways = frozenset().union(
+                *(self._resolve(router, next_hop)[1] for next_hop in next_hops)
+            )
+            if gateways:
+                routes[prefix] = ExpectedRoute("bgp", gateways)
+                distances[prefix] = _DISTANCES[learned]
+        return routes
+
+
+def kernelRoutes(router: FRRouter) -> dict[str, dict[str, Any]]:
+    """Dump IPv4 routes of the main table installed by routing daemons.
+
+    :param router: router
+    :type router: FRRouter
+    :return: route of every prefix, see :func:`netlink.parseRoute`
+    :rtype: dict[str, dict[str, Any]]
+    """
+
+    with netns(router.pid):
+        sock = netlink.openRouteSocket()
+    with sock:
+        routes = netlink.dumpRoutes(sock, socket.AF_INET)
+    return {
+        r["prefix"]: r
+        for r in routes
+        if r["table"] == netlink.RT_TABLE_MAIN
+        and netlink.RTPROT_NAMES.get(r["protocol"]) not in ("kernel", "boot")
+    }
+
+
+def checkFIBs(net: Mininet) -> dict[str, Any]:
+    """Compare kernel FIBs of every router against the oracle.
+
+    A route mismatches if it is missing, if it was installed by another
+    protocol, or if its gateways are not the expected ones. Equal-cost BGP
+    routes match if the kernel has some of the expected gateways, since BGP
+    multipath depends on `maximum-paths`.
+
+    :param net: a running Mininet instance built from a :class:`TopoWithRouter`
+        topo
+    :type net: Mininet
+    :raises ValueError: if the topo is not a :class:`TopoWithRouter`
+    :return: number of routers and expected routes, and mismatches per router
+        and prefix with the expected and actual protocol and gateways, and
+        the nodes that own the gateways
+    :rtype: dict[str, Any]
+    """
+
+    if not isinstance(net.topo, TopoWithRouter):
+        raise ValueError("the network is not built from a TopoWithRouter topo")
+    oracle = PathOracle(net.topo)
+
+    def describe(gateways) -> list[str]:
+        return sorted(f"{g} ({oracle.owners.get(g, '?')})" for g in gateways)
+
+    checked = 0
+    mismatches: dict[str, dict[str, dict[str, Any]]] = {}
+    for name in net.topo.routers():
+        router = net.get(name)
+        assert isinstance(router, FRRouter)
+        actual = kernelRoutes(router)
+        for prefix, expected in oracle.expectedRoutes(name).items():
+            checked += 1
+            route = actual.get(str(prefix))
+            if route is None:
+                status = "missing"
+                protocol, gateways = None, set()
+            else:
+                protocol = netlink.RTPROT_NAMES.get(
+                    route["protocol"], route["protocol"]
+                )
+                gateways = set(route["gateways"])
+                if protocol != expected.protocol:
+                    status = "protocol"
+                elif (
+                    gateways != expected.gateways
+                    if expected.protocol == "ospf"
+                    else not gateways or not gateways <= expected.gateways
+                ):
+                    status = "next_hop"
+                else:
+                    continue
+            mismatches.setdefault(name, {})[str(prefix)] = {
+                "status": status,
+                "expected": {
+                    "protocol": expected.protocol,
+                    "gateways": describe(expected.gateways),
+                },
+                "actual": {"protocol": protocol, "gateways": describe(gateways)},
+            }
+
+    return {
+        "routers": len(net.topo.routers()),
+        "checked": checked,
+        "mismatched": sum(len(m) for m in mismatches.values()),
+        "mismatches": mismatches,
+    }
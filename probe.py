@@ -0,0 +1,714 @@
+"""Probes that run inside the network namespace of a Mininet node.
+
+This file is executed as a script in a node with :func:`startProbe`, e.g.::
+
+    receiver = startProbe(h2, "flow-recv", "--port", "5001")
+    sender = startProbe(h1, "flow-send", h2.IP(), "--rate", "1000")
+    print(probeResult(receiver))
+    print(probeResult(startProbe(h1, "reach", h2.IP(), r1.IP())))
+
+    echo = startProbe(h2, "echo", "--port", "7001")
+    print(probeResult(startProbe(h1, "latency", h2.IP(), "--port", "7001")))
+
+Every mode prints one JSON document on stdout when it ends.
+"""
+
+import json
+import math
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+from argparse import ArgumentParser
+from array import array
+from subprocess import PIPE, Popen, TimeoutExpired
+from typing import Any, Union
+
+# Sequence number and send time
+_FLOW_PACKET = struct.Struct("!Qd")
+# ICMP type, code, checksum, identifier, sequence number, then send time
+_ECHO_HEADER = struct.Struct("!BBHHH")
+_ECHO_PAYLOAD = struct.Struct("!d")
+# Version and header length, TOS, total length, identification, fragment,
+# TTL, protocol, checksum, source and destination
+_IP_HEADER = struct.Struct("!BBHHHBBH4s4s")
+# Like SO_RCVBUF but not capped by net.core.rmem_max, missing from `socket`
+_SO_RCVBUFFORCE = 33
+
+
+class LatencyHistogram:
+    """Histogram of latencies with fixed memory and bounded relative error.
+
+    Latencies are counted in microseconds. Values below `2 * SUB_BUCKETS` get
+    one bucket each, larger values share buckets whose width is
+    `1 / SUB_BUCKETS` of their power of two, so a percentile is off by less
+    than 1/64 of its value. Values up to about 71 minutes fit in 1728 buckets,
+    larger ones are counted in the last bucket. Histograms of many probes and
+    runs can be merged without losing precision.
+    """
+
+    SUB_BUCKETS = 64
+    _MAX_VALUE = (1 << 32) - 1
+    _LINEAR = 2 * SUB_BUCKETS
+
+    def __init__(self):
+        self.buckets = array("Q", bytes(8 * self._index(self._MAX_VALUE) + 8))
+        self.count = 0
+        self.total = 0
+        self.min = math.inf
+        self.max = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < cls._LINEAR:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKETS.bit_length()
+        return cls._LINEAR + (shift - 1) * cls.SUB_BUCKETS + (value >> shift) - 64
+
+    @classmethod
+    def _upperBound(cls, index: int) -> int:
+        if index < cls._LINEAR:
+            return index
+        shift, offset = divmod(index - cls._LINEAR, cls.SUB_BUCKETS)
+        return ((cls.SUB_BUCKETS + offset + 1) << (shift + 1)) - 1
+
+    def record(self, value_ms: float):
+        """Count a latency.
+
+        :param value_ms: latency in milliseconds
+        :type value_ms: float
+        """
+
+        value = min(max(int(value_ms * 1000), 0), self._MAX_VALUE)
+        self.buckets[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the counts of another histogram.
+
+        :param other: histogram to add
+        :type other: LatencyHistogram
+        """
+
+        for index, count in enumerate(other.buckets):
+            if count:
+                self.buckets[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """Return the p-th percentile, the upper bound of its bucket.
+
+        :param p: percentile in range [0, 100]
+        :type p: float
+        :return: the percentile in milliseconds, `nan` if the histogram is
+            empty
+        :rtype: float
+        """
+
+        if not self.count:
+            return math.nan
+        rank = max(math.ceil(p / 100 * self.count), 1)
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(self._upperBound(index), self.max) / 1000
+        return self.max / 1000
+
+    def summary(self) -> dict[str, float]:
+        """Summarize the histogram like :func:`results.summarize`.
+
+        :return: count, min, mean, p50, p90, p99, p99.9 and max in
+            milliseconds
+        :rtype: dict[str, float]
+        """
+
+        empty = not self.count
+        return {
+            "count": self.count,
+            "min": math.nan if empty else self.min / 1000,
+            "mean": math.nan if empty else self.total / self.count / 1000,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": math.nan if empty else self.max / 1000,
+        }
+
+    def toDict(self) -> dict[str, Any]:
+        """Serialize the histogram, only non-empty buckets are kept.
+
+        :return: JSON serializable histogram
+        :rtype: dict[str, Any]
+        """
+
+        return {
+            "unit": "us",
+            "sub_buckets": self.SUB_BUCKETS,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max,
+            "buckets": {str(i): c for i, c in enumerate(self.buckets) if c},
+        }
+
+    @classmethod
+    def fromDict(cls, data: dict[str, Any]) -> "LatencyHistogram":
+        """Deserialize a histogram serialized by :meth:`toDict`.
+
+        :param data: serialized histogram
+        :type data: dict[str, Any]
+        :return: the histogram
+        :rtype: LatencyHistogram
+        """
+
+        histogram = cls()
+        for index, count in data["buckets"].items():
+            histogram.buckets[int(index)] = count
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = math.inf if data["min"] is None else data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def startProbe(node: Any, *args: str) -> Popen:
+    """Start a probe inside the network namespace of a Mininet node.
+
+    :param node: Mininet node
+    :type node: Node
+    :param args: probe mode and its arguments
+    :type args: tuple[str, ...]
+    :return: the probe process
+    :rtype: Popen
+    """
+
+    return node.popen(
+        [sys.executable, os.path.abspath(__file__), *args],
+        stdout=PIPE,
+        stderr=PIPE,
+        text=True,
+    )
+
+
+def probeResult(process: Popen, timeout: Union[float, None] = None) -> dict:
+    """Wait for a probe to end and parse its result.
+
+    :param process: the probe process
+    :type process: Popen
+    :param timeout: seconds to wait, forever if None, defaults to None
+    :type timeout: Union[float, None], optional
+    :raises RuntimeError: if the probe did not print a result
+    :return: result of the probe
+    :rtype: dict
+    """
+
+    stdout, stderr = process.communicate(timeout=timeout)
+    try:
+        return json.loads(stdout.strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        raise RuntimeError(f"probe failed: {stderr.strip()}") from None
+
+
+def stopProbes(processes: list[Popen], timeout: float = 10):
+    """Stop probes that are still running, e.g. after another probe failed,
+    and discard their results.
+
+    :param processes: probe processes
+    :type processes: list[Popen]
+    :param timeout: seconds to wait for a probe before killing it, defaults to
+        10
+    :type timeout: float, optional
+    """
+
+    running = [process for process in processes if process.poll() is None]
+    for process in running:
+        process.send_signal(signal.SIGTERM)
+    for process in running:
+        try:
+            process.communicate(timeout=timeout)
+        except TimeoutExpired:
+            process.kill()
+            process.communicate()
+
+
+def _stopOnSignal():
+    """Turn SIGTERM/SIGINT into KeyboardInterrupt so results are printed."""
+
+    def handler(_signum, _frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
+
+
+def flowSend(dst: str, port: int, rate: float, duration: float, size: int) -> dict:
+    """Send sequence-numbered UDP packets at a fixed rate.
+
+    :param dst: destination address
+    :type dst: str
+    :param port: destination port
+    :type port: int
+    :param rate: packets per second
+    :type rate: float
+    :param duration: seconds to send
+    :type duration: float
+    :param size: UDP payload size in bytes
+    :type size: int
+    :return: number of packets sent and send start/end time
+    :rtype: dict
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    padding = bytes(max(size - _FLOW_PACKET.size, 0))
+    interval = 1 / rate
+    started_at = time.time()
+    seq = 0
+    try:
+        while True:
+            deadline = started_at + seq * interval
+            now = time.time()
+            if now - started_at >= duration:
+                break
+            if deadline > now:
+                time.sleep(deadline - now)
+            try:
+                sock.sendto(_FLOW_PACKET.pack(seq, time.time()) + padding, (dst, port))
+            except OSError:
+                # No route to host while the network converges
+                pass
+            seq += 1
+    except KeyboardInterrupt:
+        pass
+    return {"sent": seq, "start": started_at, "end": time.time(), "rate": rate}
+
+
+def flowReceive(port: int, duration: float, rate: float) -> dict:
+    """Receive sequence-numbered packets and find outages, reordering and
+    duplicates.
+
+    An outage is a run of lost sequence numbers. Its window is measured on the
+    sender clock, from the send time of the last packet delivered before the
+    run to the send time of the first packet delivered after it.
+
+    :param port: listening port
+    :type port: int
+    :param duration: seconds to receive, until interrupted if 0
+    :type duration: float
+    :param rate: expected packet rate, used to size buffers
+    :type rate: float
+    :return: counters and the list of outages
+    :rtype: dict
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+    sock.bind(("0.0.0.0", port))
+    sock.settimeout(0.5)
+
+    # Send time of each sequence number, NaN if not received
+    sent_at = array("d", [math.nan]) * int(rate * max(duration, 60) + rate)
+    received = duplicates = reordered = 0
+    highest = -1
+    deadline = time.time() + duration if duration else math.inf
+    try:
+        while time.time() < deadline:
+            try:
+                data = sock.recv(65535)
+            except socket.timeout:
+                continue
+            seq, send_time = _FLOW_PACKET.unpack_from(data)
+            if seq >= len(sent_at):
+                sent_at.extend([math.nan] * (seq + 1 - len(sent_at) + int(rate)))
+            if not math.isnan(sent_at[seq]):
+                duplicates += 1
+                continue
+            sent_at[seq] = send_time
+            received += 1
+            if seq < highest:
+                reordered += 1
+            highest = max(highest, seq)
+    except KeyboardInterrupt:
+        pass
+
+    outages = []
+    last = None
+    for seq in range(highest + 1):
+        if math.isnan(sent_at[seq]):
+            continue
+        if last is not None and seq - last > 1:
+            outages.append(
+                {
+                    "start": sent_at[last],
+                    "end": sent_at[seq],
+                    "duration_ms": (sent_at[seq] - sent_at[last]) * 1000,
+                    "lost": seq - last - 1,
+                }
+            )
+        last = seq
+
+    return {
+        "received": received,
+        "lost": highest + 1 - received,
+        "duplicates": duplicates,
+        "reordered": reordered,
+        "outages": outages,
+        "highest": highest,
+        "last_at": sent_at[highest] if highest >= 0 else None,
+    }
+
+
+def closeFlow(flow: dict, sent: dict) -> dict:
+    """Account for the packets lost at the end of a flow.
+
+    The receiver only sees outages that end with a delivered packet. Packets
+    sent after the last delivered one are lost too, they form a trailing
+    outage that lasts until the sender stopped.
+
+    :param flow: result of a `flow-recv` probe
+    :type flow: dict
+    :param sent: result of the `flow-send` probe of the same flow
+    :type sent: dict
+    :return: `flow` with `lost` counted from the packets sent and the
+        trailing outage, if any, marked with `trailing`
+    :rtype: dict
+    """
+
+    flow = {**flow, "lost": sent["sent"] - flow["received"]}
+    trailing = sent["sent"] - 1 - flow["highest"]
+    if trailing > 0:
+        start = flow["last_at"] if flow["last_at"] is not None else sent["start"]
+        outage = {
+            "start": start,
+            "end": sent["end"],
+            "duration_ms": (sent["end"] - start) * 1000,
+            "lost": trailing,
+            "trailing": True,
+        }
+        flow["outages"] = [*flow["outages"], outage]
+    return flow
+
+
+def echo(port: int, duration: float) -> dict:
+    """Send every UDP packet back to its sender.
+
+    :param port: listening port
+    :type port: int
+    :param duration: seconds to answer, until interrupted if 0
+    :type duration: float
+    :return: number of packets echoed
+    :rtype: dict
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+    sock.bind(("0.0.0.0", port))
+    sock.settimeout(0.5)
+
+    echoed = 0
+    deadline = time.time() + duration if duration else math.inf
+    try:
+        while time.time() < deadline:
+            try:
+                data, address = sock.recvfrom(65535)
+                sock.sendto(data, address)
+                echoed += 1
+            except socket.timeout:
+                continue
+            except OSError:
+                # No route back while the network converges
+                pass
+    except KeyboardInterrupt:
+        pass
+    return {"echoed": echoed}
+
+
+def latency(
+    dst: str, port: int, rate: float, duration: float, size: int, timeout: float
+) -> dict:
+    """Send timestamped UDP packets at a fixed rate to an echo probe and count
+    round-trip times in a :class:`LatencyHistogram`.
+
+    Replies are received between sends, so the sender keeps its pace and
+    memory does not grow with the number of packets.
+
+    :param dst: address of the echo probe
+    :type dst: str
+    :param port: port of the echo probe
+    :type port: int
+    :param rate: packets per second
+    :type rate: float
+    :param duration: seconds to send
+    :type duration: float
+    :param size: UDP payload size in bytes
+    :type size: int
+    :param timeout: seconds to wait for replies after the last packet
+    :type timeout: float
+    :return: packets sent and received, summary and buckets of the histogram
+    :rtype: dict
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+    sock.setblocking(False)
+    padding = bytes(max(size - _FLOW_PACKET.size, 0))
+    histogram = LatencyHistogram()
+    interval = 1 / rate
+    sent = received = 0
+
+    started_at = time.perf_counter()
+    deadline = started_at + duration + timeout
+    try:
+        while True:
+            now = time.perf_counter()
+            sending = now - started_at < duration
+            if not sending and (now >= deadline or received >= sent):
+                break
+            if sending and now >= started_at + sent * interval:
+                try:
+                    packet = _FLOW_PACKET.pack(sent, time.perf_counter())
+                    sock.sendto(packet + padding, (dst, port))
+                except OSError:
+                    # No route to host while the network converges
+                    pass
+                sent += 1
+                continue
+
+            wait = started_at + sent * interval if sending else deadline
+            select.select([sock], [], [], max(wait - now, 0))
+            while True:
+                try:
+                    data = sock.recv(65535)
+                except (BlockingIOError, ConnectionRefusedError):
+                    break
+                _, sent_at = _FLOW_PACKET.unpack_from(data)
+                histogram.record((time.perf_counter() - sent_at) * 1000)
+                received += 1
+    except KeyboardInterrupt:
+        pass
+
+    return {
+        "sent": sent,
+        "received": received,
+        "lost": max(sent - received, 0),
+        "summary": histogram.summary(),
+        "histogram": histogram.toDict(),
+    }
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(array("H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return socket.htons(~total & 0xFFFF)
+
+
+def _echoRequest(ident: int, seq: int) -> bytes:
+    payload = _ECHO_PAYLOAD.pack(time.time())
+    checksum = _checksum(_ECHO_HEADER.pack(8, 0, 0, ident, seq) + payload)
+    return _ECHO_HEADER.pack(8, 0, checksum, ident, seq) + payload
+
+
+def _ipHeader(src: str, dst: str, length: int) -> bytes:
+    # The kernel fills in the identification and the checksum
+    return _IP_HEADER.pack(
+        0x45,
+        0,
+        _IP_HEADER.size + length,
+        0,
+        0,
+        64,
+        socket.IPPROTO_ICMP,
+        0,
+        socket.inet_aton(src),
+        socket.inet_aton(dst),
+    )
+
+
+def reach(
+    targets: list[str],
+    count: int,
+    interval: float,
+    timeout: float,
+    until_reachable: bool,
+    sources: Union[list[str], None] = None,
+) -> dict:
+    """Ping every target at once, `count` rounds of one echo request each.
+
+    A single raw socket sends every round to all targets and matches replies
+    by identifier and source address, so probing N targets takes as long as
+    probing one.
+
+    With `sources`, the socket writes IP headers itself and every source
+    address pings every target, so one process probes on behalf of all the
+    endpoints of a :class:`endpoints.EndpointHost`. Replies are matched by
+    their destination address too.
+
+    :param targets: destination addresses
+    :type targets: list[str]
+    :param count: number of rounds
+    :type count: int
+    :param interval: seconds between rounds
+    :type interval: float
+    :param timeout: seconds to wait for replies after the last round
+    :type timeout: float
+    :param until_reachable: stop as soon as every target answered the last
+        round
+    :type until_reachable: bool
+    :param sources: local addresses to send from, the address of the outgoing
+        interface if None, defaults to None
+    :type sources: Union[list[str], None], optional
+    :return: echo requests sent, replies received and round-trip times in
+        milliseconds of every target, of every target of every source if
+        `sources` is given
+    :rtype: dict
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+    sock.setblocking(False)
+    if sources:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_HDRINCL, 1)
+    ident = os.getpid() & 0xFFFF
+    pairs = [(s, t) for s in sources or [None] for t in targets]
+    sent = dict.fromkeys(pairs, 0)
+    answered: dict[tuple, set[int]] = {p: set() for p in pairs}
+    rtts: dict[tuple, list[float]] = {p: [] for p in pairs}
+    # Replies of a round arrive in a burst, the default buffer only holds a
+    # few hundred of them
+    try:
+        buffer_size = max(len(pairs) * 2048, 1 << 18)
+        sock.setsockopt(socket.SOL_SOCKET, _SO_RCVBUFFORCE, buffer_size)
+    except PermissionError:
+        pass
+
+    rounds = 0
+    next_round = time.time()
+    deadline = math.inf
+    try:
+        while True:
+            now = time.time()
+            if rounds < count and now >= next_round:
+                for source, target in pairs:
+                    packet = _echoRequest(ident, rounds)
+                    if source is not None:
+                        packet = _ipHeader(source, target, len(packet)) + packet
+                    try:
+                        sock.sendto(packet, (target, 0))
+                        sent[source, target] += 1
+                    except OSError:
+                        # No route to host yet
+                        pass
+                rounds += 1
+                next_round = now + interval
+                if rounds == count:
+                    deadline = now + timeout
+            if now >= deadline or (
+                until_reachable and all(rounds - 1 in a for a in answered.values())
+            ):
+                break
+
+            wait = min(next_round if rounds < count else deadline, deadline) - now
+            select.select([sock], [], [], max(wait, 0))
+            while True:
+                try:
+                    data, (address, _) = sock.recvfrom(2048)
+                except BlockingIOError:
+                    break
+                offset = (data[0] & 0x0F) * 4
+                kind, _, _, reply_ident, seq = _ECHO_HEADER.unpack_from(data, offset)
+                pair = (socket.inet_ntoa(data[16:20]) if sources else None, address)
+                if kind != 0 or reply_ident != ident or pair not in answered:
+                    continue
+                if seq in answered[pair]:
+                    continue
+                answered[pair].add(seq)
+                (sent_at,) = _ECHO_PAYLOAD.unpack_from(data, offset + 8)
+                rtts[pair].append((time.time() - sent_at) * 1000)
+    except KeyboardInterrupt:
+        pass
+
+    results: dict = {}
+    for source, target in pairs:
+        pings = {
+            "sent": sent[source, target],
+            "received": len(answered[source, target]),
+            "rtt_ms": rtts[source, target],
+        }
+        if source is None:
+            results[target] = pings
+        else:
+            results.setdefault(source, {})[target] = pings
+    return results
+
+
+def main(argv: list[str]) -> dict:
+    parser = ArgumentParser(description="probes run inside Mininet nodes")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    send = modes.add_parser("flow-send", help="send a sequence-numbered UDP flow")
+    send.add_argument("dst", type=str)
+    send.add_argument("--port", type=int, default=5001)
+    send.add_argument("--rate", type=float, default=1000)
+    send.add_argument("--duration", type=float, default=30)
+    send.add_argument("--size", type=int, default=64)
+
+    recv = modes.add_parser("flow-recv", help="receive a sequence-numbered flow")
+    recv.add_argument("--port", type=int, default=5001)
+    recv.add_argument("--rate", type=float, default=1000)
+    recv.add_argument("--duration", type=float, default=0)
+
+    ping = modes.add_parser("reach", help="ping many destinations at once")
+    ping.add_argument("targets", type=str, nargs="*")
+    ping.add_argument("--count", type=int, default=3)
+    ping.add_argument("--interval", type=float, default=0.2)
+    ping.add_argument("--timeout", type=float, default=1)
+    ping.add_argument("--until-reachable", action="store_true")
+    ping.add_argument("--sources", type=str, nargs="+")
+
+    echo_server = modes.add_parser("echo", help="send UDP packets back")
+    echo_server.add_argument("--port", type=int, default=7001)
+    echo_server.add_argument("--duration", type=float, default=0)
+
+    rtt = modes.add_parser("latency", help="measure round-trip time distribution")
+    rtt.add_argument("dst", type=str)
+    rtt.add_argument("--port", type=int, default=7001)
+    rtt.add_argument("--rate", type=float, default=1000)
+    rtt.add_argument("--duration", type=float, default=10)
+    rtt.add_argument("--size", type=int, default=64)
+    rtt.add_argument("--timeout", type=float, default=1)
+
+    args = parser.parse_args(argv)
+    _stopOnSignal()
+    if args.mode == "echo":
+        return echo(args.port, args.duration)
+    if args.mode == "latency":
+        return latency(
+            args.dst, args.port, args.rate, args.duration, args.size, args.timeout
+        )
+    if args.mode == "reach":
+        return reach(
+            args.targets,
+            args.count,
+            args.interval,
+            args.timeout,
+            args.until_reachable,
+            args.sources,
+        )
+    if args.mode == "flow-send":
+        return flowSend(args.dst, args.port, args.rate, args.duration, args.size)
+    return flowReceive(args.port, args.duration, args.rate)
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(sys.argv[1:])), flush=True)
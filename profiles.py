@@ -0,0 +1,181 @@
+from typing import NamedTuple, Union
+
+from bfd import bgpNeighbors
+from frrouter import FRRouter
+
+
+class ConvergenceProfile(NamedTuple):
+    """Timers that trade control-plane load for convergence speed.
+
+    A timer set to None keeps the FRRouting default. Intervals are in seconds
+    and throttle timers in milliseconds.
+    """
+
+    ospf_hello_interval: Union[int, None] = None
+    ospf_dead_interval: Union[int, None] = None
+    # Sub-second hellos: dead interval of 1 second, this many hellos per second
+    ospf_hello_multiplier: Union[int, None] = None
+    # Delay, initial hold time and maximum hold time
+    ospf_spf_throttle: Union[tuple[int, int, int], None] = None
+    ospf_lsa_throttle: Union[int, None] = None
+    ospf_lsa_min_arrival: Union[int, None] = None
+    bgp_keepalive: Union[int, None] = None
+    bgp_hold: Union[int, None] = None
+    bgp_advertisement_interval: Union[int, None] = None
+    ldp_hello_interval: Union[int, None] = None
+    ldp_hello_holdtime: Union[int, None] = None
+
+
+PROFILES = {
+    "default": ConvergenceProfile(),
+    "fast": ConvergenceProfile(
+        ospf_hello_interval=1,
+        ospf_dead_interval=4,
+        ospf_spf_throttle=(0, 50, 1000),
+        ospf_lsa_throttle=50,
+        ospf_lsa_min_arrival=50,
+        bgp_keepalive=3,
+        bgp_hold=9,
+        bgp_advertisement_interval=0,
+        ldp_hello_interval=1,
+        ldp_hello_holdtime=3,
+    ),
+    "aggressive": ConvergenceProfile(
+        ospf_hello_multiplier=4,
+        ospf_spf_throttle=(0, 10, 500),
+        ospf_lsa_throttle=0,
+        ospf_lsa_min_arrival=0,
+        bgp_keepalive=1,
+        bgp_hold=3,
+        bgp_advertisement_interval=0,
+        ldp_hello_interval=1,
+        ldp_hello_holdtime=3,
+    ),
+}
+
+
+def routerInstances(router: FRRouter, statement: str) -> list[str]:
+    """Find `router ospf`, `router bgp ...` statements in the running
+    configuration, VRF instances included.
+
+    :param router: a started router
+    :type router: FRRouter
+    :param statement: statement of the routing protocol, e.g. "router ospf"
+    :type statement: str
+    :return: statements of every instance, e.g. "router bgp 65000 vrf red"
+    :rtype: list[str]
+    """
+
+    return [
+        line.strip()
+        for line in router.show("show running-config").splitlines()
+        if line.startswith(f"{statement} ") or line == statement
+    ]
+
+
+def profileCommands(
+    router: FRRouter,
+    profile: ConvergenceProfile,
+    intfs: Union[list[str], None] = None,
+) -> tuple[str, ...]:
+    """Generate vtysh commands to apply a convergence profile to a router.
+
+    :param router: router to configure
+    :type router: FRRouter
+    :param profile: convergence profile
+    :type profile: ConvergenceProfile
+    :param intfs: only apply OSPF interface timers to these interfaces, e.g.
+        interfaces of a new link, the whole profile if None, defaults to None
+    :type intfs: Union[list[str], None], optional
+    :return: vtysh commands, empty if the profile keeps every default
+    :rtype: tuple[str, ...]
+    """
+
+    p = profile
+    commands = []
+
+    if "ospfd" in router.daemons:
+        intf_commands = []
+        if p.ospf_hello_multiplier is not None:
+            intf_commands.append(
+                f"ip ospf dead-interval minimal hello-multiplier"
+                f" {p.ospf_hello_multiplier}"
+            )
+        else:
+            if p.ospf_hello_interval is not None:
+                intf_commands.append(f"ip ospf hello-interval {p.ospf_hello_interval}")
+            if p.ospf_dead_interval is not None:
+                intf_commands.append(f"ip ospf dead-interval {p.ospf_dead_interval}")
+        if intf_commands:
+            for intf in router.intfNames() if intfs is None else intfs:
+                if intf != "lo":
+                    commands += [f"interface {intf}", *intf_commands, "exit"]
+
+    if intfs is not None:
+        return ("configure terminal", *commands) if commands else ()
+
+    if "ospfd" in router.daemons:
+        ospf_commands = []
+        if p.ospf_spf_throttle is not None:
+            ospf_commands.append(
+                "timers throttle spf " + " ".join(map(str, p.ospf_spf_throttle))
+            )
+        if p.ospf_lsa_throttle is not None:
+            ospf_commands.append(f"timers throttle lsa all {p.ospf_lsa_throttle}")
+        if p.ospf_lsa_min_arrival is not None:
+            ospf_commands.append(f"timers lsa min-arrival {p.ospf_lsa_min_arrival}")
+        if ospf_commands:
+            for instance in routerInstances(router, "router ospf"):
+                commands += [instance, *ospf_commands, "exit"]
+
+    if "bgpd" in router.daemons:
+        for instance, peers in bgpNeighbors(router).items():
+            bgp_commands = []
+            if p.bgp_keepalive is not None and p.bgp_hold is not None:
+                bgp_commands.append(f"timers bgp {p.bgp_keepalive} {p.bgp_hold}")
+            if p.bgp_advertisement_interval is not None:
+                bgp_commands += [
+                    f"neighbor {peer} advertisement-interval"
+                    f" {p.bgp_advertisement_interval}"
+                    for peer in peers
+                ]
+            if bgp_commands:
+                commands += [instance, *bgp_commands, "exit"]
+
+    if "ldpd" in router.daemons:
+        ldp_commands = []
+        if p.ldp_hello_holdtime is not None:
+            ldp_commands.append(f"discovery hello holdtime {p.ldp_hello_holdtime}")
+        if p.ldp_hello_interval is not None:
+            ldp_commands.append(f"discovery hello interval {p.ldp_hello_interval}")
+        if ldp_commands:
+            commands += ["mpls ldp", *ldp_commands, "exit"]
+
+    return ("configure terminal", *commands) if commands else ()
+
+
+def applyProfile(
+    router: FRRouter,
+    profile: ConvergenceProfile,
+    intfs: Union[list[str], None] = None,
+):
+    """Apply a convergence profile to a router.
+
+    BGP sessions of every VRF are reset when BGP timers change because hold
+    times are negotiated when a session is established.
+
+    :param router: router to configure
+    :type router: FRRouter
+    :param profile: convergence profile
+    :type profile: ConvergenceProfile
+    :param intfs: only apply OSPF interface timers to these interfaces,
+        defaults to None
+    :type intfs: Union[list[str], None], optional
+    """
+
+    commands = profileCommands(router, profile, intfs)
+    if not commands:
+        return
+    router.vtysh(*commands)
+    if intfs is None and "bgpd" in router.daemons and profile.bgp_keepalive is not None:
+        router.vtysh("clear bgp vrf all *")
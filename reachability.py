@@ -0,0 +1,144 @@
+import time
+from typing import Any, Union
+
+from probe import probeResult, startProbe
+from results import summarize
+
+from mininet.net import Mininet
+from mininet.node import Node
+
+Matrix = dict[str, dict[str, dict[str, Any]]]
+
+
+def reachabilityMatrix(
+    net: Mininet,
+    nodes: Union[list[Node], None] = None,
+    count: int = 3,
+    interval: float = 0.2,
+    timeout: float = 1,
+    until_reachable: bool = False,
+) -> Matrix:
+    """Ping every pair of nodes, all sources at once.
+
+    Unlike `net.pingAll()`, which runs one `ping` after the other, every
+    source pings all destinations at once from a single probe process, and all
+    probes run in parallel, so a sweep takes about `count * interval +
+    timeout` seconds whatever the number of nodes.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param nodes: nodes to probe, with their default IP, all hosts if None,
+        defaults to None
+    :type nodes: Union[list[Node], None], optional
+    :param count: echo requests sent to every destination, defaults to 3
+    :type count: int, optional
+    :param interval: seconds between echo requests, defaults to 0.2
+    :type interval: float, optional
+    :param timeout: seconds to wait for replies after the last request,
+        defaults to 1
+    :type timeout: float, optional
+    :param until_reachable: every source stops as soon as all destinations
+        answered its last request, defaults to False
+    :type until_reachable: bool, optional
+    :return: `sent`, `received`, `loss` ratio and round-trip time summary in
+        milliseconds of every source and destination
+    :rtype: Matrix
+    """
+
+    nodes = [n for n in (nodes or net.hosts) if n.IP() is not None]
+    options = ["--count", str(count), "--interval", str(interval)]
+    options += ["--timeout", str(timeout)]
+    if until_reachable:
+        options.append("--until-reachable")
+
+    probes = {
+        src.name: startProbe(
+            src, "reach", *(dst.IP() for dst in nodes if dst is not src), *options
+        )
+        for src in nodes
+    }
+
+    matrix: Matrix = {}
+    for src in nodes:
+        result = probeResult(probes[src.name], timeout=count * interval + timeout + 30)
+        matrix[src.name] = {}
+        for dst in nodes:
+            if dst is src:
+                continue
+            pings = result[dst.IP()]
+            matrix[src.name][dst.name] = {
+                "sent": pings["sent"],
+                "received": pings["received"],
+                "loss": 1 - pings["received"] / pings["sent"] if pings["sent"] else 1,
+                "rtt_ms": summarize(pings["rtt_ms"]),
+            }
+    return matrix
+
+
+def unreachablePairs(matrix: Matrix) -> list[tuple[str, str]]:
+    """Find pairs of nodes without any echo reply.
+
+    :param matrix: reachability matrix
+    :type matrix: Matrix
+    :return: (source, destination) pairs
+    :rtype: list[tuple[str, str]]
+    """
+
+    return [
+        (src, dst)
+        for src, row in matrix.items()
+        for dst, pings in row.items()
+        if pings["received"] == 0
+    ]
+
+
+def printMatrix(matrix: Matrix):
+    """Print a reachability matrix like `net.pingAll()` does.
+
+    :param matrix: reachability matrix
+    :type matrix: Matrix
+    """
+
+    for src, row in matrix.items():
+        results = (dst if p["received"] else "X" for dst, p in row.items())
+        print(f"{src} -> {' '.join(results)}")
+    pairs = sum(len(row) for row in matrix.values())
+    lost = len(unreachablePairs(matrix))
+    print(
+        f"*** Results: {lost / pairs * 100 if pairs else 0:.0f}% dropped"
+        f" ({pairs - lost}/{pairs} reachable)"
+    )
+
+
+def waitReachable(
+    net: Mininet,
+    nodes: Union[list[Node], None] = None,
+    timeout: float = 120,
+    count: int = 5,
+    interval: float = 0.2,
+) -> Matrix:
+    """Probe every pair of nodes until all of them are reachable.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :param nodes: nodes to probe, all hosts if None, defaults to None
+    :type nodes: Union[list[Node], None], optional
+    :param timeout: maximum time to wait in seconds, defaults to 120
+    :type timeout: float, optional
+    :param count: maximum echo requests per destination and sweep, defaults
+        to 5
+    :type count: int, optional
+    :param interval: seconds between echo requests, defaults to 0.2
+    :type interval: float, optional
+    :return: matrix of the last sweep
+    :rtype: Matrix
+    """
+
+    deadline = time.time() + timeout
+    while True:
+        matrix = reachabilityMatrix(net, nodes, count, interval, until_reachable=True)
+        unreachable = unreachablePairs(matrix)
+        if not unreachable or time.time() >= deadline:
+            return matrix
+        print(f"*** Waiting for {len(unreachable)} unreachable pairs")
+        time.sleep(1)
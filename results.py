@@ -0,0 +1,99 @@
+import json
+import math
+import os
+import time
+from typing import Any, Sequence
+
+from profiles import PROFILES
+
+from mininet.net import Mininet
+
+RESULTS_PATH = "results.jsonl"
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Return the p-th percentile of values using the nearest-rank method.
+
+    :param values: sorted values
+    :type values: Sequence[float]
+    :param p: percentile in range [0, 100]
+    :type p: float
+    :return: the percentile, `nan` if there is no value
+    :rtype: float
+    """
+
+    if not values:
+        return math.nan
+    rank = max(math.ceil(p / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize(values: Sequence[float]) -> dict[str, float]:
+    """Summarize a sample with its count, min, max and tail percentiles.
+
+    :param values: sample
+    :type values: Sequence[float]
+    :return: summary of the sample
+    :rtype: dict[str, float]
+    """
+
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "min": ordered[0] if ordered else math.nan,
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else math.nan,
+    }
+
+
+def describeTopo(net: Mininet) -> dict[str, Any]:
+    """Describe the topology a result was measured on.
+
+    :param net: a Mininet instance
+    :type net: Mininet
+    :return: topology class, number of nodes, switch implementation (key of
+        switches.SWITCHES, or class), BFD intervals and convergence profile of
+        routers, and the instance of runner.py if any
+    :rtype: dict[str, Any]
+    """
+
+    # Imported here, switches.py records its results with this module
+    from switches import switchName
+
+    profile = getattr(net.topo, "profile", None)
+    switch = None
+    if net.switches:
+        switch = switchName(net.switches[0]) or type(net.switches[0]).__name__
+    return {
+        "topo": type(net.topo).__name__,
+        "hosts": len(net.hosts),
+        "switches": len(net.switches),
+        "switch": switch,
+        "links": len(net.links),
+        "bfd": getattr(net.topo, "bfd", None),
+        "profile": profile,
+        "timers": PROFILES[profile]._asdict() if profile in PROFILES else None,
+        "instance": os.environ.get("LAB_INSTANCE"),
+    }
+
+
+def recordResult(
+    net: Mininet, kind: str, data: dict[str, Any], path: str = RESULTS_PATH
+):
+    """Append a measurement to a JSON Lines file.
+
+    :param net: the Mininet instance the measurement was taken on
+    :type net: Mininet
+    :param kind: kind of measurement, e.g. "fib"
+    :type kind: str
+    :param data: the measurement
+    :type data: dict[str, Any]
+    :param path: path of the JSON Lines file, defaults to RESULTS_PATH
+    :type path: str, optional
+    """
+
+    record = {"time": time.time(), "kind": kind, **describeTopo(net), "data": data}
+    with open(path, "a") as file:
+        file.write(json.dumps(record) + "\n")
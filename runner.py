@@ -0,0 +1,211 @@
+"""Run labs as independent instances, side by side on one host.
+
+Every instance runs in its own network and mount namespaces, created with
+`unshare`, so nodes, interfaces and bridges of different labs never meet, and
+in its own copy of `/etc/frr`, `/var/run/frr` and `/var/run/netns`, so
+FRRouting pathspaces and namespace links of different labs never clash. Names
+of pathspaces also carry the instance ID because every lab shares the process
+table of the host.
+
+A batch is a JSON Lines file with one job per line, e.g. (wrapped here)::
+
+    {"topo": "ospf-scale", "experiment": "failover",
+     "topo_options": {"profile": "fast"},
+     "sweep": {"topo_options.routers": [10, 50, 100],
+               "experiment_options.trials": [5]}}
+
+Every combination of `sweep` values is a job. Run the batch with::
+
+    sudo python3 runner.py jobs.jsonl --workers 8
+
+Results are appended to `results.jsonl` with the instance ID, and the output
+of every instance is written to `runs/<instance>.log`.
+"""
+
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from argparse import SUPPRESS, ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import STDOUT, call, check_call
+from typing import Any, Union
+
+# Set in the environment of an instance, read by FRRouter and describeTopo()
+INSTANCE_ENV = "LAB_INSTANCE"
+LOG_FOLDER = "runs"
+
+_FRR_FOLDER = "/etc/frr"
+_PRIVATE_FOLDERS = ("/var/run/frr", "/var/run/netns")
+# OVS bridges live in the host-wide ovsdb, so instances with the same switch
+# names would take over each other's bridges, see switches.SWITCHES
+_HOST_WIDE_SWITCHES = ("ovs", "ovs-flows")
+
+
+def expandJob(job: dict[str, Any]) -> list[dict[str, Any]]:
+    """Expand the `sweep` of a job into one job per combination of values.
+
+    :param job: job with `topo`, `experiment`, `topo_options`,
+        `experiment_options`, `check_config`, `switch` and `sweep`, which maps
+        `SECTION.KEY` to a list of values
+    :type job: dict[str, Any]
+    :return: jobs without `sweep`
+    :rtype: list[dict[str, Any]]
+    """
+
+    sweep: dict[str, list[Any]] = job.get("sweep", {})
+    jobs = []
+    for values in itertools.product(*sweep.values()):
+        expanded = json.loads(
+            json.dumps({k: v for k, v in job.items() if k != "sweep"})
+        )
+        for path, value in zip(sweep, values):
+            section, _, key = path.partition(".")
+            expanded.setdefault(section, {})[key] = value
+        jobs.append(expanded)
+    return jobs
+
+
+def isolate(instance: str) -> str:
+    """Give the current process private FRRouting and netns folders.
+
+    Must be called in a new mount namespace with private propagation, see
+    :func:`runBatch`.
+
+    :param instance: instance ID
+    :type instance: str
+    :return: folder holding the copy of `/etc/frr`, to be removed at the end
+    :rtype: str
+    """
+
+    for folder in _PRIVATE_FOLDERS:
+        os.makedirs(folder, exist_ok=True)
+        check_call(["mount", "-t", "tmpfs", "-o", "mode=755", "tmpfs", folder])
+
+    # FRRouter copies the files of /etc/frr into the pathspace of every router
+    frr_folder = tempfile.mkdtemp(prefix=f"frr-{instance}-")
+    for entry in os.scandir(_FRR_FOLDER):
+        if entry.is_file():
+            shutil.copy2(entry.path, frr_folder)
+    check_call(["mount", "--bind", frr_folder, _FRR_FOLDER])
+
+    check_call(["ip", "link", "set", "dev", "lo", "up"])
+    os.environ[INSTANCE_ENV] = instance
+    return frr_folder
+
+
+def runInstance(instance: str, job: dict[str, Any]):
+    """Isolate the current process and run the experiment of a job.
+
+    :param instance: instance ID
+    :type instance: str
+    :param job: job, see :func:`expandJob`
+    :type job: dict[str, Any]
+    """
+
+    frr_folder = isolate(instance)
+    try:
+        # Imported once isolated, so modules that open the current network
+        # namespace at import time open the one of the instance
+        from mininet.log import setLogLevel
+
+        from main import main
+
+        setLogLevel("info")
+        main(
+            job["topo"],
+            topo_options=job.get("topo_options"),
+            experiment=job["experiment"],
+            experiment_options=job.get("experiment_options"),
+            check_config=job.get("check_config", True),
+            switch=job.get("switch", "lxbr"),
+        )
+    finally:
+        shutil.rmtree(frr_folder, ignore_errors=True)
+
+
+def _launch(instance: str, job: dict[str, Any], log_folder: str) -> dict[str, Any]:
+    command = ["unshare", "--net", "--mount", "--propagation", "private"]
+    command += [sys.executable, os.path.abspath(__file__)]
+    command += ["--instance", instance, "--job", json.dumps(job)]
+    started_at = time.time()
+    with open(os.path.join(log_folder, f"{instance}.log"), "w") as log:
+        returncode = call(command, stdout=log, stderr=STDOUT)
+    return {
+        "instance": instance,
+        "job": job,
+        "returncode": returncode,
+        "seconds": time.time() - started_at,
+    }
+
+
+def runBatch(
+    jobs: list[dict[str, Any]],
+    workers: Union[int, None] = None,
+    log_folder: str = LOG_FOLDER,
+) -> list[dict[str, Any]]:
+    """Run jobs in independent instances, `workers` at a time.
+
+    :param jobs: jobs, `sweep` is expanded, see :func:`expandJob`
+    :type jobs: list[dict[str, Any]]
+    :param workers: maximum number of instances running at once, number of
+        CPUs if None, defaults to None
+    :type workers: Union[int, None], optional
+    :param log_folder: folder of instance logs, defaults to LOG_FOLDER
+    :type log_folder: str, optional
+    :raises ValueError: if a job uses an OVS switch, which cannot be isolated
+    :return: instance ID, job, exit code and duration of every instance
+    :rtype: list[dict[str, Any]]
+    """
+
+    expanded = [j for job in jobs for j in expandJob(job)]
+    for job in expanded:
+        if job.get("switch", "lxbr") in _HOST_WIDE_SWITCHES:
+            raise ValueError(
+                f"switch {job['switch']} is shared by every instance, use lxbr"
+            )
+    os.makedirs(log_folder, exist_ok=True)
+    # Padded so that no instance ID is a prefix of another one, pathspaces
+    # are matched by name when FRRouting daemons are stopped
+    width = len(str(len(expanded)))
+    instances = [f"i{os.getpid()}-{i:0{width}}" for i in range(len(expanded))]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        runs = executor.map(
+            lambda args: _launch(*args, log_folder), zip(instances, expanded)
+        )
+        results = []
+        for run in runs:
+            status = "done" if run["returncode"] == 0 else "failed"
+            print(f"*** {run['instance']} {status} in {run['seconds']:.0f}s")
+            results.append(run)
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="run a batch of lab experiments.")
+    parser.add_argument("jobs", type=str, nargs="?", help="JSON Lines file of jobs")
+    parser.add_argument(
+        "--workers", type=int, help="maximum number of labs running at once"
+    )
+    # Used by runBatch() to start an instance
+    parser.add_argument("--instance", type=str, help=SUPPRESS)
+    parser.add_argument("--job", type=str, help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.instance is not None:
+        runInstance(args.instance, json.loads(args.job))
+    elif args.jobs is not None:
+        with open(args.jobs) as file:
+            jobs = [json.loads(line) for line in file if line.strip()]
+        try:
+            results = runBatch(jobs, args.workers)
+        except ValueError as e:
+            parser.error(str(e))
+        failed = [r for r in results if r["returncode"] != 0]
+        sys.exit(1 if failed else 0)
+    else:
+        parser.error("a jobs file is required")
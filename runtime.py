@@ -0,0 +1,200 @@
+from typing import Any, Union
+
+from base_topo import TopoWithRouter
+from frrouter import FRRouter
+
+from mininet.link import Link
+from mininet.net import Mininet
+from mininet.node import Node, Switch
+from mininet.nodelib import LinuxBridge
+
+
+def _topo(net: Mininet) -> TopoWithRouter:
+    if not isinstance(net.topo, TopoWithRouter):
+        raise ValueError("the network is not built from a TopoWithRouter topo")
+    return net.topo
+
+
+def _configureIntf(net: Mininet, node: Node, intf: str):
+    """Configure a new interface of a running node like the ones it started
+    with."""
+
+    if isinstance(node, LinuxBridge):
+        # LinuxBridge only enslaves interfaces when it starts
+        node.cmd("brctl addif", node, intf)
+    elif isinstance(node, Switch):
+        node.attach(intf)
+    elif isinstance(node, FRRouter):
+        # Same MTU as FRRouter.config() sets, room for labels
+        node.cmd(f"ip link set dev {intf} mtu 1600")
+        if node.daemons.count("ldpd"):
+            node.setMPLS(node.platform_labels, intf)
+        if node.srv6:
+            node.setSRv6(intf)
+        _topo(net).configureRouter(node, [intf])
+
+
+def addLink(
+    net: Mininet, node1: str, node2: str, configure: bool = True, **opts
+) -> Link:
+    """Add a link between two nodes of a running network.
+
+    The link is also added to the topo, with the same options as links built
+    from the topo.
+
+    :param net: a running Mininet instance built from a :class:`TopoWithRouter`
+        topo
+    :type net: Mininet
+    :param node1: name of first node
+    :type node1: str
+    :param node2: name of second node
+    :type node2: str
+    :param configure: configure the new interfaces of both nodes, e.g. MPLS
+        and LDP on routers running ldpd, defaults to True
+    :type configure: bool, optional
+    :param opts: link options, e.g. `params1={"ip": "10.0.9.1/24"}`
+    :return: the new link
+    :rtype: Link
+    """
+
+    topo = _topo(net)
+    key = topo.addLink(node1, node2, **opts)
+    link = net.addLink(**topo.linkInfo(node1, node2, key))
+    if configure:
+        for intf in (link.intf1, link.intf2):
+            _configureIntf(net, intf.node, intf.name)
+    return link
+
+
+def removeLink(net: Mininet, link: Link):
+    """Remove a link from a running network.
+
+    LDP is disabled on the interfaces of routers and interfaces are detached
+    from switches before they are deleted.
+
+    :param net: a running Mininet instance built from a :class:`TopoWithRouter`
+        topo
+    :type net: Mininet
+    :param link: link to remove
+    :type link: Link
+    """
+
+    topo = _topo(net)
+    for intf in (link.intf1, link.intf2):
+        node = intf.node
+        if isinstance(node, Switch) and hasattr(node, "detach"):
+            node.detach(intf)
+        if isinstance(node, FRRouter) and node.daemons.count("ldpd"):
+            node.vtysh(
+                "configure terminal",
+                "mpls ldp",
+                "address-family ipv4",
+                f"no interface {intf.name}",
+            )
+
+    ends = [(i.node.name, i.node.ports[i]) for i in (link.intf1, link.intf2)]
+    net.delLink(link)
+    topo.removeLink(ends[0][0], ends[1][0], ends[0][1], ends[1][1])
+
+
+def addRouter(
+    net: Mininet,
+    name: str,
+    links: Union[list[dict[str, Any]], None] = None,
+    **options,
+) -> FRRouter:
+    """Add a router and its links to a running network.
+
+    The router goes through the same steps as routers built from the topo:
+    `router_opts` of the topo, FRRouting pathspace, daemons and commands,
+    then LDP, BFD and the convergence profile. Only the interfaces of the new
+    links are configured on neighbors.
+
+    Example::
+
+        addRouter(
+            net,
+            "r9",
+            links=[{"node2": "r1", "params1": {"ip": "10.0.9.2/24"},
+                    "params2": {"ip": "10.0.9.1/24"}}],
+            ip="10.0.9.2/24",
+            daemons=("ospfd",),
+            commands=("configure terminal", "router ospf",
+                      "network 10.0.0.0/16 area 1"),
+        )
+
+    :param net: a running Mininet instance built from a :class:`TopoWithRouter`
+        topo
+    :type net: Mininet
+    :param name: name of the router
+    :type name: str
+    :param links: options of every link, `node2` is the neighbor, defaults to
+        None
+    :type links: Union[list[dict[str, Any]], None], optional
+    :param options: options of :class:`FRRouter`
+    :raises ValueError: if a node with this name exists, a neighbor does not
+        exist or the router could not be added, which is then removed
+    :return: the new router
+    :rtype: FRRouter
+    """
+
+    topo = _topo(net)
+    if name in net:
+        raise ValueError(f"{name} already exists")
+    links = [dict(link_opts) for link_opts in links or []]
+    missing = [str(l.get("node2")) for l in links if l.get("node2") not in net]
+    if missing:
+        raise ValueError(f"no node {' '.join(missing)}")
+
+    topo.addRouter(name, **options)
+    try:
+        router = net.addHost(name, **topo.nodeInfo(name))
+        assert isinstance(router, FRRouter)
+
+        new_links = [
+            addLink(net, name, link_opts.pop("node2"), False, **link_opts)
+            for link_opts in links
+        ]
+
+        # Interfaces exist now, so the router is configured as
+        # Mininet.configHosts() does for routers built from the topo.
+        router.configDefault()
+        topo.configureRouter(router)
+
+        for link in new_links:
+            peer_intf = link.intf2 if link.intf1.node is router else link.intf1
+            _configureIntf(net, peer_intf.node, peer_intf.name)
+    except Exception as e:
+        if name in net:
+            removeRouter(net, name)
+        else:
+            topo.removeNode(name)
+        raise ValueError(f"could not add {name}: {e}") from e
+
+    return router
+
+
+def removeRouter(net: Mininet, name: str):
+    """Stop a router and remove it and its links from a running network.
+
+    :param net: a running Mininet instance built from a :class:`TopoWithRouter`
+        topo
+    :type net: Mininet
+    :param name: name of the router
+    :type name: str
+    :raises ValueError: if the node is not a router
+    """
+
+    topo = _topo(net)
+    router = net.get(name) if name in net else None
+    if not isinstance(router, FRRouter):
+        raise ValueError(f"{name} is not a router")
+
+    for link in [l for l in net.links if router in (l.intf1.node, l.intf2.node)]:
+        removeLink(net, link)
+
+    # Like Mininet.delNode(), which would terminate the router twice
+    router.stop(deleteIntfs=True)
+    net.hosts.remove(router)
+    del net.nameToNode[name]
+    topo.removeNode(name)
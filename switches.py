@@ -0,0 +1,166 @@
+"""Switch implementations of the lab and a benchmark to compare them.
+
+Run the benchmark with::
+
+    sudo python3 switches.py --switches 1 10 100 --duration 10
+
+Every implementation forwards between two hosts at the ends of a chain of
+switches. Start-up time, throughput and latency of every implementation and
+chain length are appended to the results file.
+"""
+
+import time
+from argparse import ArgumentParser
+from functools import partial
+from typing import Any, Callable, Union
+
+from bench import measureLatency, measureThroughput
+from results import recordResult
+
+from mininet.link import Link
+from mininet.log import setLogLevel
+from mininet.net import Mininet
+from mininet.node import OVSSwitch, Switch
+from mininet.nodelib import LinuxBridge
+from mininet.topo import Topo
+
+# Switch implementations selectable with `--switch`. Without controller, OVS
+# either acts as a learning switch on its own (standalone) or only follows the
+# flows installed by :func:`installFlows` (secure).
+SWITCHES: dict[str, Callable[..., Switch]] = {
+    "lxbr": LinuxBridge,
+    "ovs": partial(OVSSwitch, failMode="standalone"),
+    "ovs-flows": partial(OVSSwitch, failMode="secure"),
+}
+
+
+def switchName(switch: Switch) -> Union[str, None]:
+    """Find the implementation of a switch.
+
+    :param switch: a switch
+    :type switch: Switch
+    :return: key of SWITCHES, None if the switch was not built from SWITCHES
+    :rtype: Union[str, None]
+    """
+
+    for name, factory in SWITCHES.items():
+        cls, options = factory, {}
+        if isinstance(factory, partial):
+            cls, options = factory.func, factory.keywords
+        if type(switch) is cls and all(
+            getattr(switch, k, None) == v for k, v in options.items()
+        ):
+            return name
+    return None
+
+
+def installFlows(net: Mininet):
+    """Install a flow that forwards like a learning switch in the datapath of
+    every OVS switch that has no controller and no fallback.
+
+    :param net: a started Mininet instance
+    :type net: Mininet
+    """
+
+    if net.controllers:
+        return
+    for switch in net.switches:
+        if isinstance(switch, OVSSwitch) and switch.failMode == "secure":
+            switch.dpctl("add-flow", "priority=0,actions=normal")
+
+
+class SwitchChainTopo(Topo):
+    """Chain of switches with a host at each end, links are not shaped:
+
+        `h1 --- s1 --- ... --- sN --- h2`
+
+    :param switches: number of switches, defaults to 1
+    :type switches: int, optional
+    """
+
+    def build(self, switches: int = 1):
+        """Create custom topo."""
+
+        names = [self.addSwitch(f"s{i}") for i in range(1, switches + 1)]
+        for a, b in zip(names, names[1:]):
+            self.addLink(a, b)
+        self.addLink(self.addHost("h1"), names[0])
+        self.addLink(self.addHost("h2"), names[-1])
+
+
+def benchmarkSwitch(
+    switch: str, switches: int = 1, duration: float = 10, count: int = 200
+) -> dict[str, Any]:
+    """Measure start-up time, throughput and latency of a chain of switches.
+
+    :param switch: switch implementation, a key of SWITCHES
+    :type switch: str
+    :param switches: number of switches in the chain, defaults to 1
+    :type switches: int, optional
+    :param duration: seconds of throughput test, defaults to 10
+    :type duration: float, optional
+    :param count: number of echo requests, defaults to 200
+    :type count: int, optional
+    :return: start-up and stop time in seconds, throughput and latency
+    :rtype: dict[str, Any]
+    """
+
+    started_at = time.time()
+    net = Mininet(
+        topo=SwitchChainTopo(switches=switches),
+        switch=SWITCHES[switch],
+        controller=None,
+        link=Link,
+    )
+    net.start()
+    installFlows(net)
+    result: dict[str, Any] = {"switch": switch, "switches": switches}
+    result["start_seconds"] = time.time() - started_at
+
+    try:
+        h1, h2 = net.get("h1", "h2")
+        # The first packets are flooded while addresses are learned
+        h1.cmd(f"ping -c 3 -W 1 {h2.IP()}")
+        result["latency"] = measureLatency(h1, h2.IP(), count)
+        result["throughput"] = measureThroughput(h1, h2, h2.IP(), duration)
+    finally:
+        stopped_at = time.time()
+        net.stop()
+        result["stop_seconds"] = time.time() - stopped_at
+    recordResult(net, "switch_bench", result)
+    return result
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="compare switch implementations.")
+    parser.add_argument(
+        "--switch",
+        type=str,
+        nargs="+",
+        choices=SWITCHES.keys(),
+        default=[*SWITCHES.keys()],
+        help="switch implementations to compare",
+    )
+    parser.add_argument(
+        "--switches",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="numbers of switches in the chain",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10, help="seconds of throughput test"
+    )
+    args = parser.parse_args()
+    setLogLevel("warning")
+
+    for switches in args.switches:
+        for switch in args.switch:
+            result = benchmarkSwitch(switch, switches, args.duration)
+            print(
+                f"{switch:>9} x{switches:<4}"
+                f" start {result['start_seconds']:6.2f}s"
+                f" stop {result['stop_seconds']:6.2f}s"
+                f" {result['throughput']['bits_per_second'] / 1e9:6.2f} Gbit/s"
+                f" rtt {result['latency'].get('avg_ms', float('nan')):.3f} ms"
+            )
@@ -1,10 +1,24 @@
+import math
 import time
-
-from base_topo import TopoWithPostAction, TopoWithRealisticLink, TopoWithRouter
-from zerotier import ZeroTierController, ZeroTierNode, ZeroTierRoot
+from collections import deque
+from ipaddress import IPv4Network, collapse_addresses, ip_network
+from itertools import islice
+
+from base_topo import TopoWithRouter
+from endpoints import EndpointHost
+from frr_stats import (
+    ChangeRecorder,
+    bgpStats,
+    ldpStats,
+    printBGPStats,
+    printLDPStats,
+    printOSPFStats,
+    waitForOSPF,
+    waitUntilSettled,
+)
+from results import recordResult
 
 from mininet.net import Mininet
-from mininet.node import OVSSwitch
 
 
 class OSPFTopo(TopoWithRouter):
@@ -52,6 +66,571 @@ class OSPFTopo(TopoWithRouter):
         )
 
 
+class OSPFScaleTopo(TopoWithRouter):
+    """Synthetic OSPF topology to find where OSPF designs stop scaling.
+
+    Routers are split into `areas` groups of consecutive routers, routers of a
+    group are connected in a ring. With more than one area, the `abrs` best
+    connected routers of every group become ABRs and are connected in a ring in
+    the backbone area. With a single area, every router is in area 0.
+
+    Every router originates `stubs` stub networks (/28 on a dummy interface),
+    `loopbacks` /32 loopback addresses and `externals` external routes (/24
+    blackhole routes redistributed from the kernel). A host is attached to the
+    first and to the last router:
+
+        `h1 --192.168.0.0/24-- r1 ... rN --192.168.1.0/24-- h2`
+
+    With `endpoints`, each host emulates that many endpoints of its LAN, see
+    :class:`endpoints.EndpointHost`, and both LANs grow to fit them, e.g.
+    192.168.0.0/19 and 192.168.32.0/19 for 5000 endpoints.
+
+    :param routers: number of routers, defaults to 10
+    :type routers: int, optional
+    :param areas: number of areas, defaults to 1
+    :type areas: int, optional
+    :param abrs: number of ABRs per area, defaults to 1
+    :type abrs: int, optional
+    :param stubs: number of stub networks per router, defaults to 10
+    :type stubs: int, optional
+    :param loopbacks: number of loopback addresses per router, defaults to 10
+    :type loopbacks: int, optional
+    :param externals: number of external routes per router, defaults to 100
+    :type externals: int, optional
+    :param endpoints: number of endpoints per host, defaults to 1
+    :type endpoints: int, optional
+    :param endpoint_mode: see :class:`endpoints.EndpointHost`, defaults to
+        "alias"
+    :type endpoint_mode: str, optional
+    """
+
+    _LAN_POOL = ip_network("192.168.0.0/16")
+    _LINK_POOL = ip_network("172.16.0.0/12")
+    _STUB_POOL = ip_network("10.0.0.0/8")
+    _LOOPBACK_POOL = ip_network("100.64.0.0/10")
+    _EXTERNAL_POOL = ip_network("11.0.0.0/8")
+
+    _DAEMONS: tuple[str, ...] = ("ospfd",)
+    _OSPF_COMMANDS: tuple[str, ...] = ()
+
+    def build(
+        self,
+        routers: int = 10,
+        areas: int = 1,
+        abrs: int = 1,
+        stubs: int = 10,
+        loopbacks: int = 10,
+        externals: int = 100,
+        endpoints: int = 1,
+        endpoint_mode: str = "alias",
+    ):
+        """Create custom topo."""
+
+        if routers < 2 or not 1 <= areas <= routers:
+            raise ValueError("need at least 2 routers and 1 router per area")
+
+        # Endpoints, router, network and broadcast addresses
+        lan_len = min(24, 32 - math.ceil(math.log2(endpoints + 3)))
+        if lan_len <= OSPFScaleTopo._LAN_POOL.prefixlen:
+            raise ValueError(f"{OSPFScaleTopo._LAN_POOL} is too small for 2 LANs")
+        lan_nets = list(islice(OSPFScaleTopo._LAN_POOL.subnets(new_prefix=lan_len), 2))
+
+        names = [f"r{i}" for i in range(1, routers + 1)]
+
+        # Split routers into groups of consecutive routers, one per area
+        groups = self._split(names, areas)
+        area_ids = [0] if areas == 1 else list(range(1, areas + 1))
+        area_of = {name: area for area, g in zip(area_ids, groups) for name in g}
+
+        # Links as (node1, node2, area). Host links come first, so they are
+        # the default interface of the first and the last router.
+        edges = [(names[0], "h1", area_of[names[0]])]
+        edges += [(names[-1], "h2", area_of[names[-1]])]
+        for area, group in zip(area_ids, groups):
+            edges += [(a, b, area) for a, b in self._ring(group)]
+
+        if areas > 1:
+            degree = {name: 0 for name in names}
+            for a, b, _ in edges:
+                degree[a] += 1
+                degree[b] = degree.get(b, 0) + 1
+            backbone = [
+                abr
+                for group in groups
+                for abr in sorted(group, key=lambda n: -degree[n])[:abrs]
+            ]
+            edges += [(a, b, 0) for a, b in self._ring(backbone)]
+
+        # Address links and collect OSPF network statements
+        lans = iter(lan_nets)
+        subnets = OSPFScaleTopo._LINK_POOL.subnets(new_prefix=30)
+        link_ips, default_ips = [], {}
+        networks: dict[str, list[str]] = {name: [] for name in names}
+        for a, b, area in edges:
+            subnet = next(lans if b in ("h1", "h2") else subnets)
+            ip_a, ip_b = (
+                f"{ip}/{subnet.prefixlen}" for ip in islice(subnet.hosts(), 2)
+            )
+            link_ips.append((ip_a, ip_b))
+            default_ips.setdefault(a, ip_a)
+            default_ips.setdefault(b, ip_b)
+            for node in (a, b):
+                if node in networks:
+                    networks[node].append(f"network {subnet} area {area}")
+
+        for i, name in enumerate(names):
+            stub_nets = self._allocate(OSPFScaleTopo._STUB_POOL, 28, i, stubs)
+            lo_nets = self._allocate(OSPFScaleTopo._LOOPBACK_POOL, 32, i, loopbacks)
+            ext_nets = self._allocate(OSPFScaleTopo._EXTERNAL_POOL, 24, i, externals)
+
+            ip_commands = [
+                *(["link add stub0 type dummy", "link set stub0 up"] if stubs else []),
+                *[f"addr add {n} dev stub0" for n in stub_nets],
+                *[f"addr add {n} dev lo" for n in lo_nets],
+                *[f"route add blackhole {n}" for n in ext_nets],
+            ]
+            networks[name] += [
+                f"network {n} area {area_of[name]}"
+                for n in collapse_addresses([*stub_nets, *lo_nets])
+            ]
+
+            self.addRouter(
+                name,
+                ip=default_ips[name],
+                daemons=self._DAEMONS,
+                ip_commands=tuple(ip_commands),
+                commands=(
+                    "configure terminal",
+                    *(("interface stub0", "ip ospf passive", "exit") if stubs else ()),
+                    "router ospf",
+                    *networks[name],
+                    *self._OSPF_COMMANDS,
+                    *(("redistribute kernel",) if externals else ()),
+                ),
+            )
+
+        host_opts = {}
+        if endpoints > 1:
+            host_opts = {"endpoints": endpoints, "endpoint_mode": endpoint_mode}
+            host_opts["cls"] = EndpointHost
+        for host, lan in zip(("h1", "h2"), lan_nets):
+            router_ip, host_ip = islice(lan.hosts(), 2)
+            self.addHost(
+                host,
+                ip=f"{host_ip}/{lan.prefixlen}",
+                defaultRoute=f"via {router_ip}",
+                **host_opts,
+            )
+
+        for (a, b, _), (ip_a, ip_b) in zip(edges, link_ips):
+            self.addLink(a, b, params1={"ip": ip_a}, params2={"ip": ip_b})
+
+    @staticmethod
+    def _split(nodes: list[str], count: int) -> list[list[str]]:
+        """Split nodes into `count` groups of consecutive nodes whose sizes
+        differ by at most one."""
+
+        size, extra = divmod(len(nodes), count)
+        groups, start = [], 0
+        for i in range(count):
+            groups.append(nodes[start : start + size + (i < extra)])
+            start += size + (i < extra)
+        return groups
+
+    @staticmethod
+    def _ring(nodes: list[str]) -> list[tuple[str, str]]:
+        """Return links that connect nodes in a ring (or a line if there are
+        less than 3 nodes)."""
+
+        if len(nodes) < 3:
+            return list(zip(nodes, nodes[1:]))
+        return list(zip(nodes, nodes[1:] + nodes[:1]))
+
+    @staticmethod
+    def _allocate(
+        pool: IPv4Network, prefix_len: int, index: int, count: int
+    ) -> list[IPv4Network]:
+        """Return the `index`-th block of `count` consecutive networks of
+        length `prefix_len` in `pool`."""
+
+        size = 2 ** (32 - prefix_len)
+        first = int(pool.network_address) + index * count * size
+        if first + count * size > int(pool.broadcast_address) + 1:
+            raise ValueError(f"{pool} is too small for {count} /{prefix_len} each")
+        return [IPv4Network((first + i * size, prefix_len)) for i in range(count)]
+
+    @classmethod
+    def postAction(cls, net: Mininet):
+        """Wait for LSDBs to settle and report OSPF statistics of every router.
+
+        :param net: a Mininet instance built from a :class:`OSPFScaleTopo` topo
+        :type net: Mininet
+        """
+
+        super().postAction(net)
+
+        assert isinstance(net.topo, cls)
+        routers = net.getNodeByName(*net.topo.routers())
+        print("*** Waiting for LSDBs to settle")
+        stats = waitForOSPF(routers)
+        printOSPFStats(stats)
+        recordResult(net, "ospf", stats)
+
+
+class LDPScaleTopo(OSPFScaleTopo):
+    """Synthetic MPLS topology to size the label space and LDP timers.
+
+    Same as :class:`OSPFScaleTopo` but routers also run LDP, and every router
+    originates `fecs` loopback addresses instead of stub networks and external
+    routes. Each loopback is a FEC that every other router binds a label to.
+
+    The label table of every router is sized to fit all FECs unless
+    `platform_labels` is set in `router_opts`.
+
+    :param routers: number of routers, defaults to 5
+    :type routers: int, optional
+    :param fecs: number of loopback addresses (FECs) per router, defaults to
+        1000
+    :type fecs: int, optional
+    """
+
+    _DAEMONS = ("ospfd", "ldpd")
+    _OSPF_COMMANDS = ("mpls ldp-sync",)
+
+    # Labels 0-15 are reserved
+    _RESERVED_LABELS = 16
+
+    def build(self, routers: int = 5, fecs: int = 1000, **params):
+        """Create custom topo."""
+
+        # Every FEC plus link and LAN prefixes
+        self.router_opts.setdefault(
+            "platform_labels",
+            max(100000, LDPScaleTopo._RESERVED_LABELS + routers * (fecs + 4)),
+        )
+        params.setdefault("stubs", 0)
+        params.setdefault("externals", 0)
+        super().build(routers=routers, loopbacks=fecs, **params)
+
+    @classmethod
+    def postAction(cls, net: Mininet):
+        """Wait for label bindings to be distributed and report LDP statistics.
+
+        Distribution time is measured from the moment LDP is enabled until the
+        last change of bindings or kernel MPLS tables, changes are also
+        recorded while OSPF settles.
+
+        :param net: a Mininet instance built from a :class:`LDPScaleTopo` topo
+        :type net: Mininet
+        """
+
+        assert isinstance(net.topo, cls)
+        routers = net.getNodeByName(*net.topo.routers())
+        keys = ("remote_bindings", "mpls_routes")
+
+        # Bindings are distributed while OSPF settles, record their changes
+        # meanwhile so the OSPF wait does not count
+        started_at = time.time()
+        recorder = ChangeRecorder(routers, ldpStats, keys, interval=0.5)
+        recorder.start()
+        try:
+            super().postAction(net)
+        finally:
+            recorder.stop()
+
+        print("*** Waiting for label bindings to settle")
+        stats, changed_at = waitUntilSettled(
+            routers, ldpStats, keys, interval=0.5, recorder=recorder
+        )
+        printLDPStats(stats)
+        print(f"*** Label bindings settled in {changed_at - started_at:.1f}s")
+        recordResult(
+            net,
+            "ldp",
+            {"distribution_seconds": changed_at - started_at, "routers": stats},
+        )
+
+
+class VPNScaleTopo(LDPScaleTopo):
+    """Synthetic MPLS-VPN topology to compare iBGP designs.
+
+    Same as :class:`LDPScaleTopo` but every router is also a PE: it runs BGP
+    between its first loopback address and those of other PEs, originates
+    `routes` IPv4 routes (/24 blackhole routes) and `vpn_routes` networks of
+    customer VRF (/28 on a dummy interface). IPv4 and VPN-IPv4 routes are
+    exchanged over the same sessions.
+
+    With `ibgp="mesh"`, every PE peers with every other PE, so the number of
+    sessions grows as O(N²). With `ibgp="rr"`, PEs are split into
+    `clusters ** (levels - 1)` clusters of consecutive routers, each served by
+    `reflectors` route reflectors chosen among its members. Reflectors of a
+    level are clients of reflectors of the level above, which are chosen the
+    same way among them with `clusters` times fewer clusters, and reflectors
+    of the top level are fully meshed. Reflectors are the routers with the
+    most links (`placement="degree"`) or the fewest hops to the other members
+    of their cluster (`placement="center"`).
+
+    :param routers: number of routers, defaults to 10
+    :type routers: int, optional
+    :param ibgp: "mesh" or "rr", defaults to "mesh"
+    :type ibgp: str, optional
+    :param levels: number of route reflector levels, defaults to 1
+    :type levels: int, optional
+    :param clusters: number of clusters per reflector of the level above,
+        defaults to 2
+    :type clusters: int, optional
+    :param reflectors: number of reflectors per cluster, defaults to 2
+    :type reflectors: int, optional
+    :param placement: "degree" or "center", defaults to "degree"
+    :type placement: str, optional
+    :param routes: number of IPv4 routes per PE, defaults to 10
+    :type routes: int, optional
+    :param vpn_routes: number of customer networks per PE, defaults to 10
+    :type vpn_routes: int, optional
+    """
+
+    _DAEMONS = ("ospfd", "ldpd", "bgpd")
+    _ROUTE_POOL = ip_network("12.0.0.0/8")
+    # Customer networks are in a VRF, they may overlap networks of the provider
+    _VPN_POOL = ip_network("10.0.0.0/8")
+
+    def build(
+        self,
+        routers: int = 10,
+        ibgp: str = "mesh",
+        levels: int = 1,
+        clusters: int = 2,
+        reflectors: int = 2,
+        placement: str = "degree",
+        routes: int = 10,
+        vpn_routes: int = 10,
+        **params,
+    ):
+        """Create custom topo."""
+
+        if ibgp not in ("mesh", "rr") or placement not in ("degree", "center"):
+            raise ValueError(f"unknown iBGP design {ibgp} or placement {placement}")
+        if levels < 1 or clusters < 1 or reflectors < 1:
+            raise ValueError("need at least 1 level, cluster and reflector")
+
+        params.setdefault("fecs", 1)
+        super().build(routers=routers, **params)
+        self.ibgp = {
+            "design": ibgp,
+            "levels": levels if ibgp == "rr" else None,
+            "clusters": clusters if ibgp == "rr" else None,
+            "reflectors": reflectors if ibgp == "rr" else None,
+            "placement": placement if ibgp == "rr" else None,
+        }
+
+        names = [f"r{i}" for i in range(1, routers + 1)]
+        adjacency: dict[str, set[str]] = {name: set() for name in names}
+        for a, b in self.links():
+            if a in adjacency and b in adjacency:
+                adjacency[a].add(b)
+                adjacency[b].add(a)
+
+        if ibgp == "mesh":
+            peers = {a: {b: False for b in names if b != a} for a in names}
+        else:
+            peers = self._hierarchy(
+                names, adjacency, levels, clusters, reflectors, placement
+            )
+
+        # BGP runs between the first loopback address of every PE
+        pool, fecs = OSPFScaleTopo._LOOPBACK_POOL, params["fecs"]
+        loopbacks = {
+            name: str(self._allocate(pool, 32, i, fecs)[0].network_address)
+            for i, name in enumerate(names)
+        }
+        for i, name in enumerate(names):
+            route_nets = self._allocate(VPNScaleTopo._ROUTE_POOL, 24, i, routes)
+            vpn_nets = self._allocate(VPNScaleTopo._VPN_POOL, 28, i, vpn_routes)
+            info = self.nodeInfo(name)
+            info["vrfs"] = {"customer": []}
+            info["ip_commands"] = (
+                *info["ip_commands"],
+                *[f"route add blackhole {n}" for n in route_nets],
+                "link add cust0 type dummy",
+                "link set cust0 master customer",
+                "link set cust0 up",
+                *[f"addr add {n} dev cust0" for n in vpn_nets],
+            )
+            info["commands"] = (
+                *info["commands"],
+                "end",
+                *self.buildBGPSetupCommands(
+                    loopbacks[name],
+                    {loopbacks[p]: client for p, client in peers[name].items()},
+                    route_nets,
+                ),
+            )
+
+    def buildBGPSetupCommands(
+        self,
+        local_lo_ip: str,
+        peers: dict[str, bool],
+        networks: list[IPv4Network],
+    ) -> tuple[str, ...]:
+        """Generate setup commands to set up BGP and the customer VRF of a PE.
+
+        :param local_lo_ip: IP address of the loopback interface of the PE
+        :type local_lo_ip: str
+        :param peers: loopback address of every iBGP peer and whether it is a
+            route reflector client of the PE
+        :type peers: dict[str, bool]
+        :param networks: IPv4 networks originated by the PE
+        :type networks: list[IPv4Network]
+        :return: setup commands to set up BGP
+        :rtype: tuple[str, ...]
+        """
+
+        def activate(peer: str, client: bool) -> tuple[str, ...]:
+            if client:
+                return (
+                    f"neighbor {peer} activate",
+                    f"neighbor {peer} route-reflector-client",
+                )
+            return (f"neighbor {peer} activate",)
+
+        return (
+            "configure terminal",
+            "router bgp 1",
+            f"bgp router-id {local_lo_ip}",
+            "no bgp ebgp-requires-policy",
+            "no bgp default ipv4-unicast",
+            *(
+                command
+                for peer in peers
+                for command in (
+                    f"neighbor {peer} remote-as 1",
+                    f"neighbor {peer} update-source lo",
+                )
+            ),
+            "address-family ipv4 unicast",
+            *(f"network {n}" for n in networks),
+            *(c for peer, client in peers.items() for c in activate(peer, client)),
+            "exit-address-family",
+            "address-family ipv4 vpn",
+            *(c for peer, client in peers.items() for c in activate(peer, client)),
+            "exit-address-family",
+            "end",
+            "configure terminal",
+            "vrf customer",
+            "end",
+            "configure terminal",
+            "router bgp 1 vrf customer",
+            "address-family ipv4",
+            "rt vpn both 1:1",
+            f"rd vpn export {local_lo_ip}:1",
+            "label vpn export auto",
+            "import vpn",
+            "export vpn",
+            "redistribute connected",
+            "end",
+        )
+
+    @staticmethod
+    def _hierarchy(
+        names: list[str],
+        adjacency: dict[str, set[str]],
+        levels: int,
+        clusters: int,
+        reflectors: int,
+        placement: str,
+    ) -> dict[str, dict[str, bool]]:
+        """Return iBGP peers of every router of a route reflector hierarchy,
+        and whether the router reflects routes to each of them."""
+
+        peers: dict[str, dict[str, bool]] = {name: {} for name in names}
+        members = names
+        for level in range(levels, 0, -1):
+            groups = OSPFScaleTopo._split(
+                members, min(clusters ** (level - 1), len(members))
+            )
+            members = []
+            for group in groups:
+                chosen = VPNScaleTopo._reflectors(
+                    group, reflectors, placement, adjacency
+                )
+                for reflector in chosen:
+                    for client in group:
+                        if client not in chosen:
+                            peers[reflector][client] = True
+                            peers[client][reflector] = False
+                members += chosen
+
+        for i, a in enumerate(members):
+            for b in members[i + 1 :]:
+                peers[a][b] = peers[b][a] = False
+        return peers
+
+    @staticmethod
+    def _reflectors(
+        group: list[str],
+        count: int,
+        placement: str,
+        adjacency: dict[str, set[str]],
+    ) -> list[str]:
+        """Choose the route reflectors of a cluster, ties are broken by
+        order of routers."""
+
+        if placement == "degree":
+            return sorted(group, key=lambda n: -len(adjacency[n]))[:count]
+
+        def hops(source: str) -> dict[str, int]:
+            distances, queue = {source: 0}, deque([source])
+            while queue:
+                node = queue.popleft()
+                for neighbor in adjacency[node]:
+                    if neighbor not in distances:
+                        distances[neighbor] = distances[node] + 1
+                        queue.append(neighbor)
+            return distances
+
+        def total(node: str) -> float:
+            distances = hops(node)
+            return sum(distances.get(member, math.inf) for member in group)
+
+        return sorted(group, key=total)[:count]
+
+    @classmethod
+    def postAction(cls, net: Mininet):
+        """Wait for BGP tables to settle and report BGP statistics of every PE.
+
+        :param net: a Mininet instance built from a :class:`VPNScaleTopo` topo
+        :type net: Mininet
+        """
+
+        assert isinstance(net.topo, cls)
+        routers = net.getNodeByName(*net.topo.routers())
+        keys = ("established", "ipv4_prefixes", "vpnv4_prefixes")
+
+        # Record changes of BGP tables while OSPF and LDP settle, so their
+        # waits do not count
+        started_at = time.time()
+        recorder = ChangeRecorder(routers, bgpStats, keys)
+        recorder.start()
+        try:
+            super().postAction(net)
+        finally:
+            recorder.stop()
+
+        print("*** Waiting for BGP tables to settle")
+        stats, changed_at = waitUntilSettled(routers, bgpStats, keys, recorder=recorder)
+        printBGPStats(stats)
+        print(f"*** BGP tables settled in {changed_at - started_at:.1f}s")
+        recordResult(
+            net,
+            "bgp",
+            {
+                **net.topo.ibgp,
+                "settle_seconds": changed_at - started_at,
+                "routers": stats,
+            },
+        )
+
+
 class MPLSTopo(TopoWithRouter):
     """MPLS topology.
 
@@ -446,149 +1025,334 @@ class MPLSVPNTopo(MPLSTopo):
         return ce1, ce2
 
 
-class ZeroTierTopoSDN(TopoWithPostAction, TopoWithRealisticLink):
-    def build(self):
-        aroot, controller, h1, h2 = self._genZeroTierNodes()
+class SRv6Topo(TopoWithRouter):
+    """SRv6 counterpart of :class:`MPLSTopo`.
 
-        # Why OpenFlow14: https://groups.google.com/a/onosproject.org/g/onos-discuss/c/bFnACrQ6Zj8/m/ZjFicCCmAAAJ
-        s1 = self.addSwitch("s1", cls=OVSSwitch, protocols="OpenFlow14")
-        s2 = self.addSwitch("s2", cls=OVSSwitch, protocols="OpenFlow14")
-        s3 = self.addSwitch("s3", cls=OVSSwitch, protocols="OpenFlow14")
+    Same routers, hosts and host networks:
 
-        self.addLink(s1, s2)
-        self.addLink(s2, s3)
-        self.addLink(s3, s1)
-
-        self.addLink(aroot, s3)
-        self.addLink(controller, s3)
-
-        self.addLink(h1, s1)
-        self.addLink(h2, s2)
+        `h1 --- r1 --- r2 --- r3 --- h2`
 
-    def _genZeroTierNodes(self, **configures) -> tuple[str, str, str, str]:
-        """Generate ZeroTier root, ZeroTier controller and 2 ZeroTier leaf nodes.
+    Links between routers only have IPv6 addresses. Routers use IS-IS to
+    exchange routing data and advertise their SRv6 locator, fc00:0:N::/48 for
+    rN. Instead of pushing a label, r1 and r3 encapsulate packets of the remote
+    host network in IPv6 towards an End.DX4 SID of the other outer router,
+    which decapsulates them towards its host.
+    """
 
-        :return: tuple of name of ZeroTier nodes
-        :rtype: tuple[str, str, str, str]
-        """
+    LOCATOR = "MAIN"
 
-        # Mount moon directory to all nodes make them automatically orbit the
-        # moon created by root.
-        privateDirs = (("/var/lib/zerotier-one/moons.d", "./moons.d"),)
+    def build(self):
+        """Create custom topo."""
 
-        # Mininet configures host follow alphabetical order and Root should
-        # start and create moon first, hence the name "aroot".
-        aroot = self.addNode(
-            "aroot",
-            cls=ZeroTierRoot,
-            privateDirs=privateDirs,
-            **configures.get("aroot", {}),
-        )
-        controller = self.addNode(
-            "controller",
-            cls=ZeroTierController,
-            privateDirs=privateDirs,
-            **configures.get("controller", {}),
+        # Add hosts and routers
+        r1 = self.buildRouterAndHost(
+            router_name="r1",
+            host_name="h1",
+            net_addr="192.168.0.0",
+            daemons=("isisd",),
+            commands=self.buildISISSRv6SetupCommands(1, ("r1-eth1",)),
+            srv6=True,
+            ip_commands=(
+                "addr add fc00:a:12::1/64 dev r1-eth1",
+                *self.buildEncapCommands(3, "192.168.3.0/24", "r1-eth1"),
+                *self.buildDecapCommands(1, "192.168.0.2", "r1-eth0"),
+            ),
         )
-        h1 = self.addNode(
-            "h1", cls=ZeroTierNode, privateDirs=privateDirs, **configures.get("h1", {})
+
+        r2 = self.addRouter(
+            "r2",
+            ip=None,
+            daemons=("isisd",),
+            commands=self.buildISISSRv6SetupCommands(2, ("r2-eth0", "r2-eth1")),
+            srv6=True,
+            ip_commands=(
+                "addr add fc00:a:12::2/64 dev r2-eth0",
+                "addr add fc00:a:23::2/64 dev r2-eth1",
+            ),
         )
-        h2 = self.addNode(
-            "h2", cls=ZeroTierNode, privateDirs=privateDirs, **configures.get("h2", {})
+
+        r3 = self.buildRouterAndHost(
+            router_name="r3",
+            host_name="h2",
+            net_addr="192.168.3.0",
+            daemons=("isisd",),
+            commands=self.buildISISSRv6SetupCommands(3, ("r3-eth1",)),
+            srv6=True,
+            ip_commands=(
+                "addr add fc00:a:23::3/64 dev r3-eth1",
+                *self.buildEncapCommands(1, "192.168.0.0/24", "r3-eth1"),
+                *self.buildDecapCommands(3, "192.168.3.2", "r3-eth0"),
+            ),
         )
 
-        return aroot, controller, h1, h2
+        # Add links
+        self.addLink(r1, r2, intfName1="r1-eth1", intfName2="r2-eth0")
+        self.addLink(r2, r3, intfName1="r2-eth1", intfName2="r3-eth1")
 
-    @classmethod
-    def postAction(cls, net: Mininet):
-        """Create ZeroTier network and join all nodes.
+    @staticmethod
+    def locator(index: int) -> str:
+        """Get the SRv6 locator of a router.
 
-        :param net: a Mininet instance built from a :class:`ZeroTierTopo` topo
-        :type net: Mininet
+        :param index: index of router
+        :type index: int
+        :return: locator prefix
+        :rtype: str
         """
 
-        assert isinstance(net.topo, cls)
-        controller, h1, h2 = net.getNodeByName("controller", "h1", "h2")
+        return f"fc00:0:{index}::/48"
 
-        assert (
-            isinstance(controller, ZeroTierController)
-            and isinstance(h1, ZeroTierNode)
-            and isinstance(h2, ZeroTierNode)
+    @staticmethod
+    def buildISISSRv6SetupCommands(
+        index: int, intfs: tuple[str, ...], passive_intfs: tuple[str, ...] = ()
+    ) -> tuple[str, ...]:
+        """Generate setup commands to advertise IPv6 networks of interfaces and
+        the SRv6 locator of a router with IS-IS.
+
+        :param index: index of router, used in its locator and NET
+        :type index: int
+        :param intfs: point-to-point interfaces to other routers
+        :type intfs: tuple[str, ...]
+        :param passive_intfs: interfaces whose networks are advertised without
+            forming adjacencies, e.g. loopback, defaults to ()
+        :type passive_intfs: tuple[str, ...], optional
+        :return: setup commands to set up IS-IS and SRv6
+        :rtype: tuple[str, ...]
+        """
+
+        return (
+            "configure terminal",
+            "segment-routing",
+            "srv6",
+            "locators",
+            f"locator {SRv6Topo.LOCATOR}",
+            f"prefix {SRv6Topo.locator(index)}",
+            "end",
+            "configure terminal",
+            "router isis 1",
+            f"net 49.0001.0000.0000.{index:04}.00",
+            "is-type level-2-only",
+            "segment-routing srv6",
+            f"locator {SRv6Topo.LOCATOR}",
+            "end",
+            *(
+                command
+                for intf in intfs
+                for command in (
+                    "configure terminal",
+                    f"interface {intf}",
+                    "ipv6 router isis 1",
+                    "isis network point-to-point",
+                    "end",
+                )
+            ),
+            *(
+                command
+                for intf in passive_intfs
+                for command in (
+                    "configure terminal",
+                    f"interface {intf}",
+                    "ipv6 router isis 1",
+                    "isis passive",
+                    "end",
+                )
+            ),
+        )
+
+    @staticmethod
+    def buildEncapCommands(egress: int, prefix: str, intf: str) -> tuple[str, ...]:
+        """Generate `ip` commands to encapsulate packets towards an IPv4
+        network in IPv6 towards the End.DX4 SID of the egress router.
+
+        :param egress: index of egress router
+        :type egress: int
+        :param prefix: IPv4 network behind egress router
+        :type prefix: str
+        :param intf: interface towards the core
+        :type intf: str
+        :return: `ip` commands
+        :rtype: tuple[str, ...]
+        """
+
+        sid = SRv6Topo.locator(egress).replace("::/48", "::100")
+        return (f"route add {prefix} encap seg6 mode encap segs {sid} dev {intf}",)
+
+    @staticmethod
+    def buildDecapCommands(index: int, host: str, intf: str) -> tuple[str, ...]:
+        """Generate `ip` commands to install the End.DX4 SID of a router, which
+        decapsulates packets and forwards them to a host.
+
+        :param index: index of router
+        :type index: int
+        :param host: IPv4 address of host
+        :type host: str
+        :param intf: interface towards the host
+        :type intf: str
+        :return: `ip` commands
+        :rtype: tuple[str, ...]
+        """
+
+        # Outside of the range of SIDs that FRRouting allocates automatically
+        sid = SRv6Topo.locator(index).replace("::/48", "::100")
+        return (
+            f"route add {sid}/128 encap seg6local action End.DX4"
+            f" nh4 {host} dev {intf}",
         )
 
-        count = 0
-        while net.pingAll() > 0:
-            if count > 0:
-                print(f"*** Waiting for {5 * count} seconds")
-            time.sleep(5 * count)
-            count += 1
 
-        # Restart nodes when connection between node and root is available to
-        # orbit them to root.
-        print("*** Restarting leaf ZeroTier node")
-        for node in (h1, h2, controller):
-            print(node.name, end=" ")
-            node.restartZeroTier()
-        print()
+class SRv6VPNTopo(MPLSVPNTopo):
+    """SRv6 counterpart of :class:`MPLSVPNTopo`.
 
-        print("*** Creating virtual network")
-        print(controller.createNetwork("192.168.0.0"))
-        print("*** Making nodes to join the network")
-        h1.joinNetwork(controller.getNetworks()[0])
-        h2.joinNetwork(controller.getNetworks()[0])
+    Same routers, customer sites and links::
 
+        h1---ce1---pe1---p---pe2---ce2---h2
+                    |         |
+                    +---------+
+
+    Links between pe1, p and pe2 only have IPv6 addresses, and IS-IS replaces
+    OSPF and LDP in the provider network: it advertises the SRv6 locator of
+    every router (see :class:`SRv6Topo`) and the loopback address of PEs.
+
+    VPN-IPv4 routes are exchanged by internal BGP between loopback addresses
+    of PEs, each with the SRv6 SID of its customer VRF (End.DT4) instead of a
+    label. Packets between sites are encapsulated in IPv6 towards that SID.
+    """
 
-class ZeroTierTopoRouter(ZeroTierTopoSDN, TopoWithRouter):
     def build(self):
-        aroot, controller, h1, h2 = self._genZeroTierNodes(
-            aroot={"ip": "10.0.5.2/24", "defaultRoute": "via 10.0.5.1"},
-            controller={"ip": "10.0.6.2/24", "defaultRoute": "via 10.0.6.1"},
-            h1={"ip": "10.0.0.2/24", "defaultRoute": "via 10.0.0.1"},
-            h2={"ip": "10.0.4.2/24", "defaultRoute": "via 10.0.4.1"},
+        """Create custom topo."""
+
+        ce1, ce2 = self.buildCustomerSites(
+            ce1_name="ce1",
+            ce2_name="ce2",
+            h1_name="h1",
+            h2_name="h2",
+            site1_net_addr="192.168.0.0",
+            site2_net_addr="192.168.3.0",
+            ospf_network_command="network 192.168.0.0/16 area 1",
         )
 
-        ospf_setup_commands = (
+        vrf_setup_commands = (
             "configure terminal",
-            "router ospf",
-            "network 10.0.0.0/16 area 1",
+            "vrf customer",
+            "end",
+            "configure terminal",
+            "router ospf vrf customer",
+            "network 192.168.0.0/16 area 1",
+            "redistribute bgp",
+            "end",
+            "configure terminal",
+            "router bgp 1 vrf customer",
+            "address-family ipv4",
+            "rt vpn both 1:1",
+            "rd vpn export 1:1",
+            "sid vpn export auto",
+            "import vpn",
+            "export vpn",
+            "redistribute ospf",
+            "end",
         )
 
-        r1 = self.addRouter(
-            "r1", ip="10.0.0.1/24", daemons=("ospfd",), commands=ospf_setup_commands
+        pe1 = self.addRouter(
+            "pe1",
+            ip=None,
+            daemons=("ospfd", "bgpd", "isisd"),
+            vrfs={"customer": ["pe1-eth2"]},
+            srv6=True,
+            ip_commands=(
+                "addr add fc00::1/128 dev lo",
+                "addr add fc00:a:12::1/64 dev pe1-eth0",
+                "addr add fc00:a:13::1/64 dev pe1-eth1",
+            ),
+            commands=(
+                *SRv6Topo.buildISISSRv6SetupCommands(
+                    1, ("pe1-eth0", "pe1-eth1"), ("lo",)
+                ),
+                *self.buildSRv6BGPSetupCommands("fc00::1", "fc00::3", "1.1.1.1"),
+                *vrf_setup_commands,
+            ),
         )
-        r2 = self.addRouter(
-            "r2", ip="10.0.4.1/24", daemons=("ospfd",), commands=ospf_setup_commands
+
+        p = self.addRouter(
+            "p",
+            ip=None,
+            daemons=("isisd",),
+            srv6=True,
+            ip_commands=(
+                "addr add fc00:a:23::2/64 dev p-eth0",
+                "addr add fc00:a:12::2/64 dev p-eth1",
+            ),
+            commands=SRv6Topo.buildISISSRv6SetupCommands(2, ("p-eth0", "p-eth1")),
         )
-        r3 = self.addRouter(
-            "r3", ip="10.0.2.1/24", daemons=("ospfd",), commands=ospf_setup_commands
+
+        pe2 = self.addRouter(
+            "pe2",
+            ip=None,
+            daemons=("ospfd", "bgpd", "isisd"),
+            vrfs={"customer": ["pe2-eth2"]},
+            srv6=True,
+            ip_commands=(
+                "addr add fc00::3/128 dev lo",
+                "addr add fc00:a:23::3/64 dev pe2-eth0",
+                "addr add fc00:a:13::3/64 dev pe2-eth1",
+            ),
+            commands=(
+                *SRv6Topo.buildISISSRv6SetupCommands(
+                    3, ("pe2-eth0", "pe2-eth1"), ("lo",)
+                ),
+                *self.buildSRv6BGPSetupCommands("fc00::3", "fc00::1", "2.2.2.2"),
+                *vrf_setup_commands,
+            ),
         )
 
-        self.addLink(r1, h1)
-        self.addLink(r2, h2)
-        self.addLink(r3, r2, params2={"ip": "10.0.2.2/24"})
+        # Add links
+        self.addLink(p, pe2, intfName1="p-eth0", intfName2="pe2-eth0")
+        self.addLink(pe1, p, intfName1="pe1-eth0", intfName2="p-eth1")
+        self.addLink(pe1, pe2, intfName1="pe1-eth1", intfName2="pe2-eth1")
+
         self.addLink(
-            r1, r3, params1={"ip": "10.0.1.1/24"}, params2={"ip": "10.0.1.2/24"}
+            pe1,
+            ce1,
+            intfName1="pe1-eth2",
+            params1={"ip": "192.168.1.1/24"},
+            params2={"ip": "192.168.1.2/24"},
         )
         self.addLink(
-            r1, r2, params1={"ip": "10.0.3.1/24"}, params2={"ip": "10.0.3.2/24"}
-        )
-        self.addLink(r3, aroot, params1={"ip": "10.0.5.1/24"})
-        self.addLink(r3, controller, params1={"ip": "10.0.6.1/24"})
-
-
-# Topology enables one to pass in `--topo=ospf` from the command line.
-# Run `py net.topo.postAction(net)` if needed.
-topos = {
-    "ospf": {"constructor": (lambda: OSPFTopo()), "require_controller": False},
-    "mpls": {"constructor": (lambda: MPLSTopo()), "require_controller": False},
-    "bgp": {"constructor": (lambda: BGPTopo()), "require_controller": False},
-    "mpls-vpn": {"constructor": (lambda: MPLSVPNTopo()), "require_controller": False},
-    "zerotier-sdn": {
-        "constructor": (lambda: ZeroTierTopoSDN()),
-        "require_controller": True,
-    },
-    "zerotier-router": {
-        "constructor": (lambda: ZeroTierTopoRouter()),
-        "require_controller": False,
-    },
-}
+            pe2,
+            ce2,
+            intfName1="pe2-eth2",
+            params1={"ip": "192.168.2.1/24"},
+            params2={"ip": "192.168.2.2/24"},
+        )
+
+    def buildSRv6BGPSetupCommands(
+        self, local_lo_ip: str, peer_lo_ip: str, router_id: str
+    ) -> tuple[str, ...]:
+        """Generate setup commands to set up BGP for PEs, with VPN-IPv4 routes
+        over SRv6.
+
+        :param local_lo_ip: IPv6 address that assigned to loopback interface
+        :type local_lo_ip: str
+        :param peer_lo_ip: IPv6 address that is used to connect to neighbor
+        :type peer_lo_ip: str
+        :param router_id: BGP router ID, there is no IPv4 address to take it
+            from
+        :type router_id: str
+        :return: setup commands to set up BGP
+        :rtype: tuple[str, ...]
+        """
+        return (
+            "configure terminal",
+            "router bgp 1",
+            f"bgp router-id {router_id}",
+            "no bgp ebgp-requires-policy",
+            "no bgp default ipv4-unicast",
+            f"neighbor {peer_lo_ip} remote-as 1",
+            f"neighbor {peer_lo_ip} update-source lo",
+            f"neighbor {peer_lo_ip} capability extended-nexthop",
+            "address-family ipv4 vpn",
+            f"neighbor {peer_lo_ip} activate",
+            f"neighbor {peer_lo_ip} send-community both",
+            "exit-address-family",
+            "segment-routing srv6",
+            f"locator {SRv6Topo.LOCATOR}",
+            "end",
+        )
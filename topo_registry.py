@@ -0,0 +1,65 @@
+"""Registry of topologies that can be created from the command line.
+
+A topology is registered by name with the path of its class (or of any
+callable that returns a topo), `MODULE:ATTRIBUTE`, and its module is only
+imported when the topology is created. Topologies of other packages are
+discovered through the `mininet_frrouting_labs.topos` entry point group, e.g.
+in their `pyproject.toml`::
+
+    [project.entry-points."mininet_frrouting_labs.topos"]
+    my-topo = "my_package.topo:MyTopo"
+
+A topology whose switches need an OpenFlow controller sets the class
+attribute `require_controller = True`.
+"""
+
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Any, Callable
+
+ENTRY_POINT_GROUP = "mininet_frrouting_labs.topos"
+
+TOPOS = {
+    "ospf": "topo:OSPFTopo",
+    "ospf-scale": "topo:OSPFScaleTopo",
+    "ldp-scale": "topo:LDPScaleTopo",
+    "vpn-scale": "topo:VPNScaleTopo",
+    "mpls": "topo:MPLSTopo",
+    "bgp": "topo:BGPTopo",
+    "mpls-vpn": "topo:MPLSVPNTopo",
+    "srv6": "topo:SRv6Topo",
+    "srv6-vpn": "topo:SRv6VPNTopo",
+    "zerotier-sdn": "zerotier_topo:ZeroTierTopoSDN",
+    "zerotier-router": "zerotier_topo:ZeroTierTopoRouter",
+    "zerotier-scale": "zerotier_topo:ZeroTierScaleTopo",
+}
+
+
+def topoPaths() -> dict[str, str]:
+    """Get the path of every registered topology, without importing any.
+
+    Built-in topologies take precedence over entry points of the same name.
+
+    :return: `MODULE:ATTRIBUTE` of every topology name
+    :rtype: dict[str, str]
+    """
+
+    plugins = {e.name: e.value for e in entry_points(group=ENTRY_POINT_GROUP)}
+    return {**plugins, **TOPOS}
+
+
+def loadTopo(name: str) -> Callable[..., Any]:
+    """Import a registered topology.
+
+    :param name: topology name
+    :type name: str
+    :raises KeyError: if no topology is registered with this name
+    :return: class of the topology, called with topo options to create it
+    :rtype: Callable[..., Any]
+    """
+
+    module, _, attribute = topoPaths()[name].partition(":")
+    target: Any = import_module(module)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    return target
@@ -0,0 +1,221 @@
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import CalledProcessError
+from typing import Any, Union
+
+from frrouter import FRRouter
+
+_RUN_DIR = "/var/run/frr"
+
+# Daemon answering show commands by prefix, longest prefixes first. Other
+# commands, e.g. "show running-config" whose output vtysh merges from every
+# daemon, or "show ip pim ..." of daemons not listed here, are run by vtysh.
+_COMMAND_DAEMONS = (
+    ("show ip ospf", "ospfd"),
+    ("show ipv6 ospf6", "ospf6d"),
+    ("show ip bgp", "bgpd"),
+    ("show bgp", "bgpd"),
+    ("show mpls ldp", "ldpd"),
+    ("show l2vpn", "ldpd"),
+    ("show isis", "isisd"),
+    ("show bfd", "bfdd"),
+    ("show ip static", "staticd"),
+    ("show ip route", "zebra"),
+    ("show ipv6 route", "zebra"),
+    ("show ip nht", "zebra"),
+    ("show ipv6 nht", "zebra"),
+    ("show interface", "zebra"),
+    ("show mpls table", "zebra"),
+    ("show nexthop-group", "zebra"),
+    ("show zebra", "zebra"),
+)
+
+
+def daemonFor(command: str) -> Union[str, None]:
+    """Find the daemon that answers a command.
+
+    :param command: command, e.g. "show ip ospf neighbor"
+    :type command: str
+    :return: name of daemon, None if the command is not a show command of a
+        known daemon, vtysh then finds the daemons that answer it
+    :rtype: Union[str, None]
+    """
+
+    command = " ".join(command.split())
+    for prefix, daemon in _COMMAND_DAEMONS:
+        if command == prefix or command.startswith(prefix + " "):
+            return daemon
+    return None
+
+
+class VTYClient:
+    """Persistent connection to the VTY socket of one FRRouting daemon.
+
+    Speaks the same protocol as vtysh: a command is sent as a NUL terminated
+    string and the daemon answers with its output followed by three NUL bytes
+    and a status byte. Reusing the connection avoids spawning a vtysh process
+    per command. Commands are executed in the view node, so this is meant for
+    show commands.
+
+    :param router: router running the daemon
+    :type router: FRRouter
+    :param daemon: name of daemon, e.g. "ospfd"
+    :type daemon: str
+    :param timeout: socket timeout in seconds, defaults to 10
+    :type timeout: float, optional
+    """
+
+    _TERMINATOR = b"\0\0\0"
+
+    def __init__(self, router: FRRouter, daemon: str, timeout: float = 10):
+        self.router = router
+        self.daemon = daemon
+        self.path = f"{_RUN_DIR}/{router.netns}/{daemon}.vty"
+        self.timeout = timeout
+        self._sock: Union[socket.socket, None] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        return sock
+
+    def execute(self, command: str) -> str:
+        """Execute a command and return its output.
+
+        The connection is opened on first use and reopened once if the daemon
+        closed it, e.g. after a restart.
+
+        :param command: command, e.g. "show ip ospf neighbor"
+        :type command: str
+        :raises RuntimeError: if the daemon reports an error
+        :return: output of the command
+        :rtype: str
+        """
+
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    self._sock.sendall(command.encode() + b"\0")
+                    output, status = self._receive(self._sock)
+                    break
+                except (OSError, EOFError):
+                    self.close()
+                    if attempt:
+                        raise
+
+        if status != 0:
+            raise RuntimeError(f"{self.router.name} {self.daemon}: {output.strip()}")
+        return output
+
+    def executeJSON(self, command: str) -> Any:
+        """Execute a show command with `json` appended and parse its output.
+
+        :param command: show command without the trailing `json`
+        :type command: str
+        :return: parsed output, `{}` if the output is empty
+        :rtype: Any
+        """
+
+        output = self.execute(f"{command} json")
+        return json.loads(output) if output.strip() else {}
+
+    @staticmethod
+    def _receive(sock: socket.socket) -> tuple[str, int]:
+        data = bytearray()
+        while True:
+            chunk = sock.recv(1 << 16)
+            if not chunk:
+                raise EOFError("connection closed by daemon")
+            data += chunk
+            if len(data) >= 4 and data[-4:-1] == VTYClient._TERMINATOR:
+                return data[:-4].decode(errors="replace"), data[-1]
+
+    def close(self):
+        """Close the connection."""
+
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class VTYPool:
+    """Keep one :class:`VTYClient` per router and daemon."""
+
+    def __init__(self):
+        self._clients: dict[tuple[str, str], VTYClient] = {}
+        self._lock = threading.Lock()
+
+    def get(self, router: FRRouter, daemon: str) -> VTYClient:
+        """Get the client of a daemon, creating it if needed.
+
+        :param router: router running the daemon
+        :type router: FRRouter
+        :param daemon: name of daemon
+        :type daemon: str
+        :return: client of the daemon
+        :rtype: VTYClient
+        """
+
+        key = (router.netns, daemon)
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = VTYClient(router, daemon)
+            return self._clients[key]
+
+    def close(self):
+        """Close every connection."""
+
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+    def executeAll(
+        self,
+        routers: list[FRRouter],
+        command: str,
+        daemon: Union[str, None] = None,
+        workers: int = 64,
+    ) -> dict[str, str]:
+        """Execute a command on many routers at once.
+
+        The command is sent to `daemon`, or to the daemon found by
+        :func:`daemonFor`, over pooled connections. Other commands, e.g.
+        "show running-config" or "clear ip ospf process", are executed by
+        one vtysh process per router.
+
+        :param routers: routers to execute the command on
+        :type routers: list[FRRouter]
+        :param command: command, e.g. "show ip ospf neighbor"
+        :type command: str
+        :param daemon: daemon to send the command to, defaults to None
+        :type daemon: Union[str, None], optional
+        :param workers: maximum number of commands in flight, defaults to 64
+        :type workers: int, optional
+        :return: output of every router, error messages start with "% "
+        :rtype: dict[str, str]
+        """
+
+        daemon = daemon or daemonFor(command)
+
+        def execute(router: FRRouter) -> str:
+            if daemon not in (None, "zebra", *router.daemons):
+                return f"% {daemon} is not running\n"
+            try:
+                if daemon is None:
+                    return router.show(command)
+                return self.get(router, daemon).execute(command)
+            except (OSError, EOFError, RuntimeError, CalledProcessError) as e:
+                return f"% {e}\n"
+
+        if not routers:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(workers, len(routers))) as executor:
+            outputs = executor.map(execute, routers)
+            return {router.name: out for router, out in zip(routers, outputs)}
@@ -1,10 +1,13 @@
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from ipaddress import ip_network
 from typing import Any, Callable, Union, cast
 
 import requests
-from netns_traverse import ns, root_fd
+from netns_traverse import netns
 
 from mininet.node import Node
 
@@ -19,9 +22,15 @@ class ZeroTierNode(Node):
     :param trustedPath: a list that contain trusted paths (dict has 2 keys:
         `net_addr` and `trusted_path_id`), default to None
     :type trustedPath: list[dict[str, Any]], optional
+    :param identityCache: directory caching identities by node name, so a node
+        keeps its identity across runs instead of generating it at every start,
+        disabled if None, default to "zerotier-cache"
+    :type identityCache: Union[str, None], optional
     """
 
     _HOME_FOLDER = "/var/lib/zerotier-one"
+    _CACHE_FOLDER = "zerotier-cache"
+    _IDENTITY_FILES = ("identity.secret", "identity.public")
 
     def __init__(self, name, inNamespace=True, **params):
         privateDirs = params.pop("privateDirs", [])
@@ -36,10 +45,21 @@ class ZeroTierNode(Node):
         super().config(mac, ip, defaultRoute, lo, **_params)
 
         trustedPaths = _params.get("trustedPaths")
+        self.trusted_paths = trustedPaths
         if trustedPaths is not None:
             self._configTrustedPath(trustedPaths)
 
+        identityCache = _params.get("identityCache", ZeroTierNode._CACHE_FOLDER)
+        self.cache_dir = (
+            os.path.abspath(os.path.join(identityCache, self.name))
+            if identityCache is not None
+            else None
+        )
+        cached = self._seedHome()
+
         self.startZeroTier()
+        if not cached:
+            self._cacheIdentity()
 
         node_id = self.cmd("zerotier-cli info | cut -d ' ' -f 3")
         assert isinstance(node_id, str)
@@ -50,6 +70,37 @@ class ZeroTierNode(Node):
         self.auth_token = auth_token.strip()
         self.auth_header = {"X-ZT1-AUTH": self.auth_token}
 
+    def _seedHome(self) -> bool:
+        """Copy the cached identity of this node into its home folder before
+        ZeroTier starts.
+
+        :return: `True` if the identity was found in the cache, `False`
+            otherwise
+        :rtype: bool
+        """
+
+        if self.cache_dir is None or not all(
+            os.path.exists(os.path.join(self.cache_dir, f))
+            for f in ZeroTierNode._IDENTITY_FILES
+        ):
+            return False
+
+        # The home folder is only visible from inside the node
+        for file in ZeroTierNode._IDENTITY_FILES:
+            self.cmd(f"cp {self.cache_dir}/{file} {ZeroTierNode._HOME_FOLDER}/")
+        self.cmd(f"chmod 600 {ZeroTierNode._HOME_FOLDER}/identity.secret")
+        return True
+
+    def _cacheIdentity(self):
+        """Copy the identity generated by ZeroTier into the cache."""
+
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for file in ZeroTierNode._IDENTITY_FILES:
+            self.cmd(f"cp {ZeroTierNode._HOME_FOLDER}/{file} {self.cache_dir}/")
+        os.chmod(os.path.join(self.cache_dir, "identity.secret"), 0o600)
+
     def _configTrustedPath(self, trustedPaths: list[dict[str, Any]]):
         """Generate local.conf with trusted paths info.
 
@@ -70,6 +121,21 @@ class ZeroTierNode(Node):
             f"echo '{json.dumps(localConf, indent=2)}' > {ZeroTierNode._HOME_FOLDER}/local.conf"
         )
 
+    def setTrustedPaths(self, trustedPaths: Union[list[dict[str, Any]], None]):
+        """Replace trusted paths and restart ZeroTier to apply them.
+
+        :param trustedPaths: a list that contain trusted paths (dict has 2 keys:
+            `net_addr` and `trusted_path_id`), remove trusted paths if None
+        :type trustedPaths: Union[list[dict[str, Any]], None]
+        """
+
+        self.trusted_paths = trustedPaths
+        if trustedPaths:
+            self._configTrustedPath(trustedPaths)
+        else:
+            self.cmd(f"rm -f {ZeroTierNode._HOME_FOLDER}/local.conf")
+        self.restartZeroTier()
+
     def joinNetwork(self, network_id: str):
         """Make ZeroTier One join a network.
 
@@ -79,13 +145,44 @@ class ZeroTierNode(Node):
 
         self.cmd(f"zerotier-cli join {network_id}")
 
+    def getNetwork(self, network_id: str) -> dict[str, Any]:
+        """Get status of a joined network, e.g. `status` and
+        `assignedAddresses`.
+
+        :param network_id: ID of the network
+        :type network_id: str
+        :return: JSON payload of the response from the service
+        :rtype: dict[str, Any]
+        """
+
+        return cast(dict[str, Any], self.callServiceAPI("get", f"network/{network_id}"))
+
+    def getAddress(self, network_id: str) -> Union[str, None]:
+        """Get the IPv4 address assigned to this node in a joined network.
+
+        :param network_id: ID of the network
+        :type network_id: str
+        :return: address without prefix length, `None` if none is assigned
+        :rtype: Union[str, None]
+        """
+
+        for address in self.getNetwork(network_id).get("assignedAddresses", []):
+            if "." in address:
+                return address.split("/")[0]
+        return None
+
     def startZeroTier(self):
         """Start ZeroTier daemon."""
 
         self.cmd("zerotier-one -d")
 
-        # It takes time for ZeroTier to start and populate home folder
-        time.sleep(2)
+        # It takes time for ZeroTier to start and populate home folder, mostly
+        # to generate an identity if none was seeded from the cache
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            time.sleep(0.1)
+            if "200 info" in cast(str, self.cmd("zerotier-cli info")):
+                break
 
         # Get rid of "sendto: Network is unreachable" when run zerotier commands
         # the first time
@@ -168,28 +265,71 @@ class ZeroTierNode(Node):
         :rtype: Any
         """
 
-        netns_fd = os.open(f"/proc/{self.getPID()}/ns/net", os.O_RDONLY)
-
-        ns(netns_fd)
-        result = func()
-        ns(root_fd)
-
-        os.close(netns_fd)
-
-        return result
+        # The shell of the node shares the namespace with the daemon, and
+        # using its PID does not cost a command per API call.
+        with netns(self.pid):
+            return func()
 
 
 class ZeroTierRoot(ZeroTierNode):
     def config(self, mac=None, ip=None, defaultRoute=None, lo="up", **_params):
         self.cmd(f"rm -rf {ZeroTierNode._HOME_FOLDER}/moons.d/*")
+        self.moon_cached = False
 
         super().config(mac, ip, defaultRoute, lo, **_params)
+        if self.moon_cached:
+            return
+
         self._genMoon()
+        self._cacheMoon()
 
         # Restart ZeroTier
         self.stopZeroTier()
         self.startZeroTier()
 
+    def _stableEndpoints(self) -> list[str]:
+        return [f"{i.ip}/9993" for i in self.intfList()]
+
+    def _seedHome(self) -> bool:
+        """Copy the cached identity and, if its stable endpoints did not
+        change, the cached moon before ZeroTier starts, so the root does not
+        have to be restarted to load a new moon.
+
+        :return: `True` if the identity was found in the cache, `False`
+            otherwise
+        :rtype: bool
+        """
+
+        if not super()._seedHome():
+            return False
+
+        assert self.cache_dir is not None
+        try:
+            with open(os.path.join(self.cache_dir, "moon.json")) as file:
+                moon = json.load(file)
+        except (OSError, ValueError):
+            return True
+        moon_files = [f for f in os.listdir(self.cache_dir) if f.endswith(".moon")]
+        if (
+            moon_files
+            and moon["roots"][0]["stableEndpoints"] == self._stableEndpoints()
+        ):
+            self.cmd(f"cp {self.cache_dir}/*.moon {ZeroTierNode._HOME_FOLDER}/moons.d/")
+            self.moon_cached = True
+        return True
+
+    def _cacheMoon(self):
+        """Copy the moon definition and the signed moon into the cache."""
+
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.cmd(f"rm -f {self.cache_dir}/*.moon")
+        self.cmd(
+            f"cp {ZeroTierNode._HOME_FOLDER}/moon.json"
+            f" {ZeroTierNode._HOME_FOLDER}/moons.d/*.moon {self.cache_dir}/"
+        )
+
     def _genMoon(self):
         """Generate Moon.
 
@@ -208,8 +348,7 @@ class ZeroTierRoot(ZeroTierNode):
         assert isinstance(moon_json, str)
         moon = json.loads(moon_json)
 
-        stable_endpoints = [f"{i.ip}/9993" for i in self.intfList()]
-        moon["roots"][0]["stableEndpoints"] = stable_endpoints
+        moon["roots"][0]["stableEndpoints"] = self._stableEndpoints()
         self.cmd(f"echo '{json.dumps(moon, indent=2)}' > {json_path}")
 
         self.cmd(f'bash -c "cd {moons_dir} && zerotier-idtool genmoon {json_path}"')
@@ -236,21 +375,31 @@ class ZeroTierController(ZeroTierNode):
             ),
         )
 
-    def createNetwork(self, net_addr: str, verbose: bool = False) -> dict[str, Any]:
-        """Create a public network to be managed by controller.
+    def createNetwork(
+        self,
+        net_addr: str,
+        verbose: bool = False,
+        prefix_len: int = 24,
+        private: bool = False,
+    ) -> dict[str, Any]:
+        """Create a network to be managed by controller.
 
         See: https://docs.zerotier.com/self-hosting/network-controllers
 
-        :param net_addr: network address (x.y.z.t), prefix length will always be
-            24
+        :param net_addr: network address (x.y.z.t)
         :type net_addr: str
         :param verbose: print request and response?, defaults to False
         :type verbose: bool, optional
+        :param prefix_len: prefix length of the network, defaults to 24
+        :type prefix_len: int, optional
+        :param private: members must be authorized by the controller?,
+            defaults to False
+        :type private: bool, optional
         :return: JSON payload of the response from controller
         :rtype: dict[str, Any]
         """
 
-        net_addr = ".".join(net_addr.split(".")[:3])
+        network = ip_network(f"{net_addr}/{prefix_len}", strict=False)
         return cast(
             dict[str, Any],
             self.callServiceAPI(
@@ -259,14 +408,156 @@ class ZeroTierController(ZeroTierNode):
                 json={
                     "ipAssignmentPools": [
                         {
-                            "ipRangeStart": f"{net_addr}.1",
-                            "ipRangeEnd": f"{net_addr}.254",
+                            "ipRangeStart": str(network[1]),
+                            "ipRangeEnd": str(network[-2]),
                         }
                     ],
-                    "routes": [{"target": f"{net_addr}.0/24", "via": None}],
+                    "routes": [{"target": str(network), "via": None}],
                     "v4AssignMode": "zt",
-                    "private": False,
+                    "private": private,
                 },
                 verbose=verbose,
             ),
         )
+
+    def getMembers(self, network_id: str) -> dict[str, int]:
+        """Get members of a network, including members waiting for
+        authorization.
+
+        :param network_id: ID of the network
+        :type network_id: str
+        :return: revision of every member by node ID
+        :rtype: dict[str, int]
+        """
+
+        return cast(
+            dict[str, int],
+            self.callServiceAPI("get", f"controller/network/{network_id}/member"),
+        )
+
+    def authorizeMembers(
+        self, network_id: str, node_ids: list[str], authorized: bool = True
+    ) -> dict[str, dict[str, Any]]:
+        """Authorize many members of a private network at once.
+
+        The controller API has no batch endpoint, so members are updated over
+        one keep-alive connection opened inside the namespace of the
+        controller, instead of one connection and namespace switch per member.
+
+        :param network_id: ID of the network
+        :type network_id: str
+        :param node_ids: node IDs of members
+        :type node_ids: list[str]
+        :param authorized: authorize or deauthorize?, defaults to True
+        :type authorized: bool, optional
+        :return: JSON payload of the response by node ID, members the
+            controller did not update are left out
+        :rtype: dict[str, dict[str, Any]]
+        """
+
+        def authorize():
+            updated = {}
+            with requests.Session() as session:
+                session.headers.update(self.auth_header)
+                for node_id in node_ids:
+                    response = session.post(
+                        f"http://localhost:9993/controller/network/{network_id}"
+                        f"/member/{node_id}",
+                        json={"authorized": authorized},
+                    )
+                    if response.ok:
+                        updated[node_id] = response.json()
+            return updated
+
+        return self._runInNetNS(authorize)
+
+
+def joinConcurrently(
+    controller: ZeroTierController,
+    network_id: str,
+    leaves: list[ZeroTierNode],
+    timeout: float = 300,
+    interval: float = 0.2,
+) -> dict[str, dict[str, Union[float, str, None]]]:
+    """Make leaves join a private network at the same time and measure how
+    long each one takes to get an address.
+
+    Every leaf joins and polls its own service API from its own thread, while
+    the controller authorizes pending members in bulk every `interval`. A leaf
+    that fails, or that cannot be authorized because the controller fails,
+    stops waiting and reports the error.
+
+    :param controller: controller managing the network
+    :type controller: ZeroTierController
+    :param network_id: ID of a private network
+    :type network_id: str
+    :param leaves: nodes to join the network
+    :type leaves: list[ZeroTierNode]
+    :param timeout: maximum time to wait in seconds, defaults to 300
+    :type timeout: float, optional
+    :param interval: seconds between polls, defaults to 0.2
+    :type interval: float, optional
+    :return: per leaf milliseconds from the start until the join returned
+        (`join_ms`), the member was authorized (`authorized_ms`) and the leaf
+        got an address (`address_ms`), `None` if it did not happen in time,
+        and the `error` that stopped it, if any
+    :rtype: dict[str, dict[str, Union[float, str, None]]]
+    """
+
+    names = {leaf.node_id: leaf.name for leaf in leaves}
+    timings: dict[str, dict[str, Union[float, str, None]]] = {
+        leaf.name: {
+            "join_ms": None,
+            "authorized_ms": None,
+            "address_ms": None,
+            "error": None,
+        }
+        for leaf in leaves
+    }
+    started_at = time.time()
+    deadline = started_at + timeout
+    done = threading.Event()
+    authorizer_failed = threading.Event()
+
+    def elapsed() -> float:
+        return (time.time() - started_at) * 1000
+
+    def join(leaf: ZeroTierNode):
+        try:
+            leaf.joinNetwork(network_id)
+            timings[leaf.name]["join_ms"] = elapsed()
+            while time.time() < deadline and not authorizer_failed.is_set():
+                if leaf.getNetwork(network_id).get("assignedAddresses"):
+                    timings[leaf.name]["address_ms"] = elapsed()
+                    return
+                time.sleep(interval)
+        except Exception as e:
+            timings[leaf.name]["error"] = f"{type(e).__name__}: {e}"
+
+    def authorize():
+        pending = set(names)
+        try:
+            while pending and not done.is_set() and time.time() < deadline:
+                joined = pending & set(controller.getMembers(network_id))
+                if joined:
+                    # Members the controller rejected are retried
+                    authorized = controller.authorizeMembers(network_id, sorted(joined))
+                    for node_id in authorized:
+                        timings[names[node_id]]["authorized_ms"] = elapsed()
+                    pending -= set(authorized)
+                time.sleep(interval)
+        except Exception as e:
+            error = f"not authorized: {type(e).__name__}: {e}"
+            for node_id in pending:
+                timings[names[node_id]]["error"] = error
+            authorizer_failed.set()
+
+    authorizer = threading.Thread(target=authorize)
+    authorizer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=len(leaves)) as executor:
+            list(executor.map(join, leaves))
+    finally:
+        done.set()
+        authorizer.join()
+    return timings
@@ -0,0 +1,138 @@
+import time
+from typing import Any, Union
+
+from bench import measureLatency, measureThroughput
+from frr_stats import processUsage
+from zerotier import ZeroTierController, ZeroTierNode
+
+from mininet.net import Mininet
+from mininet.node import Node
+
+
+def _zeroTierUsage(nodes: list[ZeroTierNode]) -> dict[str, dict[str, float]]:
+    usage = {}
+    for node in nodes:
+        try:
+            usage[node.name] = processUsage(int(node.getPID()))
+        except ValueError:
+            usage[node.name] = {}
+    return usage
+
+
+def measurePath(
+    src: Node,
+    dst: Node,
+    address: str,
+    nodes: list[ZeroTierNode],
+    duration: float = 10,
+) -> dict[str, Any]:
+    """Measure latency and throughput to an address, and the CPU used by the
+    ZeroTier daemon of every node meanwhile.
+
+    :param src: sending node
+    :type src: Node
+    :param dst: receiving node
+    :type dst: Node
+    :param address: address of `dst`
+    :type address: str
+    :param nodes: ZeroTier nodes whose CPU usage is measured
+    :type nodes: list[ZeroTierNode]
+    :param duration: seconds of throughput test, defaults to 10
+    :type duration: float, optional
+    :return: latency, throughput, and CPU of ZeroTier per node in percent of
+        one core during the throughput test
+    :rtype: dict[str, Any]
+    """
+
+    latency = measureLatency(src, address)
+    before, started_at = _zeroTierUsage(nodes), time.time()
+    throughput = measureThroughput(src, dst, address, duration)
+    after, elapsed = _zeroTierUsage(nodes), time.time() - started_at
+    cpu = {
+        name: (after[name]["cpu_seconds"] - before[name]["cpu_seconds"]) / elapsed * 100
+        for name in before
+        if before[name] and after.get(name)
+    }
+    return {"latency": latency, "throughput": throughput, "cpu_percent": cpu}
+
+
+def _waitReachable(src: Node, address: str, timeout: float = 60) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if " 0% packet loss" in src.cmd(f"ping -q -n -c 3 -i 0.2 -W 1 {address}"):
+            return True
+        time.sleep(1)
+    return False
+
+
+def benchmarkZeroTier(
+    net: Mininet,
+    src: str = "h1",
+    dst: str = "h2",
+    duration: float = 10,
+    underlay: str = "10.0.0.0/8",
+    trusted_path_id: int = 1,
+) -> dict[str, Any]:
+    """Compare the ZeroTier overlay with and without trusted paths against the
+    underlay.
+
+    Three paths between two leaves are measured: the underlay, the overlay
+    with encryption, and the overlay with a trusted path on the underlay
+    network, which skips encryption and authentication. Trusted paths are
+    configured on both leaves, which restarts their daemons, and the original
+    configuration is restored at the end.
+
+    :param net: a Mininet instance with ZeroTier leaves joined to a network
+    :type net: Mininet
+    :param src: name of sending leaf, defaults to "h1"
+    :type src: str, optional
+    :param dst: name of receiving leaf, defaults to "h2"
+    :type dst: str, optional
+    :param duration: seconds of every throughput test, defaults to 10
+    :type duration: float, optional
+    :param underlay: underlay network trusted by the trusted path, defaults to
+        "10.0.0.0/8"
+    :type underlay: str, optional
+    :param trusted_path_id: ID of the trusted path, defaults to 1
+    :type trusted_path_id: int, optional
+    :raises RuntimeError: if a leaf has no overlay address
+    :return: measurements of `underlay`, `overlay` and `overlay_trusted` paths
+    :rtype: dict[str, Any]
+    """
+
+    src_node, dst_node = net.get(src, dst)
+    assert isinstance(src_node, ZeroTierNode) and isinstance(dst_node, ZeroTierNode)
+    nodes = [n for n in net.hosts if isinstance(n, ZeroTierNode)]
+    controller = next(n for n in nodes if isinstance(n, ZeroTierController))
+    network_id = controller.getNetworks()[0]
+    address = dst_node.getAddress(network_id)
+    if address is None:
+        raise RuntimeError(f"{dst} has no address in network {network_id}")
+
+    original = {n.name: n.trusted_paths for n in (src_node, dst_node)}
+    trusted = [{"net_addr": underlay, "trusted_path_id": trusted_path_id}]
+    paths: list[tuple[str, str, Union[list[dict[str, Any]], None]]] = [
+        ("underlay", dst_node.IP(), None),
+        ("overlay", address, None),
+        ("overlay_trusted", address, trusted),
+    ]
+
+    results = {}
+    try:
+        for name, target, trusted_paths in paths:
+            if name != "underlay":
+                print(f"*** Configuring trusted paths: {trusted_paths}")
+                for node in (src_node, dst_node):
+                    node.setTrustedPaths(trusted_paths)
+                if not _waitReachable(src_node, target):
+                    print(f"*** {target} is not reachable")
+                    continue
+                # Let peers find the direct path instead of relaying by root
+                time.sleep(2)
+            print(f"*** Measuring {name} path to {target}")
+            results[name] = measurePath(src_node, dst_node, target, nodes, duration)
+    finally:
+        for node in (src_node, dst_node):
+            node.setTrustedPaths(original[node.name])
+
+    return results
@@ -0,0 +1,233 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from base_topo import TopoWithPostAction, TopoWithRealisticLink, TopoWithRouter
+from reachability import printMatrix, waitReachable
+from results import recordResult, summarize
+from zerotier import (
+    ZeroTierController,
+    ZeroTierNode,
+    ZeroTierRoot,
+    joinConcurrently,
+)
+
+from mininet.net import Mininet
+from mininet.node import OVSSwitch
+
+
+class ZeroTierTopoSDN(TopoWithPostAction, TopoWithRealisticLink):
+    # Switches are OVS switches that forward by OpenFlow, see topo_registry.py
+    require_controller = True
+
+    def build(self):
+        aroot, controller, h1, h2 = self._genZeroTierNodes()
+
+        # Why OpenFlow14: https://groups.google.com/a/onosproject.org/g/onos-discuss/c/bFnACrQ6Zj8/m/ZjFicCCmAAAJ
+        s1 = self.addSwitch("s1", cls=OVSSwitch, protocols="OpenFlow14")
+        s2 = self.addSwitch("s2", cls=OVSSwitch, protocols="OpenFlow14")
+        s3 = self.addSwitch("s3", cls=OVSSwitch, protocols="OpenFlow14")
+
+        self.addLink(s1, s2)
+        self.addLink(s2, s3)
+        self.addLink(s3, s1)
+
+        self.addLink(aroot, s3)
+        self.addLink(controller, s3)
+
+        self.addLink(h1, s1)
+        self.addLink(h2, s2)
+
+    def _genZeroTierNodes(
+        self, leaves: tuple[str, ...] = ("h1", "h2"), **configures
+    ) -> tuple[str, ...]:
+        """Generate ZeroTier root, ZeroTier controller and ZeroTier leaf nodes.
+
+        :param leaves: names of leaf nodes, defaults to ("h1", "h2")
+        :type leaves: tuple[str, ...], optional
+        :return: tuple of name of ZeroTier nodes, root and controller first
+        :rtype: tuple[str, ...]
+        """
+
+        # Mount moon directory to all nodes make them automatically orbit the
+        # moon created by root.
+        privateDirs = (("/var/lib/zerotier-one/moons.d", "./moons.d"),)
+
+        # Mininet configures host follow alphabetical order and Root should
+        # start and create moon first, hence the name "aroot".
+        aroot = self.addNode(
+            "aroot",
+            cls=ZeroTierRoot,
+            privateDirs=privateDirs,
+            **configures.get("aroot", {}),
+        )
+        controller = self.addNode(
+            "controller",
+            cls=ZeroTierController,
+            privateDirs=privateDirs,
+            **configures.get("controller", {}),
+        )
+        leaf_nodes = [
+            self.addNode(
+                leaf,
+                cls=ZeroTierNode,
+                privateDirs=privateDirs,
+                **configures.get(leaf, {}),
+            )
+            for leaf in leaves
+        ]
+
+        return aroot, controller, *leaf_nodes
+
+    @classmethod
+    def postAction(cls, net: Mininet):
+        """Create ZeroTier network and join all nodes.
+
+        :param net: a Mininet instance built from a :class:`ZeroTierTopo` topo
+        :type net: Mininet
+        """
+
+        assert isinstance(net.topo, cls)
+        controller, h1, h2 = net.getNodeByName("controller", "h1", "h2")
+
+        assert (
+            isinstance(controller, ZeroTierController)
+            and isinstance(h1, ZeroTierNode)
+            and isinstance(h2, ZeroTierNode)
+        )
+
+        print("*** Waiting for every node to be reachable")
+        printMatrix(waitReachable(net))
+
+        # Restart nodes when connection between node and root is available to
+        # orbit them to root.
+        print("*** Restarting leaf ZeroTier node")
+        for node in (h1, h2, controller):
+            print(node.name, end=" ")
+            node.restartZeroTier()
+        print()
+
+        print("*** Creating virtual network")
+        print(controller.createNetwork("192.168.0.0"))
+        print("*** Making nodes to join the network")
+        network_id = controller.getNetworks()[0]
+        h1.joinNetwork(network_id)
+        h2.joinNetwork(network_id)
+
+
+class ZeroTierTopoRouter(ZeroTierTopoSDN, TopoWithRouter):
+    require_controller = False
+
+    def build(self):
+        aroot, controller, h1, h2 = self._genZeroTierNodes(
+            aroot={"ip": "10.0.5.2/24", "defaultRoute": "via 10.0.5.1"},
+            controller={"ip": "10.0.6.2/24", "defaultRoute": "via 10.0.6.1"},
+            h1={"ip": "10.0.0.2/24", "defaultRoute": "via 10.0.0.1"},
+            h2={"ip": "10.0.4.2/24", "defaultRoute": "via 10.0.4.1"},
+        )
+
+        ospf_setup_commands = (
+            "configure terminal",
+            "router ospf",
+            "network 10.0.0.0/16 area 1",
+        )
+
+        r1 = self.addRouter(
+            "r1", ip="10.0.0.1/24", daemons=("ospfd",), commands=ospf_setup_commands
+        )
+        r2 = self.addRouter(
+            "r2", ip="10.0.4.1/24", daemons=("ospfd",), commands=ospf_setup_commands
+        )
+        r3 = self.addRouter(
+            "r3", ip="10.0.2.1/24", daemons=("ospfd",), commands=ospf_setup_commands
+        )
+
+        self.addLink(r1, h1)
+        self.addLink(r2, h2)
+        self.addLink(r3, r2, params2={"ip": "10.0.2.2/24"})
+        self.addLink(
+            r1, r3, params1={"ip": "10.0.1.1/24"}, params2={"ip": "10.0.1.2/24"}
+        )
+        self.addLink(
+            r1, r2, params1={"ip": "10.0.3.1/24"}, params2={"ip": "10.0.3.2/24"}
+        )
+        self.addLink(r3, aroot, params1={"ip": "10.0.5.1/24"})
+        self.addLink(r3, controller, params1={"ip": "10.0.6.1/24"})
+
+
+class ZeroTierScaleTopo(ZeroTierTopoSDN):
+    """ZeroTier topology with many leaves to measure how the controller and
+    the moon handle concurrent joins.
+
+    Root, controller and leaves `h1`...`hN` are connected to one switch. After
+    the network starts, every leaf joins a private network at the same time
+    and the controller authorizes pending members in bulk. The time each leaf
+    takes to get an address is reported.
+
+    :param leaves: number of leaves, defaults to 10
+    :type leaves: int, optional
+    """
+
+    require_controller = False
+
+    def build(self, leaves: int = 10):
+        """Create custom topo."""
+
+        if leaves < 1:
+            raise ValueError("need at least 1 leaf")
+
+        self.leaves = tuple(f"h{i}" for i in range(1, leaves + 1))
+        aroot, controller, *leaf_nodes = self._genZeroTierNodes(self.leaves)
+
+        s1 = self.addSwitch("s1")
+        for node in (aroot, controller, *leaf_nodes):
+            self.addLink(node, s1)
+
+    @classmethod
+    def postAction(cls, net: Mininet):
+        """Join every leaf to a private network at the same time and report
+        join times.
+
+        :param net: a Mininet instance built from a :class:`ZeroTierScaleTopo`
+            topo
+        :type net: Mininet
+        """
+
+        assert isinstance(net.topo, cls)
+        controller = net.getNodeByName("controller")
+        leaves = [net.getNodeByName(name) for name in net.topo.leaves]
+        assert isinstance(controller, ZeroTierController)
+
+        print("*** Waiting for every node to be reachable")
+        printMatrix(waitReachable(net))
+
+        # Like ZeroTierTopoSDN, restart nodes once root is reachable so they
+        # orbit it, otherwise join times include moon discovery
+        print("*** Restarting leaf ZeroTier nodes")
+        with ThreadPoolExecutor(max_workers=len(leaves) + 1) as executor:
+            list(executor.map(lambda n: n.restartZeroTier(), [*leaves, controller]))
+
+        print("*** Creating private virtual network")
+        # A /16 fits hundreds of leaves
+        network = controller.createNetwork("192.168.0.0", prefix_len=16, private=True)
+        print(f"*** Joining {len(leaves)} leaves concurrently")
+        timings = joinConcurrently(controller, network["id"], leaves)
+
+        summary = {
+            key: summarize([t[key] for t in timings.values() if t[key] is not None])
+            for key in ("join_ms", "authorized_ms", "address_ms")
+        }
+        missing = [n for n, t in timings.items() if t["address_ms"] is None]
+        errors = {n: t["error"] for n, t in timings.items() if t["error"]}
+        for key, stats in summary.items():
+            print(
+                f"{key:>14}: p50 {stats['p50']:.0f} p90 {stats['p90']:.0f}"
+                f" p99 {stats['p99']:.0f} max {stats['max']:.0f}"
+            )
+        if missing:
+            print(f"*** No address: {' '.join(missing)}")
+        for name, error in errors.items():
+            print(f"*** {name}: {error}")
+        recordResult(
+            net,
+            "zerotier_join",
+            {"leaves": timings, "summary": summary, "missing": missing},
+        )